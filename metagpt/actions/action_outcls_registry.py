@@ -3,15 +3,48 @@
 # @Desc   : registry to store Dynamic Model from ActionNode.create_model_class to keep it as same Class
 #           with same class name and mapping
 
-from functools import wraps
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from typing import Any, Hashable, get_args, get_origin
 
-action_outcls_registry = dict()
+from pydantic.fields import FieldInfo
+
+MAX_ACTION_OUTCLS = 1024  # the least recently used classes are dropped beyond it
+
+action_outcls_registry: OrderedDict[tuple, type] = OrderedDict()
+
+
+def canonical_signature(obj: Any) -> Hashable:
+    """
+    Hashable signature of the arguments of `create_model_class`, the same for the same class name and mapping,
+    regardless of the order of the fields and of `typing.List` against `list`
+    """
+    if isinstance(obj, dict):
+        return dict, tuple(sorted((str(k), canonical_signature(v)) for k, v in obj.items()))
+    if isinstance(obj, tuple):
+        return tuple, tuple(canonical_signature(i) for i in obj)
+    if isinstance(obj, FieldInfo):
+        # the arguments given to `Field`, cheaper than the repr of all the attributes
+        return FieldInfo, canonical_signature(obj._attributes_set)
+    try:
+        return _hashable_signature(obj)
+    except TypeError:  # unhashable
+        return type(obj), repr(obj)
+
+
+@lru_cache(maxsize=MAX_ACTION_OUTCLS, typed=True)
+def _hashable_signature(obj: Hashable) -> Hashable:
+    origin = get_origin(obj)
+    if origin is not None:
+        return origin, tuple(canonical_signature(i) for i in get_args(obj))
+    return type(obj), obj
 
 
 def register_action_outcls(func):
     """
     Due to `create_model` return different Class even they have same class name and mapping.
-    In order to do a comparison, use outcls_id to identify same Class with same class name and field definition
+    In order to do a comparison, use outcls_id to identify same Class with same class name and field definition.
+    The registry keeps the last `MAX_ACTION_OUTCLS` classes used.
     """
 
     @wraps(func)
@@ -21,22 +54,16 @@ def register_action_outcls(func):
             [<class 'metagpt.actions.action_node.ActionNode'>, 'test', {'field': (str, Ellipsis)}]
         """
         arr = list(args) + list(kwargs.values())
-        """
-        outcls_id example
-            "<class 'metagpt.actions.action_node.ActionNode'>_test_{'field': (str, Ellipsis)}"
-        """
-        for idx, item in enumerate(arr):
-            if isinstance(item, dict):
-                arr[idx] = dict(sorted(item.items()))
-        outcls_id = "_".join([str(i) for i in arr])
-        # eliminate typing influence
-        outcls_id = outcls_id.replace("typing.List", "list").replace("typing.Dict", "dict")
+        outcls_id = tuple(canonical_signature(i) for i in arr)
 
         if outcls_id in action_outcls_registry:
+            action_outcls_registry.move_to_end(outcls_id)
             return action_outcls_registry[outcls_id]
 
         out_cls = func(*args, **kwargs)
         action_outcls_registry[outcls_id] = out_cls
+        while len(action_outcls_registry) > MAX_ACTION_OUTCLS:
+            action_outcls_registry.popitem(last=False)
         return out_cls
 
     return decorater
@@ -9,13 +9,15 @@ from __future__ import annotations
 import asyncio
 import base64
 import re
-from typing import Literal, Tuple
+from typing import Callable, Literal, Optional, Tuple
 
 import nbformat
+import traitlets
 from nbclient import NotebookClient
 from nbclient.exceptions import CellTimeoutError, DeadKernelError
 from nbformat import NotebookNode
 from nbformat.v4 import new_code_cell, new_markdown_cell, new_output
+from pydantic import Field
 from rich.box import MINIMAL
 from rich.console import Console, Group
 from rich.live import Live
@@ -24,32 +26,112 @@ from rich.panel import Panel
 from rich.syntax import Syntax
 
 from metagpt.actions import Action
+from metagpt.actions.di.kernel_pool import KernelLease, KernelPool
 from metagpt.logs import logger
 
+TRUNCATED_MARK = "\n...[output truncated]"
+
+
+class BoundedNotebookClient(NotebookClient):
+    """Truncates the outputs of a cell while it runs, rather than buffering all of them, and reports each output."""
+
+    max_output_len = traitlets.Integer(0, help="The max length of each text output, 0 for no limit").tag(config=True)
+    output_callback = traitlets.Callable(
+        None, allow_none=True, help="Called with each output of a cell once truncated, with each chunk of a stream"
+    )
+
+    def output(self, outs: list[NotebookNode], msg: dict, display_id: str, cell_index: int) -> Optional[NotebookNode]:
+        out = super().output(outs, msg, display_id, cell_index)
+        if out is None:
+            return None
+        reported = out
+        if self.max_output_len:
+            out, reported = self._truncate(outs, out)
+        if reported is not None and self.output_callback:
+            self.output_callback(reported)
+        return out
+
+    def _truncate(
+        self, outs: list[NotebookNode], out: NotebookNode
+    ) -> Tuple[Optional[NotebookNode], Optional[NotebookNode]]:
+        """Return the truncated output, and the output to report, which is the new part only for a stream chunk"""
+        limit = self.max_output_len
+        if out.output_type == "stream":
+            # merge the chunks of a stream, so that a long print is one output
+            start = 0
+            previous = outs[-2] if len(outs) > 1 else None
+            if previous and previous.output_type == "stream" and previous.name == out.name:
+                outs.pop()
+                if previous.text.endswith(TRUNCATED_MARK):
+                    return None, None
+                start = len(previous.text)
+                previous.text += out.text
+                out = previous
+            if len(out.text) > limit:
+                out.text = out.text[:limit] + TRUNCATED_MARK
+            # the merged output keeps growing, so the chunk is reported as a new output
+            return out, new_output("stream", name=out.name, text=out.text[start:])
+        elif out.output_type in ("execute_result", "display_data"):
+            for mime, data in list(out.data.items()):
+                if isinstance(data, str) and not mime.startswith("image/") and len(data) > limit:
+                    if mime == "text/plain":
+                        out.data[mime] = data[:limit] + TRUNCATED_MARK
+                    else:
+                        del out.data[mime]  # the rich representations, e.g. the html of a dataframe
+        elif out.output_type == "error":
+            # the end of a traceback is the most useful
+            traceback, length = [], 0
+            for line in reversed(out.traceback):
+                length += len(line) + 1
+                if length > limit:
+                    break
+                traceback.insert(0, line)
+            out.traceback = traceback or [out.traceback[-1][-limit:]]
+        return out, out
+
 
 class ExecuteNbCode(Action):
-    """execute notebook code block, return result to llm, and display it."""
+    """execute notebook code block, return result to llm, and display it.
+    The kernel is leased from `kernel_pool` if provided, instead of being started on first run.
+    Each text output is truncated to `max_output_len` while the cell runs, and passed to `output_callback`, the outputs
+    of the cells before the last `max_output_cells` ones are dropped from the notebook.
+    """
 
     nb: NotebookNode
     nb_client: NotebookClient
     console: Console
     interaction: str
     timeout: int = 600
-
-    def __init__(
-        self,
-        nb=nbformat.v4.new_notebook(),
-        timeout=600,
-    ):
+    max_output_len: int = 10000
+    max_output_cells: int = 20
+    output_callback: Optional[Callable[[NotebookNode], None]] = Field(default=None, exclude=True)
+    kernel_pool: Optional[KernelPool] = Field(default=None, exclude=True)
+    kernel_lease: Optional[KernelLease] = Field(default=None, exclude=True)
+
+    def __init__(self, nb=None, timeout=600, kernel_pool: Optional[KernelPool] = None, **kwargs):
+        nb = nb if nb is not None else nbformat.v4.new_notebook()
         super().__init__(
             nb=nb,
             nb_client=NotebookClient(nb, timeout=timeout),
             timeout=timeout,
             console=Console(),
             interaction=("ipython" if self.is_ipython() else "terminal"),
+            kernel_pool=kernel_pool,
+            **kwargs,
+        )
+        self.nb_client = self._new_client()
+
+    def _new_client(self) -> NotebookClient:
+        return BoundedNotebookClient(
+            self.nb, timeout=self.timeout, max_output_len=self.max_output_len, output_callback=self.output_callback
         )
 
     async def build(self):
+        if self.kernel_pool:
+            if self.kernel_lease is None:
+                self.kernel_lease = await self.kernel_pool.acquire()
+                self.nb_client.km, self.nb_client.kc = self.kernel_lease.km, self.kernel_lease.kc
+            return
         if self.nb_client.kc is None or not await self.nb_client.kc.is_alive():
             self.nb_client.create_kernel_manager()
             self.nb_client.start_new_kernel()
@@ -57,6 +139,14 @@ class ExecuteNbCode(Action):
 
     async def terminate(self):
         """kill NotebookClient"""
+        if self.kernel_lease is not None:
+            # return the kernel to the pool, which resets or replaces it
+            lease, self.kernel_lease = self.kernel_lease, None
+            self.nb_client.kc = None
+            self.nb_client.km = None
+            await self.kernel_pool.release(lease)
+            return
+
         if self.nb_client.km is not None and await self.nb_client.km.is_alive():
             await self.nb_client.km.shutdown_kernel(now=True)
             await self.nb_client.km.cleanup_resources()
@@ -79,10 +169,55 @@ class ExecuteNbCode(Action):
         """reset NotebookClient"""
         await self.terminate()
 
-        # sleep 1s to wait for the kernel to be cleaned up completely
-        await asyncio.sleep(1)
-        await self.build()
-        self.nb_client = NotebookClient(self.nb, timeout=self.timeout)
+        if not self.kernel_pool:
+            # sleep 1s to wait for the kernel to be cleaned up completely
+            await asyncio.sleep(1)
+            await self.build()
+        self.nb_client = self._new_client()
+
+    @property
+    def replay_cells(self) -> list[NotebookNode]:
+        """The code cells run again by `fork`, the failed ones are skipped"""
+        return [cell for cell in self.nb.cells if cell.cell_type == "code" and cell.metadata.get("is_success", True)]
+
+    async def fork(self) -> ExecuteNbCode:
+        """Return an executor with another kernel from the pool, in the same state.
+        A kernel process cannot be copied, so the successful code cells run so far are run again in the new kernel.
+        It is not the same state if the cells are not idempotent, e.g. random, time-dependent, or writing files.
+        """
+        if not self.kernel_pool:
+            raise ValueError("Forking an executor needs a kernel pool")
+        forked = ExecuteNbCode(
+            timeout=self.timeout,
+            kernel_pool=self.kernel_pool,
+            max_output_len=self.max_output_len,
+            max_output_cells=self.max_output_cells,
+        )
+        forked.nb.cells = [new_code_cell(source=cell.source) for cell in self.replay_cells]
+        try:
+            await forked.build()
+            for i, cell in enumerate(forked.nb.cells):
+                await forked.run_cell(cell, i)
+                cell.outputs = []
+        except BaseException:
+            await forked.terminate()
+            raise
+        return forked
+
+    async def commit(self, forked: ExecuteNbCode):
+        """Take over the kernel of a forked executor and the cells it ran after the fork"""
+        await self.terminate()
+        self.kernel_lease, forked.kernel_lease = forked.kernel_lease, None
+        self.nb_client.km, self.nb_client.kc = forked.nb_client.km, forked.nb_client.kc
+        forked.nb_client.km = forked.nb_client.kc = None
+        self.nb.cells.extend(forked.nb.cells[len(self.replay_cells) :])
+        self.evict_outputs()
+
+    def evict_outputs(self):
+        """Drop the outputs of the cells before the last `max_output_cells` code cells, the code is kept"""
+        code_cells = [cell for cell in self.nb.cells if cell.cell_type == "code"]
+        for cell in code_cells[: -self.max_output_cells] if self.max_output_cells else []:
+            cell.outputs = []
 
     def add_code_cell(self, code: str):
         self.nb.cells.append(new_code_cell(source=code))
@@ -182,8 +317,9 @@ class ExecuteNbCode(Action):
             error_msg = "Cell execution timed out: Execution exceeded the time limit and was stopped; consider optimizing your code for better performance."
             return False, error_msg
         except DeadKernelError:
+            exceeded = self.kernel_lease.exceeded if self.kernel_lease else ""
             await self.reset()
-            return False, "DeadKernelError"
+            return False, f"DeadKernelError: {exceeded}" if exceeded else "DeadKernelError"
         except Exception:
             return self.parse_outputs(self.nb.cells[-1].outputs)
 
@@ -203,9 +339,11 @@ class ExecuteNbCode(Action):
             # run code
             cell_index = len(self.nb.cells) - 1
             success, outputs = await self.run_cell(self.nb.cells[-1], cell_index)
+            self.evict_outputs()
 
             if "!pip" in code:
                 success = False
+            self.nb.cells[-1].metadata["is_success"] = success  # a failed cell is not run again by `fork`
 
             return outputs, success
 
@@ -0,0 +1,251 @@
+# -*- encoding: utf-8 -*-
+"""
+@File    :   kernel_pool.py
+@Desc    :   A pool of started Jupyter kernels, leased to `ExecuteNbCode`
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Optional, Union
+
+from jupyter_client import AsyncKernelClient, AsyncKernelManager
+
+from metagpt.logs import logger
+
+DEFAULT_PRELOAD_CODE = """
+import numpy as np
+import pandas as pd
+"""
+# the state of the process restored by `RESET_CODE`, kept in `sys.modules` as `%reset` clears the namespace only
+SNAPSHOT_CODE = """
+import os as _os, sys as _sys, types as _types
+_sys.modules["_kernel_pool_snapshot"] = _types.SimpleNamespace(
+    cwd=_os.getcwd(), environ=dict(_os.environ), path=list(_sys.path)
+)
+del _os, _sys, _types
+"""
+RESET_CODE = """
+%reset -f
+import os as _os, sys as _sys, warnings as _warnings
+_snapshot = _sys.modules["_kernel_pool_snapshot"]
+_os.chdir(_snapshot.cwd)
+_os.environ.clear()
+_os.environ.update(_snapshot.environ)
+_sys.path[:] = _snapshot.path
+if "pandas" in _sys.modules:
+    with _warnings.catch_warnings():
+        _warnings.simplefilter("ignore")
+        _sys.modules["pandas"].reset_option("all")
+if "matplotlib.pyplot" in _sys.modules:
+    _sys.modules["matplotlib.pyplot"].close("all")
+del _os, _sys, _warnings, _snapshot
+"""
+
+
+class KernelLease:
+    """A kernel leased from the pool, killed by the pool if it exceeds the limits of the lease"""
+
+    def __init__(self, km: AsyncKernelManager, kc: AsyncKernelClient):
+        self.km = km
+        self.kc = kc
+        self.leased_at: float = 0.0
+        self.exceeded: str = ""  # the limit exceeded, if the kernel was killed for it
+        self._watchdog: Optional[asyncio.Task] = None
+
+    @property
+    def pid(self) -> Optional[int]:
+        return getattr(self.km.provisioner, "pid", None)
+
+
+class KernelPool:
+    """Keeps `size` kernels started, with `preload_code` run in them, so that a lease does not wait for a kernel as long
+    as fewer than `size` kernels are leased. More kernels are started for the leases beyond, and shut down when
+    released.
+
+    A released kernel is shut down and replaced by a new one in the background. With `recycle`, it is reset instead and
+    returned to the pool if it is still alive and within the limits, which is faster but not isolated: the namespace,
+    cwd, environment variables, `sys.path`, pandas options and matplotlib figures are reset, while the imported or
+    monkeypatched modules and the started threads are kept.
+
+    A leased kernel is killed if it uses more than `max_memory_mb` of memory or is leased for more than
+    `max_lease_seconds`, the running cell then fails with `DeadKernelError`.
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        preload_code: str = DEFAULT_PRELOAD_CODE,
+        kernel_name: str = "",
+        max_memory_mb: float = 0,
+        max_lease_seconds: float = 0,
+        startup_timeout: int = 60,
+        check_interval: float = 1.0,
+        recycle: bool = False,
+    ):
+        if max_memory_mb:
+            try:
+                import psutil  # noqa: F401
+            except ImportError:
+                raise ImportError("`psutil` package not found, please run `pip install psutil` to limit the memory")
+        self.size = size
+        self.preload_code = preload_code
+        self.kernel_name = kernel_name
+        self.max_memory_mb = max_memory_mb
+        self.max_lease_seconds = max_lease_seconds
+        self.startup_timeout = startup_timeout
+        self.check_interval = check_interval
+        self.recycle = recycle
+
+        self._idle: asyncio.Queue[Union[KernelLease, Exception]] = asyncio.Queue()
+        self._starting: set[asyncio.Task] = set()
+        self._leased: set[KernelLease] = set()
+        self._waiting = 0
+        self._closed = False
+
+    @property
+    def idle_size(self) -> int:
+        return self._idle.qsize()
+
+    @property
+    def _demand(self) -> int:
+        """The number of idle kernels needed, to keep `size` kernels and serve the waiting leases"""
+        return max(self.size - len(self._leased), self._waiting)
+
+    async def start(self):
+        """Start the kernels and wait for them, and for the released kernels being replaced or reset"""
+        self._refill()
+        await asyncio.gather(*self._starting)
+
+    async def acquire(self) -> KernelLease:
+        if self._closed:
+            raise RuntimeError("The kernel pool is closed")
+        self._waiting += 1
+        try:
+            self._refill()
+            lease = await self._idle.get()
+        finally:
+            self._waiting -= 1
+        if isinstance(lease, Exception):
+            raise lease
+
+        lease.leased_at = time.monotonic()
+        lease.exceeded = ""
+        if self.max_memory_mb or self.max_lease_seconds:
+            lease._watchdog = asyncio.create_task(self._watch(lease))
+        self._leased.add(lease)
+        return lease
+
+    async def release(self, lease: KernelLease):
+        """Return the kernel to the pool, it is replaced or reset in the background, or shut down if not needed"""
+        self._leased.discard(lease)
+        if lease._watchdog:
+            lease._watchdog.cancel()
+            lease._watchdog = None
+
+        if self._closed or self.idle_size + len(self._starting) >= self._demand:
+            await self._shutdown(lease)
+            return
+        self._add_starting(self._recycle(lease))
+
+    async def close(self):
+        """Shut down all the kernels, including the leased ones"""
+        self._closed = True
+        # wait for the starting kernels rather than cancel them, a cancelled start may leave a kernel process behind
+        await asyncio.gather(*self._starting, return_exceptions=True)
+        leases = list(self._leased)
+        while not self._idle.empty():
+            lease = self._idle.get_nowait()
+            if isinstance(lease, KernelLease):
+                leases.append(lease)
+        for lease in leases:
+            if lease._watchdog:
+                lease._watchdog.cancel()
+            await self._shutdown(lease)
+        self._leased.clear()
+
+    def _refill(self):
+        """Start kernels until there are enough idle or starting ones"""
+        if self._closed:
+            return
+        for _ in range(self._demand - self.idle_size - len(self._starting)):
+            self._add_starting(self._start_kernel())
+
+    def _add_starting(self, coro):
+        task = asyncio.create_task(coro)
+        self._starting.add(task)
+        task.add_done_callback(self._starting.discard)
+
+    async def _recycle(self, lease: KernelLease):
+        """Reset a released kernel if `recycle`, or replace it, as well as if it is dead or over the limits"""
+        if self.recycle and not lease.exceeded and await lease.km.is_alive():
+            if await self._run_code(lease, f"{RESET_CODE}\n{self.preload_code}"):
+                self._idle.put_nowait(lease)
+                return
+        await self._shutdown(lease)
+        await self._start_kernel()
+
+    async def _start_kernel(self):
+        km = AsyncKernelManager(kernel_name=self.kernel_name) if self.kernel_name else AsyncKernelManager()
+        try:
+            await km.start_kernel()
+            kc = km.client()
+            kc.start_channels()
+            await kc.wait_for_ready(timeout=self.startup_timeout)
+            kc.allow_stdin = False
+        except Exception as e:
+            logger.error(f"Fail to start a kernel: {e}")
+            await self._shutdown(KernelLease(km, None))
+            self._idle.put_nowait(e)
+            return
+
+        lease = KernelLease(km, kc)
+        if self.recycle and not await self._run_code(lease, SNAPSHOT_CODE):
+            logger.warning("Fail to snapshot the state of the kernel, it cannot be reset")
+        if self.preload_code and not await self._run_code(lease, self.preload_code):
+            logger.warning("The preload code of the kernel pool failed")
+        self._idle.put_nowait(lease)
+
+    async def _run_code(self, lease: KernelLease, code: str) -> bool:
+        try:
+            reply = await lease.kc.execute_interactive(
+                code, silent=True, store_history=False, timeout=self.startup_timeout, output_hook=lambda msg: None
+            )
+        except Exception as e:
+            logger.warning(f"Fail to run code in the kernel: {e}")
+            return False
+        return reply["content"]["status"] == "ok"
+
+    async def _watch(self, lease: KernelLease):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            if self.max_lease_seconds and time.monotonic() - lease.leased_at > self.max_lease_seconds:
+                lease.exceeded = f"the lease exceeded {self.max_lease_seconds} seconds"
+            elif self.max_memory_mb and self._memory_mb(lease) > self.max_memory_mb:
+                lease.exceeded = f"the kernel exceeded {self.max_memory_mb} MB of memory"
+            if lease.exceeded:
+                logger.warning(f"Kill the kernel {lease.pid}, {lease.exceeded}")
+                await lease.km.shutdown_kernel(now=True)
+                return
+
+    @staticmethod
+    def _memory_mb(lease: KernelLease) -> float:
+        import psutil
+
+        try:
+            process = psutil.Process(lease.pid)
+            processes = [process] + process.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / 1024**2
+        except (psutil.Error, ValueError, TypeError):
+            return 0.0
+
+    @staticmethod
+    async def _shutdown(lease: KernelLease):
+        try:
+            if await lease.km.is_alive():
+                await lease.km.shutdown_kernel(now=True)
+            await lease.km.cleanup_resources()
+        except Exception as e:
+            logger.warning(f"Fail to shut down the kernel: {e}")
+        if lease.kc is not None:
+            lease.kc.stop_channels()
@@ -16,18 +16,29 @@
 """
 
 import json
+import re
+from pathlib import Path
+from typing import Optional
 
 from pydantic import Field
 from tenacity import retry, stop_after_attempt, wait_random_exponential
 
 from metagpt.actions.action import Action
-from metagpt.actions.project_management_an import REFINED_TASK_LIST, TASK_LIST
+from metagpt.actions.project_management_an import (
+    LOGIC_ANALYSIS,
+    REFINED_LOGIC_ANALYSIS,
+    REFINED_TASK_LIST,
+    TASK_LIST,
+)
 from metagpt.actions.write_code_plan_and_change_an import REFINED_TEMPLATE
 from metagpt.const import BUGFIX_FILENAME, REQUIREMENT_FILENAME
 from metagpt.logs import logger
+from metagpt.provider.base_llm import BaseLLM
 from metagpt.schema import CodingContext, Document, RunCodeResult
+from metagpt.utils.code_context_cache import CODE_CONTEXT_CACHE, CodeSnippet
 from metagpt.utils.common import CodeParser
 from metagpt.utils.project_repo import ProjectRepo
+from metagpt.utils.token_counter import TOKEN_MAX, count_output_tokens
 
 PROMPT_TEMPLATE = """
 NOTICE
@@ -103,41 +114,47 @@ class WriteCode(Action):
             test_detail = RunCodeResult.loads(test_doc.content)
             logs = test_detail.stderr
 
-        if bug_feedback:
-            code_context = coding_context.code_doc.content
-        elif self.config.inc:
-            code_context = await self.get_codes(
-                coding_context.task_doc, exclude=self.i_context.filename, project_repo=self.repo, use_inc=True
-            )
-        else:
-            code_context = await self.get_codes(
-                coding_context.task_doc,
-                exclude=self.i_context.filename,
-                project_repo=self.repo.with_src_path(self.context.src_workspace),
-            )
-
         if self.config.inc:
-            prompt = REFINED_TEMPLATE.format(
+            template = REFINED_TEMPLATE
+            options = dict(
                 user_requirement=requirement_doc.content if requirement_doc else "",
                 code_plan_and_change=str(coding_context.code_plan_and_change_doc),
-                design=coding_context.design_doc.content if coding_context.design_doc else "",
-                task=coding_context.task_doc.content if coding_context.task_doc else "",
-                code=code_context,
-                logs=logs,
-                feedback=bug_feedback.content if bug_feedback else "",
-                filename=self.i_context.filename,
-                summary_log=summary_doc.content if summary_doc else "",
             )
         else:
-            prompt = PROMPT_TEMPLATE.format(
-                design=coding_context.design_doc.content if coding_context.design_doc else "",
-                task=coding_context.task_doc.content if coding_context.task_doc else "",
-                code=code_context,
-                logs=logs,
-                feedback=bug_feedback.content if bug_feedback else "",
-                filename=self.i_context.filename,
-                summary_log=summary_doc.content if summary_doc else "",
-            )
+            template = PROMPT_TEMPLATE
+            options = {}
+        options.update(
+            design=coding_context.design_doc.content if coding_context.design_doc else "",
+            task=coding_context.task_doc.content if coding_context.task_doc else "",
+            logs=logs,
+            feedback=bug_feedback.content if bug_feedback else "",
+            filename=self.i_context.filename,
+            summary_log=summary_doc.content if summary_doc else "",
+        )
+
+        if bug_feedback:
+            code_context = coding_context.code_doc.content
+        else:
+            max_tokens = self.get_code_context_budget(self.llm, template.format(code="", **options))
+            if self.config.inc:
+                code_context = await self.get_codes(
+                    coding_context.task_doc,
+                    exclude=self.i_context.filename,
+                    project_repo=self.repo,
+                    use_inc=True,
+                    max_tokens=max_tokens,
+                    model=self.llm.model,
+                )
+            else:
+                code_context = await self.get_codes(
+                    coding_context.task_doc,
+                    exclude=self.i_context.filename,
+                    project_repo=self.repo.with_src_path(self.context.src_workspace),
+                    max_tokens=max_tokens,
+                    model=self.llm.model,
+                )
+
+        prompt = template.format(code=code_context, **options)
         logger.info(f"Writing {coding_context.filename}..")
         code = await self.write_code(prompt)
         if not coding_context.code_doc:
@@ -148,15 +165,77 @@ class WriteCode(Action):
         return coding_context
 
     @staticmethod
-    async def get_codes(task_doc: Document, exclude: str, project_repo: ProjectRepo, use_inc: bool = False) -> str:
+    def get_code_context_budget(llm: BaseLLM, prompt: str) -> int:
+        """Return the number of tokens left for the code context in the prompt, 0 if the context window is unknown,
+        and -1 if the prompt leaves no room for it, so that all the codes are left out."""
+        max_tokens = TOKEN_MAX.get(llm.model, 0)
+        if not max_tokens:
+            return 0
+        used = count_output_tokens(prompt, llm.model) + llm.config.max_token
+        if used >= max_tokens:
+            logger.warning(
+                f"The prompt and the output take {used} tokens of the {max_tokens} tokens of {llm.model}, "
+                "no room is left for the code context"
+            )
+            return -1
+        return max_tokens - used
+
+    @staticmethod
+    def get_mentioned_files(task_doc: Document, filename: str, candidates: list[str]) -> Optional[set[str]]:
+        """
+        Get the candidates mentioned in the `Logic Analysis` of a file, by their filenames or module names.
+
+        Attributes:
+            task_doc (Document): Document object of the task file.
+            filename (str): The file whose analysis is searched.
+            candidates (list[str]): The filenames to look for.
+
+        Returns:
+            Optional[set[str]]: The mentioned candidates, None if the task file has no analysis for the file.
+        """
+        if not task_doc or not task_doc.content:
+            return None
+        m = json.loads(task_doc.content)
+        logic_analysis = m.get(LOGIC_ANALYSIS.key) or m.get(REFINED_LOGIC_ANALYSIS.key)
+        if not isinstance(logic_analysis, list):  # Legacy format, a plain text analysis
+            return None
+        analysis = {i[0]: str(i[1]) for i in logic_analysis if isinstance(i, list) and len(i) >= 2}
+        desc = analysis.get(filename, analysis.get(Path(filename).name))
+        if desc is None:
+            return None
+        mentioned = set()
+        for i in candidates:
+            if i == filename:
+                continue
+            names = {i, Path(i).name, Path(i).stem}
+            if any(re.search(rf"\b{re.escape(n)}\b", desc) for n in names):
+                mentioned.add(i)
+        return mentioned
+
+    @staticmethod
+    async def get_codes(
+        task_doc: Document,
+        exclude: str,
+        project_repo: ProjectRepo,
+        use_inc: bool = False,
+        max_tokens: int = 0,
+        model: str = "gpt-4",
+    ) -> str:
         """
         Get codes for generating the exclude file in various scenarios.
 
+        The per-file snippets are cached by `CODE_CONTEXT_CACHE` until the files are saved again. If the codes exceed
+        `max_tokens`, the file to be rewritten and the files mentioned in the `Logic Analysis` of the exclude file are
+        kept first, followed by the others in order, and the rest are left out.
+
         Attributes:
             task_doc (Document): Document object of the task file.
             exclude (str): The file to be generated. Specifies the filename to be excluded from the code snippets.
             project_repo (ProjectRepo): ProjectRepo object of the project.
             use_inc (bool): Indicates whether the scenario involves incremental development. Defaults to False.
+            max_tokens (int): The token budget of the codes, 0 means unlimited, a negative one leaves all the codes
+                out. Defaults to 0.
+            model (str): The model used to count tokens. Defaults to "gpt-4".
 
         Returns:
             str: Codes for generating the exclude file.
@@ -164,10 +243,10 @@ class WriteCode(Action):
         if not task_doc:
             return ""
         if not task_doc.content:
-            task_doc = project_repo.docs.task.get(filename=task_doc.filename)
+            task_doc = await project_repo.docs.task.get(filename=task_doc.filename)
         m = json.loads(task_doc.content)
         code_filenames = m.get(TASK_LIST.key, []) if not use_inc else m.get(REFINED_TASK_LIST.key, [])
-        codes = []
+        snippets: list[tuple[str, CodeSnippet]] = []
         src_file_repo = project_repo.srcs
 
         # Incremental development scenario
@@ -186,18 +265,25 @@ class WriteCode(Action):
                     # essential functionality is included for the project’s requirements
                     if filename in old_files and filename != "main.py":
                         # Use old code
-                        doc = await old_file_repo.get(filename=filename)
+                        snippet = await CODE_CONTEXT_CACHE.get_snippet(
+                            old_file_repo.workdir / filename,
+                            prefix=f"-----Now, {filename} to be rewritten\n",
+                            suffix="\n=====",
+                        )
                     # If the file is in the src workspace, skip it
                     else:
                         continue
-                    codes.insert(0, f"-----Now, {filename} to be rewritten\n```{doc.content}```\n=====")
+                    if snippet:
+                        snippets.insert(0, (filename, snippet))
                 # The code snippets are generated from the src workspace
                 else:
-                    doc = await src_file_repo.get(filename=filename)
+                    snippet = await CODE_CONTEXT_CACHE.get_snippet(
+                        src_file_repo.workdir / filename, prefix=f"----- {filename}\n"
+                    )
                     # If the file does not exist in the src workspace, skip it
-                    if not doc:
+                    if not snippet:
                         continue
-                    codes.append(f"----- {filename}\n```{doc.content}```")
+                    snippets.append((filename, snippet))
 
         # Normal scenario
         else:
@@ -205,9 +291,37 @@ class WriteCode(Action):
                 # Exclude the current file to get the code snippets for generating the current file
                 if filename == exclude:
                     continue
-                doc = await src_file_repo.get(filename=filename)
-                if not doc:
+                snippet = await CODE_CONTEXT_CACHE.get_snippet(
+                    src_file_repo.workdir / filename, prefix=f"----- {filename}\n"
+                )
+                if not snippet:
                     continue
-                codes.append(f"----- {filename}\n```{doc.content}```")
+                snippets.append((filename, snippet))
+
+        if max_tokens:
+            snippets = WriteCode._fit_code_snippets(snippets, task_doc, exclude, max_tokens, model)
+        return "\n".join(snippet.text for _, snippet in snippets)
 
-        return "\n".join(codes)
+    @staticmethod
+    def _fit_code_snippets(
+        snippets: list[tuple[str, CodeSnippet]], task_doc: Document, exclude: str, max_tokens: int, model: str
+    ) -> list[tuple[str, CodeSnippet]]:
+        """Select the most relevant snippets within the token budget, the selected ones keep their original order."""
+        if sum(snippet.size + 1 for _, snippet in snippets) <= max_tokens:
+            return snippets
+        tokens = [snippet.count_tokens(model) + 1 for _, snippet in snippets]
+        if sum(tokens) <= max_tokens:
+            return snippets
+        mentioned = WriteCode.get_mentioned_files(task_doc, exclude, [i for i, _ in snippets]) or set()
+        ranks = sorted(
+            range(len(snippets)),
+            key=lambda i: (snippets[i][0] != exclude, snippets[i][0] not in mentioned, i),
+        )
+        selected = set()
+        for i in ranks:
+            if tokens[i] <= max_tokens:
+                selected.add(i)
+                max_tokens -= tokens[i]
+        dropped = [snippets[i][0] for i in range(len(snippets)) if i not in selected]
+        logger.warning(f"Code context exceeds the token budget, leave out: {dropped}")
+        return [snippets[i] for i in sorted(selected)]
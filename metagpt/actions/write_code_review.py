@@ -151,11 +151,16 @@ class WriteCodeReview(Action):
         for i in range(k):
             format_example = FORMAT_EXAMPLE.format(filename=self.i_context.code_doc.filename)
             task_content = self.i_context.task_doc.content if self.i_context.task_doc else ""
+            max_tokens = WriteCode.get_code_context_budget(
+                self.llm, "\n".join([str(self.i_context.design_doc), task_content, iterative_code, format_example])
+            )
             code_context = await WriteCode.get_codes(
                 self.i_context.task_doc,
                 exclude=self.i_context.filename,
                 project_repo=self.repo.with_src_path(self.context.src_workspace),
                 use_inc=self.config.inc,
+                max_tokens=max_tokens,
+                model=self.llm.model,
             )
 
             ctx_list = [
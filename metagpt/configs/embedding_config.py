@@ -35,6 +35,11 @@ class EmbeddingConfig(YamlModel):
     base_url: "YOU_BASE_URL"
     model: "YOU_MODEL"
     dimensions: "YOUR_MODEL_DIMENSIONS"
+
+    api_type: "openai"
+    api_key: "YOU_API_KEY"
+    cache: true
+    cache_path: "YOUR_CACHE_PATH"
     """
 
     api_type: Optional[EmbeddingType] = None
@@ -46,6 +51,9 @@ class EmbeddingConfig(YamlModel):
     embed_batch_size: Optional[int] = None
     dimensions: Optional[int] = None  # output dimension of embedding model
 
+    cache: bool = False  # cache the embeddings on disk by the model and the text hash
+    cache_path: Optional[str] = None  # the SQLite file of the cache, default to data/embedding_cache.sqlite
+
     @field_validator("api_type", mode="before")
     @classmethod
     def check_api_type(cls, v):
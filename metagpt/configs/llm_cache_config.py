@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : llm_cache_config.py
+@Desc    : Config of the opt-in LLM response cache, see `metagpt.provider.llm_cache`.
+"""
+from enum import Enum
+from typing import Optional
+
+from metagpt.configs.redis_config import RedisConfig
+from metagpt.utils.yaml_model import YamlModel
+
+
+class LLMCacheType(Enum):
+    MEMORY = "memory"
+    SQLITE = "sqlite"
+    REDIS = "redis"
+
+
+class LLMCacheConfig(YamlModel):
+    """Config for LLM response cache.
+
+    Examples:
+    ---------
+    llm:
+      cache:
+        cache_type: "sqlite"
+        path: "workspace/llm_cache.sqlite3"
+        max_size: 10000
+        ttl: 86400
+    """
+
+    cache_type: LLMCacheType = LLMCacheType.MEMORY
+    max_size: int = 1000  # max number of cached responses, 0 means unlimited. Redis relies on its own eviction policy.
+    ttl: int = 0  # seconds, 0 means never expire
+    path: str = ""  # for sqlite, default to `DEFAULT_WORKSPACE_ROOT / "llm_cache.sqlite3"`
+    redis: Optional[RedisConfig] = None  # for redis
@@ -10,6 +10,7 @@ from typing import Optional
 
 from pydantic import field_validator
 
+from metagpt.configs.llm_cache_config import LLMCacheConfig
 from metagpt.const import CONFIG_ROOT, LLM_API_TIMEOUT, METAGPT_ROOT
 from metagpt.utils.yaml_model import YamlModel
 
@@ -90,6 +91,9 @@ class LLMConfig(YamlModel):
     # Cost Control
     calc_usage: bool = True
 
+    # Response Cache, disabled if None
+    cache: Optional[LLMCacheConfig] = None
+
     @field_validator("api_key")
     @classmethod
     def check_llm_key(cls, v):
@@ -63,6 +63,7 @@ PROMPT_PATH = SOURCE_ROOT / "prompts"
 SKILL_DIRECTORY = SOURCE_ROOT / "skills"
 TOOL_SCHEMA_PATH = METAGPT_ROOT / "metagpt/tools/schemas"
 TOOL_LIBS_PATH = METAGPT_ROOT / "metagpt/tools/libs"
+TOOL_MANIFEST_PATH = METAGPT_ROOT / "metagpt/tools/tool_manifest.json"
 
 # REAL CONSTS
 
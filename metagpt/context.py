@@ -70,6 +70,7 @@ class Context(BaseModel):
     cost_manager: CostManager = CostManager()
 
     _llm: Optional[BaseLLM] = None
+    _llm_key: Optional[str] = None
 
     def new_environ(self):
         """Return a new os.environ object"""
@@ -88,16 +89,20 @@ class Context(BaseModel):
             return self.cost_manager
 
     def llm(self) -> BaseLLM:
-        """Return a LLM instance, fixme: support cache"""
-        # if self._llm is None:
-        self._llm = create_llm_instance(self.config.llm)
+        """Return the LLM instance of the context, it is cached until `config.llm` changes"""
+        key = self.config.llm.model_dump_json()
+        if self._llm is None or self._llm_key != key:
+            self._llm = create_llm_instance(self.config.llm)
+            self._llm_key = key
         if self._llm.cost_manager is None:
             self._llm.cost_manager = self._select_costmanager(self.config.llm)
         return self._llm
 
     def llm_with_cost_manager_from_llm_config(self, llm_config: LLMConfig) -> BaseLLM:
-        """Return a LLM instance, fixme: support cache"""
-        # if self._llm is None:
+        """Return a new LLM instance.
+        Roles and actions customize their own instance (e.g. `system_prompt`), so it is not cached, the underlying http
+        connections are shared via `HTTP_CLIENT_POOL` instead.
+        """
         llm = create_llm_instance(llm_config)
         if llm.cost_manager is None:
             llm.cost_manager = self._select_costmanager(llm_config)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : adb_session.py
+@Desc    : Long-lived adb shell session and in-memory screen capture of an Android device.
+"""
+from __future__ import annotations
+
+import asyncio
+import queue
+import shlex
+import subprocess
+import threading
+import time
+from typing import Optional
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+UI_DUMP_END = "</hierarchy>"
+
+
+class AdbSession:
+    """Runs the shell commands of a device in one `adb shell` process instead of spawning adb per command.
+
+    Each command is followed by an `echo` of an end mark and its exit code, so the outputs can be told apart and
+    several commands can be written at once and read back in order, see `run_batch`. A command runs by `sh -c` with
+    its stdin from `/dev/null`, so neither a malformed command nor one reading stdin can stall the session. If a
+    command gives no end mark within `timeout` seconds, the session is killed and the commands left run by a new adb
+    process each. Binary outputs such as screenshots go through `adb exec-out`, which returns the raw bytes without
+    any file on the device or locally, it is killed after `timeout` seconds as well.
+    """
+
+    END_MARK = "__MG_ADB_END__"
+
+    def __init__(self, adb_prefix: str = "adb", timeout: float = 30):
+        """`adb_prefix` is the adb command with its global options, e.g. `adb -s emulator-5554`"""
+        self.adb_prefix = adb_prefix
+        self.timeout = timeout
+        self._process: Optional[subprocess.Popen] = None
+        self._lines: Optional[queue.Queue] = None
+        self._lock = threading.Lock()
+
+    @property
+    def adb_args(self) -> list[str]:
+        return shlex.split(self.adb_prefix)
+
+    def _ensure_process(self) -> subprocess.Popen:
+        if self._process is None or self._process.poll() is not None:
+            # stdin is not a tty, so adb runs the remote shell without a pty and the outputs are not mangled
+            self._process = subprocess.Popen(
+                self.adb_args + ["shell"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+            # a blocking `readline` cannot time out, the lines are read by a thread and waited for with a deadline
+            self._lines = queue.Queue()
+            threading.Thread(target=self._read_lines, args=(self._process, self._lines), daemon=True).start()
+        return self._process
+
+    @staticmethod
+    def _read_lines(process: subprocess.Popen, lines: queue.Queue):
+        for line in iter(process.stdout.readline, b""):
+            lines.put(line)
+        lines.put(b"")
+
+    def _read_result(self, deadline: float) -> tuple[int, str]:
+        lines = []
+        while True:
+            try:
+                line = self._lines.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                raise TimeoutError(f"adb shell gave no result in {self.timeout} seconds")
+            if not line:
+                raise EOFError("adb shell exited")
+            text = line.decode("utf-8", errors="replace")
+            index = text.find(self.END_MARK)
+            if index < 0:
+                lines.append(text)
+                continue
+            # the output of the command may not end with a newline, the end mark follows it on the same line
+            lines.append(text[:index])
+            code = text[index + len(self.END_MARK) :].strip()
+            return int(code) if code.lstrip("-").isdigit() else -1, "".join(lines)
+
+    def run(self, cmd: str) -> tuple[int, str]:
+        """Run a shell command on the device, return its exit code and stdout"""
+        return self.run_batch([cmd])[0]
+
+    def run_batch(self, cmds: list[str]) -> list[tuple[int, str]]:
+        """Write all the commands in one go and read their results in order, -1 if the session broke"""
+        results = []
+        with self._lock:
+            try:
+                process = self._ensure_process()
+                script = "".join(f"sh -c {shlex.quote(cmd)} </dev/null\necho {self.END_MARK}$?\n" for cmd in cmds)
+                process.stdin.write(script.encode("utf-8"))
+                process.stdin.flush()
+                for _ in cmds:
+                    results.append(self._read_result(deadline=time.monotonic() + self.timeout))
+            except TimeoutError:
+                # the command timed out is not run again, it may have taken effect
+                self._close()
+                results.append((-1, ""))
+                results.extend(self._run_once(cmd) for cmd in cmds[len(results) :])
+            except (OSError, EOFError):
+                # the outputs of the remaining commands are lost, restart the session on the next call
+                self._close()
+                results.extend([(-1, "")] * (len(cmds) - len(results)))
+        return results
+
+    def _run_once(self, cmd: str) -> tuple[int, str]:
+        """Run a shell command by a new adb process"""
+        try:
+            res = subprocess.run(
+                self.adb_args + ["shell", cmd],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                timeout=self.timeout,
+            )
+        except subprocess.TimeoutExpired:
+            return -1, ""
+        return res.returncode, res.stdout.decode("utf-8", errors="replace")
+
+    def exec_out(self, cmd: str) -> Optional[bytes]:
+        """Run a command by `adb exec-out`, return its raw stdout, None if failed or timed out"""
+        try:
+            res = subprocess.run(
+                self.adb_args + ["exec-out", cmd],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                timeout=self.timeout,
+            )
+        except subprocess.TimeoutExpired:
+            return None
+        return None if res.returncode else res.stdout
+
+    def screencap(self) -> Optional[bytes]:
+        """Return the screenshot as png bytes, None if failed"""
+        data = self.exec_out("screencap -p")
+        return data if data and data.startswith(PNG_SIGNATURE) else None
+
+    def dump_ui(self) -> Optional[str]:
+        """Return the xml of the view hierarchy, None if failed"""
+        code, output = self.run("uiautomator dump /dev/tty")
+        return self._parse_ui_dump(output) if not code else None
+
+    @staticmethod
+    def _parse_ui_dump(output: str) -> Optional[str]:
+        # the xml is followed by `UI hierchary dumped to: /dev/tty`
+        start, end = output.find("<?xml"), output.rfind(UI_DUMP_END)
+        if start < 0 or end < 0:
+            return None
+        return output[start : end + len(UI_DUMP_END)]
+
+    async def arun(self, cmd: str) -> tuple[int, str]:
+        return (await self.arun_batch([cmd]))[0]
+
+    async def arun_batch(self, cmds: list[str]) -> list[tuple[int, str]]:
+        return await asyncio.to_thread(self.run_batch, cmds)
+
+    async def aexec_out(self, cmd: str) -> Optional[bytes]:
+        process = await asyncio.create_subprocess_exec(
+            *self.adb_args,
+            "exec-out",
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), self.timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            return None
+        return None if process.returncode else stdout
+
+    async def ascreencap(self) -> Optional[bytes]:
+        data = await self.aexec_out("screencap -p")
+        return data if data and data.startswith(PNG_SIGNATURE) else None
+
+    async def adump_ui(self) -> Optional[str]:
+        code, output = await self.arun("uiautomator dump /dev/tty")
+        return self._parse_ui_dump(output) if not code else None
+
+    def _close(self):
+        if self._process is None:
+            return
+        if self._process.poll() is None:
+            try:
+                self._process.stdin.close()
+                self._process.wait(timeout=1)
+            except (OSError, subprocess.TimeoutExpired):
+                self._process.kill()
+                self._process.wait()
+        self._process = None
+        self._lines = None
+
+    def close(self):
+        with self._lock:
+            self._close()
@@ -1,8 +1,10 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 # @Desc   : The Android external environment to integrate with Android apps
+import asyncio
+import shlex
 import subprocess
-import time
+from io import BytesIO
 from pathlib import Path
 from typing import Any, Optional
 
@@ -10,9 +12,10 @@ import clip
 from modelscope.pipelines import pipeline
 from modelscope.utils.constant import Tasks
 from PIL import Image
-from pydantic import Field
+from pydantic import Field, PrivateAttr
 
 from metagpt.const import DEFAULT_WORKSPACE_ROOT
+from metagpt.environment.android.adb_session import AdbSession
 from metagpt.environment.android.const import ADB_EXEC_FAIL
 from metagpt.environment.android.env_space import (
     EnvAction,
@@ -44,6 +47,7 @@ def load_cv_model(device: str = "cpu") -> any:
 
 
 class AndroidExtEnv(ExtEnv):
+    adb_path: str = Field(default="adb", description="adb executable")
     device_id: Optional[str] = Field(default=None)
     screenshot_dir: Optional[Path] = Field(default=None)
     xml_dir: Optional[Path] = Field(default=None)
@@ -53,6 +57,8 @@ class AndroidExtEnv(ExtEnv):
     ocr_recognition: any = Field(default=None, description="ocr recognition model")
     groundingdino_model: any = Field(default=None, description="clip groundingdino model")
 
+    _adb_session: Optional[AdbSession] = PrivateAttr(default=None)
+
     def __init__(self, **data: Any):
         super().__init__(**data)
         device_id = data.get("device_id")
@@ -100,6 +106,18 @@ class AndroidExtEnv(ExtEnv):
         ret = (obs, 1.0, False, False, {"res": res})
         return ret
 
+    async def aobserve(self, obs_params: Optional[EnvObsParams] = None) -> Any:
+        obs_type = obs_params.obs_type if obs_params else EnvObsType.NONE
+        if obs_type == EnvObsType.GET_SCREENSHOT:
+            return await self.aget_screenshot(ss_name=obs_params.ss_name, local_save_dir=obs_params.local_save_dir)
+        elif obs_type == EnvObsType.GET_XML:
+            return await self.aget_xml(xml_name=obs_params.xml_name, local_save_dir=obs_params.local_save_dir)
+        return await asyncio.to_thread(self.observe, obs_params)
+
+    async def astep(self, action: EnvAction) -> tuple[dict[str, Any], float, bool, bool, dict[str, Any]]:
+        # the adb session is thread-safe, the actions are short shell commands
+        return await asyncio.to_thread(self.step, action)
+
     def _execute_env_action(self, action: EnvAction):
         action_type = action.action_type
         res = None
@@ -122,26 +140,66 @@ class AndroidExtEnv(ExtEnv):
     @property
     def adb_prefix_si(self):
         """adb cmd prefix with `device_id` and `shell input`"""
-        return f"adb -s {self.device_id} shell input "
+        return f"{self.adb_path} -s {self.device_id} shell input "
 
     @property
     def adb_prefix_shell(self):
         """adb cmd prefix with `device_id` and `shell`"""
-        return f"adb -s {self.device_id} shell "
+        return f"{self.adb_path} -s {self.device_id} shell "
 
     @property
     def adb_prefix(self):
         """adb cmd prefix with `device_id`"""
-        return f"adb -s {self.device_id} "
+        return f"{self.adb_path} -s {self.device_id} "
+
+    @property
+    def adb_session(self) -> AdbSession:
+        """The long-lived `adb shell` of the device"""
+        adb_prefix = self.adb_prefix.strip()
+        if self._adb_session is None or self._adb_session.adb_prefix != adb_prefix:
+            if self._adb_session:
+                self._adb_session.close()
+            self._adb_session = AdbSession(adb_prefix)
+        return self._adb_session
+
+    def close(self):
+        if self._adb_session:
+            self._adb_session.close()
+            self._adb_session = None
+
+    def _split_shell_cmd(self, adb_cmd: str) -> Optional[str]:
+        """Return the shell command if `adb_cmd` runs one on the device, otherwise None"""
+        if self.device_id and adb_cmd.startswith(self.adb_prefix_shell):
+            return adb_cmd[len(self.adb_prefix_shell) :].strip()
+        return None
 
     def execute_adb_with_cmd(self, adb_cmd: str) -> str:
         adb_cmd = adb_cmd.replace("\\", "/")
+        shell_cmd = self._split_shell_cmd(adb_cmd)
+        if shell_cmd:
+            code, output = self.adb_session.run(shell_cmd)
+            return output.strip() if not code else ADB_EXEC_FAIL
+
         res = subprocess.run(adb_cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
         exec_res = ADB_EXEC_FAIL
         if not res.returncode:
             exec_res = res.stdout.strip()
         return exec_res
 
+    async def aexecute_adb_with_cmd(self, adb_cmd: str) -> str:
+        adb_cmd = adb_cmd.replace("\\", "/")
+        shell_cmd = self._split_shell_cmd(adb_cmd)
+        if shell_cmd:
+            code, output = await self.adb_session.arun(shell_cmd)
+            return output.strip() if not code else ADB_EXEC_FAIL
+
+        process = await asyncio.create_subprocess_shell(adb_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stdout, _ = await process.communicate()
+        exec_res = ADB_EXEC_FAIL
+        if not process.returncode:
+            exec_res = stdout.decode("utf-8", errors="replace").strip()
+        return exec_res
+
     def create_device_path(self, folder_path: Path):
         adb_cmd = f"{self.adb_prefix_shell} mkdir {folder_path} -p"
         res = self.execute_adb_with_cmd(adb_cmd)
@@ -166,53 +224,83 @@ class AndroidExtEnv(ExtEnv):
             devices = [device.split()[0] for device in devices]
         return devices
 
+    def screencap(self) -> Optional[bytes]:
+        """Return the current screen as png bytes, captured in memory by `adb exec-out`"""
+        return self.adb_session.screencap()
+
+    @mark_as_readable
+    def get_screenshot_image(self) -> Optional[Image.Image]:
+        image = self.screencap()
+        return Image.open(BytesIO(image)) if image else None
+
     @mark_as_readable
     def get_screenshot(self, ss_name: str, local_save_dir: Path) -> Path:
         """
         ss_name: screenshot file name
         local_save_dir: local dir to store image from virtual machine
         """
+        ss_local_path = Path(local_save_dir).joinpath(f"{ss_name}.png")
+        image = self.screencap()
+        if image:
+            ss_local_path.write_bytes(image)
+            return ss_local_path
+        return self._pull_screenshot(ss_name, ss_local_path)
+
+    def _pull_screenshot(self, ss_name: str, ss_local_path: Path) -> Path:
+        """Fallback of the devices without `exec-out`, capture the screen into the device storage and pull it"""
         assert self.screenshot_dir
         ss_remote_path = Path(self.screenshot_dir).joinpath(f"{ss_name}.png")
         ss_cmd = f"{self.adb_prefix_shell} screencap -p {ss_remote_path}"
-        ss_res = self.execute_adb_with_cmd(ss_cmd)
-        time.sleep(0.1)
         res = ADB_EXEC_FAIL
-        if ss_res != ADB_EXEC_FAIL:
-            ss_local_path = Path(local_save_dir).joinpath(f"{ss_name}.png")
+        if self.execute_adb_with_cmd(ss_cmd) != ADB_EXEC_FAIL:
             pull_cmd = f"{self.adb_prefix} pull {ss_remote_path} {ss_local_path}"
-            pull_res = self.execute_adb_with_cmd(pull_cmd)
-            time.sleep(0.1)
-            if pull_res != ADB_EXEC_FAIL:
+            if self.execute_adb_with_cmd(pull_cmd) != ADB_EXEC_FAIL:
                 res = ss_local_path
         else:
-            ss_cmd = f"{self.adb_prefix_shell} rm /sdcard/{ss_name}.png"
-            ss_res = self.execute_adb_with_cmd(ss_cmd)
-            time.sleep(0.1)
-            ss_cmd = f"{self.adb_prefix_shell} screencap -p /sdcard/{ss_name}.png"
-            ss_res = self.execute_adb_with_cmd(ss_cmd)
-            time.sleep(0.1)
-            ss_cmd = f"{self.adb_prefix} pull /sdcard/{ss_name}.png {self.screenshot_dir}"
-            ss_res = self.execute_adb_with_cmd(ss_cmd)
-            image_path = Path(f"{self.screenshot_dir}/{ss_name}.png")
-            res = image_path
+            # retry through the sdcard, where `screenshot_dir` is not writable
+            self.execute_adb_with_cmd(f"{self.adb_prefix_shell} rm /sdcard/{ss_name}.png")
+            self.execute_adb_with_cmd(f"{self.adb_prefix_shell} screencap -p /sdcard/{ss_name}.png")
+            self.execute_adb_with_cmd(f"{self.adb_prefix} pull /sdcard/{ss_name}.png {self.screenshot_dir}")
+            res = Path(f"{self.screenshot_dir}/{ss_name}.png")
         return Path(res)
 
+    @mark_as_readable
+    async def aget_screenshot(self, ss_name: str, local_save_dir: Path) -> Path:
+        ss_local_path = Path(local_save_dir).joinpath(f"{ss_name}.png")
+        image = await self.adb_session.ascreencap()
+        if image:
+            ss_local_path.write_bytes(image)
+            return ss_local_path
+        return await asyncio.to_thread(self._pull_screenshot, ss_name, ss_local_path)
+
     @mark_as_readable
     def get_xml(self, xml_name: str, local_save_dir: Path) -> Path:
+        xml_local_path = Path(local_save_dir).joinpath(f"{xml_name}.xml")
+        xml = self.adb_session.dump_ui()
+        if xml:
+            xml_local_path.write_text(xml, encoding="utf-8")
+            return xml_local_path
+        return self._pull_xml(xml_name, xml_local_path)
+
+    def _pull_xml(self, xml_name: str, xml_local_path: Path) -> Path:
         xml_remote_path = Path(self.xml_dir).joinpath(f"{xml_name}.xml")
         dump_cmd = f"{self.adb_prefix_shell} uiautomator dump {xml_remote_path}"
-        xml_res = self.execute_adb_with_cmd(dump_cmd)
-
         res = ADB_EXEC_FAIL
-        if xml_res != ADB_EXEC_FAIL:
-            xml_local_path = Path(local_save_dir).joinpath(f"{xml_name}.xml")
+        if self.execute_adb_with_cmd(dump_cmd) != ADB_EXEC_FAIL:
             pull_cmd = f"{self.adb_prefix} pull {xml_remote_path} {xml_local_path}"
-            pull_res = self.execute_adb_with_cmd(pull_cmd)
-            if pull_res != ADB_EXEC_FAIL:
+            if self.execute_adb_with_cmd(pull_cmd) != ADB_EXEC_FAIL:
                 res = xml_local_path
         return Path(res)
 
+    @mark_as_readable
+    async def aget_xml(self, xml_name: str, local_save_dir: Path) -> Path:
+        xml_local_path = Path(local_save_dir).joinpath(f"{xml_name}.xml")
+        xml = await self.adb_session.adump_ui()
+        if xml:
+            xml_local_path.write_text(xml, encoding="utf-8")
+            return xml_local_path
+        return await asyncio.to_thread(self._pull_xml, xml_name, xml_local_path)
+
     @mark_as_writeable
     def system_back(self) -> str:
         adb_cmd = f"{self.adb_prefix_si} keyevent KEYCODE_BACK"
@@ -228,7 +316,7 @@ class AndroidExtEnv(ExtEnv):
     @mark_as_writeable
     def user_input(self, input_txt: str) -> str:
         input_txt = input_txt.replace(" ", "%s").replace("'", "")
-        adb_cmd = f"{self.adb_prefix_si} text {input_txt}"
+        adb_cmd = f"{self.adb_prefix_si} text {shlex.quote(input_txt)}"
         input_res = self.execute_adb_with_cmd(adb_cmd)
         return input_res
 
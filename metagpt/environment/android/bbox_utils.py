@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : bbox_utils.py
+@Desc    : Vectorized bounding box math of the UI elements and the detected text/icon boxes.
+"""
+from typing import Optional
+
+import numpy as np
+
+
+def as_boxes(boxes) -> np.ndarray:
+    """Return the boxes as an int64 array of shape (n, 4), each row is `x1, y1, x2, y2`"""
+    return np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+
+
+def box_areas(boxes: np.ndarray) -> np.ndarray:
+    return (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+
+def box_centers(boxes: np.ndarray) -> np.ndarray:
+    """Integer centers of the boxes, the same as `(x1 + x2) // 2, (y1 + y2) // 2`"""
+    return np.stack([(boxes[:, 0] + boxes[:, 2]) // 2, (boxes[:, 1] + boxes[:, 3]) // 2], axis=1)
+
+
+def center_distance_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Euclidean distances between the centers of each box of `boxes_a` and each box of `boxes_b`"""
+    delta = box_centers(boxes_a)[:, None, :] - box_centers(boxes_b)[None, :, :]
+    return np.sqrt((delta**2).sum(axis=-1))
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """IoU of each box of `boxes_a` with each box of `boxes_b`, 0 for the degenerate pairs"""
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    inter = np.clip(bottom_right - top_left, 0, None).prod(axis=-1)
+    union = box_areas(boxes_a)[:, None] + box_areas(boxes_b)[None, :] - inter
+    with np.errstate(divide="ignore", invalid="ignore"):
+        iou = inter / union
+    return np.nan_to_num(iou, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def greedy_keep(suppress: np.ndarray, suppressed: Optional[np.ndarray] = None) -> np.ndarray:
+    """Keep the boxes in order, a box is dropped if an earlier kept box suppresses it.
+
+    `suppress[i, j]` tells whether box i suppresses box j, `suppressed` marks the boxes dropped beforehand.
+    """
+    n = suppress.shape[0]
+    suppressed = np.zeros(n, dtype=bool) if suppressed is None else suppressed.copy()
+    keep = np.zeros(n, dtype=bool)
+    for i in range(n):
+        if suppressed[i]:
+            continue
+        keep[i] = True
+        suppressed[i + 1 :] |= suppress[i, i + 1 :]
+    return keep
+
+
+def dedup_by_center(boxes: np.ndarray, min_dist: float, kept_boxes: Optional[np.ndarray] = None) -> np.ndarray:
+    """Return the mask of the boxes whose centers are farther than `min_dist` from the earlier kept ones"""
+    if not len(boxes):
+        return np.zeros(0, dtype=bool)
+    suppressed = None
+    if kept_boxes is not None and len(kept_boxes):
+        suppressed = (center_distance_matrix(kept_boxes, boxes) <= min_dist).any(axis=0)
+    return greedy_keep(center_distance_matrix(boxes, boxes) <= min_dist, suppressed)
+
+
+def nms_in_order(boxes: np.ndarray, iou_threshold: float, max_area: Optional[float] = None) -> np.ndarray:
+    """Return the mask of the boxes kept by a greedy non-maximum suppression in the given order.
+
+    The boxes larger than `max_area` are dropped first and never suppress the others.
+    """
+    if not len(boxes):
+        return np.zeros(0, dtype=bool)
+    suppressed = box_areas(boxes) > max_area if max_area is not None else None
+    return greedy_keep(iou_matrix(boxes, boxes) >= iou_threshold, suppressed)
@@ -14,6 +14,8 @@ from groundingdino.util.slconfig import SLConfig
 from groundingdino.util.utils import clean_state_dict, get_phrases_from_posmap
 from PIL import Image
 
+from metagpt.environment.android.bbox_utils import as_boxes, nms_in_order
+
 ################################## text_localization using ocr #######################
 
 
@@ -103,10 +105,13 @@ def ocr(image_path: Path, prompt: str, ocr_detection: any, ocr_recognition: any,
     image_full = cv2.imread(str(image_path))
     det_result = ocr_detection(image_full)
     det_result = det_result["polygons"]
+    # recognize each detected text once, the fuzzy matching below reuses the results
+    recognized = []
     for i in range(det_result.shape[0]):
         pts = order_point(det_result[i])
         image_crop = crop_image(image_full, pts)
         result = ocr_recognition(image_crop)["text"][0]
+        recognized.append((pts, result))
 
         if result == prompt:
             box = [int(e) for e in list(pts.reshape(-1))]
@@ -134,11 +139,7 @@ def ocr(image_path: Path, prompt: str, ocr_detection: any, ocr_recognition: any,
 
     max_length = 0
     if len(text_data) == 0:
-        for i in range(det_result.shape[0]):
-            pts = order_point(det_result[i])
-            image_crop = crop_image(image_full, pts)
-            result = ocr_recognition(image_crop)["text"][0]
-
+        for pts, result in recognized:
             if len(result) < 0.3 * len(prompt):
                 continue
 
@@ -207,6 +208,14 @@ def calculate_iou(box1: list, box2: list) -> float:
     return iou
 
 
+def pad_boxes(boxes: np.ndarray, padding: int, size: tuple[int, int]) -> np.ndarray:
+    """Enlarge the boxes by `padding` pixels on each side, clipped to the image of `size`"""
+    padded = boxes + np.array([-padding, -padding, padding, padding])
+    padded[:, :2] = np.maximum(padded[:, :2], 0)
+    padded[:, 2:] = np.minimum(padded[:, 2:], size)
+    return padded
+
+
 def in_box(box: list, target: list) -> bool:
     if (box[0] > target[0]) and (box[1] > target[1]) and (box[2] < target[2]) and (box[3] < target[3]):
         return True
@@ -308,25 +317,8 @@ def get_grounding_output(
 
 
 def remove_boxes(boxes_filt: any, size: any, iou_threshold: float = 0.5) -> any:
-    boxes_to_remove = set()
-
-    for i in range(len(boxes_filt)):
-        if calculate_size(boxes_filt[i]) > 0.05 * size[0] * size[1]:
-            boxes_to_remove.add(i)
-        for j in range(len(boxes_filt)):
-            if calculate_size(boxes_filt[j]) > 0.05 * size[0] * size[1]:
-                boxes_to_remove.add(j)
-            if i == j:
-                continue
-            if i in boxes_to_remove or j in boxes_to_remove:
-                continue
-            iou = calculate_iou(boxes_filt[i], boxes_filt[j])
-            if iou >= iou_threshold:
-                boxes_to_remove.add(j)
-
-    boxes_filt = [box for idx, box in enumerate(boxes_filt) if idx not in boxes_to_remove]
-
-    return boxes_filt
+    keep = nms_in_order(as_boxes(boxes_filt), iou_threshold, max_area=0.05 * size[0] * size[1])
+    return [box for box, kept in zip(boxes_filt, keep) if kept]
 
 
 def det(
@@ -348,21 +340,14 @@ def det(
     )
 
     H, W = size[1], size[0]
-    for i in range(boxes_filt.size(0)):
-        boxes_filt[i] = boxes_filt[i] * torch.Tensor([W, H, W, H])
-        boxes_filt[i][:2] -= boxes_filt[i][2:] / 2
-        boxes_filt[i][2:] += boxes_filt[i][:2]
+    # (cx, cy, w, h) relative to the image -> (x1, y1, x2, y2) in pixels
+    boxes_filt = boxes_filt * torch.Tensor([W, H, W, H])
+    boxes_filt[:, :2] -= boxes_filt[:, 2:] / 2
+    boxes_filt[:, 2:] += boxes_filt[:, :2]
 
     boxes_filt = boxes_filt.cpu().int().tolist()
-    filtered_boxes = remove_boxes(boxes_filt, size)  # [:9]
-    coordinate = []
-    image_data = []
-    for box in filtered_boxes:
-        image_data.append(
-            [max(0, box[0] - 10), max(0, box[1] - 10), min(box[2] + 10, size[0]), min(box[3] + 10, size[1])]
-        )
-        coordinate.append(
-            [max(0, box[0] - 25), max(0, box[1] - 25), min(box[2] + 25, size[0]), min(box[3] + 25, size[1])]
-        )
+    filtered_boxes = as_boxes(remove_boxes(boxes_filt, size))  # [:9]
+    image_data = pad_boxes(filtered_boxes, 10, size).tolist()
+    coordinate = pad_boxes(filtered_boxes, 25, size).tolist()
 
     return image_data, coordinate
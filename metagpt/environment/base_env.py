@@ -4,13 +4,33 @@
 
 import asyncio
 from abc import abstractmethod
+from collections import deque
 from enum import Enum
-from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional, Set, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Optional,
+    Set,
+    Union,
+)
 
 from gymnasium import spaces
 from gymnasium.core import ActType, ObsType
-from pydantic import BaseModel, ConfigDict, Field, SerializeAsAny, model_validator
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    PrivateAttr,
+    SerializeAsAny,
+    computed_field,
+    model_validator,
+)
 
+from metagpt.const import MESSAGE_ROUTE_TO_ALL
 from metagpt.context import Context
 from metagpt.environment.api.env_api import (
     EnvAPIAbstract,
@@ -20,7 +40,7 @@ from metagpt.environment.api.env_api import (
 from metagpt.environment.base_env_space import BaseEnvAction, BaseEnvObsParams
 from metagpt.logs import logger
 from metagpt.schema import Message
-from metagpt.utils.common import get_function_schema, is_coroutine_func, is_send_to
+from metagpt.utils.common import get_function_schema, is_coroutine_func
 
 if TYPE_CHECKING:
     from metagpt.roles.role import Role  # noqa: F401
@@ -131,9 +151,22 @@ class Environment(ExtEnv):
     desc: str = Field(default="")  # 环境描述
     roles: dict[str, SerializeAsAny["Role"]] = Field(default_factory=dict, validate_default=True)
     member_addrs: Dict["Role", Set] = Field(default_factory=dict, exclude=True)
-    history: str = ""  # For debug
+    history_size: int = 1000  # The number of the latest messages kept in `history`, 0 means unlimited
     context: Context = Field(default_factory=Context, exclude=True)
 
+    # address -> roles, the inverted index of `member_addrs` maintained by `set_addresses`, used to route messages.
+    _addr_index: Dict[str, Dict["Role", None]] = PrivateAttr(default_factory=dict)
+    # The position of each member in `member_addrs`, to deliver a message to several addresses in the member order.
+    _member_order: Dict["Role", int] = PrivateAttr(default_factory=dict)
+    # The published messages for debugging, a ring buffer of `history_size`.
+    _history: Deque[str] = PrivateAttr(default_factory=deque)
+
+    # Roles which have pending messages or actions, in the order they became ready. Roles are marked ready by
+    # `Role.put_message`, and removed after they run and become idle.
+    _ready: dict["Role", None] = PrivateAttr(default_factory=dict)
+    # Set when a role becomes ready, it wakes up the event-driven scheduler of `run_until_idle`.
+    _ready_event: Optional[asyncio.Event] = PrivateAttr(default=None)
+
     def reset(
         self,
         *,
@@ -148,11 +181,27 @@ class Environment(ExtEnv):
     def step(self, action: BaseEnvAction) -> tuple[dict[str, Any], float, bool, bool, dict[str, Any]]:
         pass
 
+    @model_validator(mode="wrap")
+    @classmethod
+    def restore_history(cls, data: Any, handler):
+        history = data.get("history", "") if isinstance(data, dict) else ""
+        env = handler(data)
+        if history:
+            env._history.append(history[1:] if history.startswith("\n") else history)
+        return env
+
     @model_validator(mode="after")
     def init_roles(self):
+        self._history = deque(self._history, maxlen=self.history_size or None)
         self.add_roles(self.roles.values())
         return self
 
+    @computed_field
+    @property
+    def history(self) -> str:
+        """The latest published messages, for debug"""
+        return "".join(f"\n{i}" for i in self._history)
+
     def add_role(self, role: "Role"):
         """增加一个在当前环境的角色
         Add a role in the current environment
@@ -160,6 +209,7 @@ class Environment(ExtEnv):
         self.roles[role.profile] = role
         role.set_env(self)
         role.context = self.context
+        self._update_ready(role)
 
     def add_roles(self, roles: Iterable["Role"]):
         """增加一批在当前环境的角色
@@ -171,6 +221,7 @@ class Environment(ExtEnv):
         for role in roles:  # setup system message with roles
             role.context = self.context
             role.set_env(self)
+            self._update_ready(role)
 
     def publish_message(self, message: Message, peekable: bool = True) -> bool:
         """
@@ -182,31 +233,96 @@ class Environment(ExtEnv):
         in RFC 113.
         """
         logger.debug(f"publish_message: {message.dump()}")
-        found = False
         # According to the routing feature plan in Chapter 2.2.3.2 of RFC 113
-        for role, addrs in self.member_addrs.items():
-            if is_send_to(message, addrs):
-                role.put_message(message)
-                found = True
-        if not found:
+        if MESSAGE_ROUTE_TO_ALL in message.send_to:
+            recipients = self.member_addrs.keys()
+        elif len(message.send_to) == 1:
+            recipients = self._addr_index.get(next(iter(message.send_to)), {}).keys()
+        else:
+            recipients = {}
+            for addr in message.send_to:
+                recipients.update(self._addr_index.get(addr, {}))
+            # Deliver in the order of members, the same as a single address does
+            recipients = sorted(recipients, key=self._member_order.get)
+        for role in recipients:
+            role.put_message(message)
+        if not recipients:
             logger.warning(f"Message no recipients: {message.dump()}")
-        self.history += f"\n{message}"  # For debug
+        self._history.append(str(message))  # For debug
 
         return True
 
     async def run(self, k=1):
         """处理一次所有信息的运行
-        Process all Role runs at once
+        Process all Role runs at once, every role runs in each round, as a role may act without new messages, e.g.
+        the roles of Stanford Town. Use `run_until_idle` to run only the roles which received messages.
         """
         for _ in range(k):
             futures = []
             for role in self.roles.values():
-                future = role.run()
+                future = self._run_role(role)
                 futures.append(future)
 
             await asyncio.gather(*futures)
             logger.debug(f"is idle: {self.is_idle}")
 
+    async def run_until_idle(self, max_runs_per_role: int = 0, before_run: Optional[Callable[[], None]] = None):
+        """Event-driven scheduling, instead of lock-step rounds, a role runs as soon as it receives messages.
+
+        Args:
+            max_runs_per_role: The maximum number of runs of each role, 0 means unlimited. It plays the role of `k` in
+                `run`, where a role runs once at most per round.
+            before_run: Called before each run of a role, e.g. to check the budget. Exceptions raised by it stop the
+                scheduling.
+        """
+        self._ready_event = asyncio.Event()
+        runs: dict["Role", int] = {}
+        running: dict["Role", asyncio.Task] = {}
+        try:
+            while True:
+                # A recovered role resumes its latest observed message on the first run, even if it is idle.
+                recovered = [i for i in self.roles.values() if i.recovered and i not in runs]
+                for role in recovered + list(self._ready):
+                    if role in running or (max_runs_per_role and runs.get(role, 0) >= max_runs_per_role):
+                        continue
+                    if before_run:
+                        before_run()
+                    runs[role] = runs.get(role, 0) + 1
+                    running[role] = asyncio.create_task(self._run_role(role))
+                if not running:
+                    break
+                self._ready_event.clear()
+                waiter = asyncio.create_task(self._ready_event.wait())
+                await asyncio.wait([*running.values(), waiter], return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                for role, task in list(running.items()):
+                    if task.done():
+                        del running[role]
+                        task.result()
+        finally:
+            for task in running.values():
+                task.cancel()
+            self._ready_event = None
+        logger.debug(f"is idle: {self.is_idle}")
+
+    async def _run_role(self, role: "Role"):
+        try:
+            await role.run()
+        finally:
+            self._update_ready(role)
+
+    def mark_ready(self, role: "Role"):
+        """Mark the role as ready to run, it is called when the role receives messages."""
+        self._ready[role] = None
+        if self._ready_event:
+            self._ready_event.set()
+
+    def _update_ready(self, role: "Role"):
+        if role.is_idle:
+            self._ready.pop(role, None)
+        else:
+            self.mark_ready(role)
+
     def get_roles(self) -> dict[str, "Role"]:
         """获得环境内的所有角色
         Process all Role runs at once
@@ -224,10 +340,15 @@ class Environment(ExtEnv):
 
     @property
     def is_idle(self):
-        """If true, all actions have been executed."""
-        for r in self.roles.values():
-            if not r.is_idle:
+        """If true, all actions have been executed.
+
+        Only the ready roles are checked, and the idle ones are dropped from them, in case they were run by a subclass
+        without `_run_role`. So it costs O(1) amortized instead of checking every role.
+        """
+        for role in list(self._ready):
+            if not role.is_idle:
                 return False
+            self._ready.pop(role, None)
         return True
 
     def get_addresses(self, obj):
@@ -236,7 +357,15 @@ class Environment(ExtEnv):
 
     def set_addresses(self, obj, addresses):
         """Set the addresses of the object"""
+        for addr in self.member_addrs.get(obj, set()):
+            roles = self._addr_index.get(addr, {})
+            roles.pop(obj, None)
+            if not roles:
+                self._addr_index.pop(addr, None)
         self.member_addrs[obj] = addresses
+        self._member_order.setdefault(obj, len(self._member_order))
+        for addr in addresses:
+            self._addr_index.setdefault(addr, {})[obj] = None
 
     def archive(self, auto_archive=True):
         if auto_archive and self.context.git_repo:
@@ -3,9 +3,9 @@
 # @Desc   : MG Minecraft Env
 #           refs to `voyager voyager.py`
 
+import asyncio
 import json
 import re
-import time
 from typing import Any, Iterable
 
 from llama_index.vector_stores.chroma import ChromaVectorStore
@@ -253,7 +253,7 @@ class MinecraftEnv(MinecraftExtEnv, Environment):
         # revert all the placing event in the last step
         pass
 
-    def update_exploration_progress(self, success: bool):
+    async def update_exploration_progress(self, success: bool):
         """
         Split task into completed_tasks or failed_tasks
         Args: info = {
@@ -282,7 +282,7 @@ class MinecraftEnv(MinecraftExtEnv, Environment):
                     position = event["status"]["position"]
                     blocks.append(block)
                     positions.append(position)
-            new_events = self._step(
+            new_events = await self._step(
                 f"await givePlacedItemBack(bot, {json.dumps(blocks)}, {json.dumps(positions)})",
                 programs=self.programs,
             )
@@ -323,7 +323,7 @@ class MinecraftEnv(MinecraftExtEnv, Environment):
                 Exception: If there is an issue retrieving events.
         """
         try:
-            self._reset(
+            await self._reset(
                 options={
                     "mode": "soft",
                     "wait_ticks": 20,
@@ -332,13 +332,15 @@ class MinecraftEnv(MinecraftExtEnv, Environment):
             # difficulty = "easy" if len(self.completed_tasks) > 15 else "peaceful"
             difficulty = "peaceful"
 
-            events = self._step("bot.chat(`/time set ${getNextTime()}`);\n" + f"bot.chat('/difficulty {difficulty}');")
+            events = await self._step(
+                "bot.chat(`/time set ${getNextTime()}`);\n" + f"bot.chat('/difficulty {difficulty}');"
+            )
             self.update_event(events)
             return events
         except Exception as e:
-            time.sleep(3)  # wait for mineflayer to exit
+            await asyncio.sleep(3)  # wait for mineflayer to exit
             # reset bot status here
-            events = self._reset(
+            events = await self._reset(
                 options={
                     "mode": "hard",
                     "wait_ticks": 20,
@@ -365,16 +367,16 @@ class MinecraftEnv(MinecraftExtEnv, Environment):
                 Exception: If there is an issue retrieving events.
         """
         try:
-            events = self._step(
+            events = await self._step(
                 code=self.code,
                 programs=self.programs,
             )
             self.update_event(events)
             return events
         except Exception as e:
-            time.sleep(3)  # wait for mineflayer to exit
+            await asyncio.sleep(3)  # wait for mineflayer to exit
             # reset bot status here
-            events = self._reset(
+            events = await self._reset(
                 options={
                     "mode": "hard",
                     "wait_ticks": 20,
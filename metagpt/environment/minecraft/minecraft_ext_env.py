@@ -3,12 +3,11 @@
 # @Desc   : The Minecraft external environment to integrate with Minecraft game
 #           refs to `voyager bridge.py`
 
+import asyncio
 import json
-import time
 from typing import Any, Optional
 
-import requests
-from pydantic import ConfigDict, Field, model_validator
+from pydantic import ConfigDict, Field, PrivateAttr, model_validator
 
 from metagpt.environment.base_env import ExtEnv, mark_as_writeable
 from metagpt.environment.base_env_space import BaseEnvAction, BaseEnvObsParams
@@ -19,6 +18,7 @@ from metagpt.environment.minecraft.const import (
     MC_DEFAULT_WARMUP,
     METAGPT_ROOT,
 )
+from metagpt.environment.minecraft.mineflayer_client import MineflayerClient
 from metagpt.environment.minecraft.process_monitor import SubprocessMonitor
 from metagpt.logs import logger
 
@@ -39,6 +39,8 @@ class MinecraftExtEnv(ExtEnv):
     server_paused: bool = Field(default=False)
     warm_up: dict = Field(default=dict())
 
+    _client: Optional[MineflayerClient] = PrivateAttr(default=None)
+
     def reset(
         self,
         *,
@@ -94,48 +96,52 @@ class MinecraftExtEnv(ExtEnv):
     def set_mc_port(self, mc_port: int):
         self.mc_port = mc_port
 
+    @property
+    def client(self) -> MineflayerClient:
+        if self._client is None or self._client.server != self.server:
+            self._client = MineflayerClient(self.server, request_timeout=self.request_timeout)
+        return self._client
+
     @mark_as_writeable
-    def close(self) -> bool:
-        self.unpause()
+    async def close(self) -> bool:
+        await self.unpause()
         if self.connected:
-            res = requests.post(f"{self.server}/stop")
-            if res.status_code == 200:
+            status, _ = await self.client.post("/stop")
+            if status == 200:
                 self.connected = False
-        self.mineflayer.stop()
+        await asyncio.to_thread(self.mineflayer.stop)
+        await self.client.close()
         return not self.connected
 
     @mark_as_writeable
-    def check_process(self) -> dict:
+    async def check_process(self) -> dict:
         retry = 0
         while not self.mineflayer.is_running:
             logger.info("Mineflayer process has exited, restarting")
-            self.mineflayer.run()
+            # `run` blocks until the process prints its ready line
+            await asyncio.to_thread(self.mineflayer.run)
             if not self.mineflayer.is_running:
                 if retry > 3:
                     logger.error("Mineflayer process failed to start")
-                    raise {}
+                    raise RuntimeError("Mineflayer process failed to start")
                 else:
                     retry += 1
                     continue
             logger.info(self.mineflayer.ready_line)
-            res = requests.post(
-                f"{self.server}/start",
-                json=self.reset_options,
-                timeout=self.request_timeout,
-            )
-            if res.status_code != 200:
-                self.mineflayer.stop()
-                logger.error(f"Minecraft server reply with code {res.status_code}")
-                raise {}
-            return res.json()
+            status, returned_data = await self.client.post("/start", self.reset_options)
+            if status != 200:
+                await asyncio.to_thread(self.mineflayer.stop)
+                logger.error(f"Minecraft server reply with code {status}")
+                raise RuntimeError(f"Minecraft server reply with code {status}")
+            return returned_data
 
     @mark_as_writeable
-    def _reset(self, *, seed=None, options=None) -> dict:
+    async def _reset(self, *, seed=None, options=None) -> dict:
         if options is None:
             options = {}
         if options.get("inventory", {}) and options.get("mode", "hard") != "hard":
             logger.error("inventory can only be set when options is hard")
-            raise {}
+            raise ValueError("inventory can only be set when options is hard")
 
         self.reset_options = {
             "port": self.mc_port,
@@ -147,49 +153,48 @@ class MinecraftExtEnv(ExtEnv):
             "position": options.get("position", None),
         }
 
-        self.unpause()
-        self.mineflayer.stop()
-        time.sleep(1)  # wait for mineflayer to exit
+        await self.unpause()
+        await asyncio.to_thread(self.mineflayer.stop)
+        await asyncio.sleep(1)  # wait for mineflayer to exit
 
-        returned_data = self.check_process()
+        returned_data = await self.check_process()
         self.has_reset = True
         self.connected = True
         # All the reset in step will be soft
         self.reset_options["reset"] = "soft"
-        self.pause()
+        await self.pause()
         return json.loads(returned_data)
 
     @mark_as_writeable
-    def _step(self, code: str, programs: str = "") -> dict:
+    async def _step(self, code: str, programs: str = "") -> dict:
         if not self.has_reset:
             raise RuntimeError("Environment has not been reset yet")
-        self.check_process()
-        self.unpause()
+        await self.check_process()
+        await self.unpause()
         data = {
             "code": code,
             "programs": programs,
         }
-        res = requests.post(f"{self.server}/step", json=data, timeout=self.request_timeout)
-        if res.status_code != 200:
+        status, returned_data = await self.client.post("/step", data)
+        if status != 200:
             raise RuntimeError("Failed to step Minecraft server")
-        returned_data = res.json()
-        self.pause()
+        await self.pause()
         return json.loads(returned_data)
 
     @mark_as_writeable
-    def pause(self) -> bool:
+    async def pause(self) -> bool:
         if self.mineflayer.is_running and not self.server_paused:
-            res = requests.post(f"{self.server}/pause")
-            if res.status_code == 200:
+            status, _ = await self.client.post("/pause")
+            if status == 200:
                 self.server_paused = True
         return self.server_paused
 
     @mark_as_writeable
-    def unpause(self) -> bool:
+    async def unpause(self) -> bool:
         if self.mineflayer.is_running and self.server_paused:
-            res = requests.post(f"{self.server}/pause")
-            if res.status_code == 200:
+            status, returned_data = await self.client.post("/pause")
+            if status == 200:
                 self.server_paused = False
             else:
-                logger.info(f"mineflayer pause result: {res.json()}")
+                logger.info(f"mineflayer pause result: {returned_data}")
         return self.server_paused
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : mineflayer_client.py
+@Desc    : Async http client of the mineflayer bridge server.
+"""
+import asyncio
+import contextlib
+from typing import Any, Optional
+
+import aiohttp
+
+
+class MineflayerClient:
+    """Posts requests to the mineflayer server over a keep-alive session without blocking the event loop.
+
+    The session is bound to the event loop which creates it, a new one is created if the client is used from another
+    loop, and the old one is closed. Cancelling the awaiting task aborts the request.
+    """
+
+    def __init__(self, server: str, request_timeout: float = 600, connect_timeout: float = 10):
+        self.server = server
+        self.request_timeout = request_timeout
+        self.connect_timeout = connect_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            await self.close()
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout, connect=self.connect_timeout)
+            )
+            self._loop = loop
+        return self._session
+
+    async def post(self, path: str, data: Optional[dict] = None, timeout: Optional[float] = None) -> tuple[int, Any]:
+        """Post `data` as json to `path`, return the status code and the json body of the response"""
+        session = await self._get_session()
+        kwargs = {"json": data}
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout, connect=self.connect_timeout)
+        async with session.post(f"{self.server}{path}", **kwargs) as rsp:
+            return rsp.status, await rsp.json(content_type=None)
+
+    async def close(self):
+        session, loop = self._session, self._loop
+        self._session = None
+        self._loop = None
+        if session is None or session.closed:
+            return
+        if loop is asyncio.get_running_loop():
+            await session.close()
+        elif loop.is_running():
+            # the loop runs in another thread, close the session there
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+        else:
+            # the loop is stopped or closed, the connections are dropped without it
+            with contextlib.suppress(RuntimeError):
+                await session.close()
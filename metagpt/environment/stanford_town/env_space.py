@@ -55,6 +55,8 @@ class EnvObsType(BaseEnvObsType):
     GET_TITLE = 1  # get the tile detail dictionary with given tile coord
     TILE_PATH = 2  # get the tile address with given tile coord
     TILE_NBR = 3  # get the neighbors of given tile coord and its vision radius
+    TILE_NBR_ADDRESS = 4  # get the distinct addresses of the neighbors of given tile coord and its vision radius
+    TILE_NBR_EVENTS = 5  # get the events of the neighbors in the same arena of given tile coord, sorted by distance
 
 
 class EnvObsParams(BaseEnvObsParams):
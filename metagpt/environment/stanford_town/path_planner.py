@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : path_planner.py
+@Desc    : Shortest paths on the collision grid of the StanfordTown maze.
+"""
+from collections import OrderedDict, deque
+
+import numpy as np
+
+
+class GridPathPlanner:
+    """Finds the shortest 4-connected paths on a collision grid indexed by [y, x].
+
+    The planner keeps an LRU cache of the BFS distance fields to the targets, so the personas walking to the same tile
+    share one field and every path after the first one costs only its length.
+    """
+
+    def __init__(self, collision_grid: np.ndarray, max_fields: int = 256):
+        self.blocked = np.asarray(collision_grid, dtype=bool)
+        self.height, self.width = self.blocked.shape
+        self.max_fields = max_fields
+        self.hits = 0
+        self.misses = 0
+        self._fields: OrderedDict[tuple[int, int], np.ndarray] = OrderedDict()
+
+    def distance_field(self, target: tuple[int, int]) -> np.ndarray:
+        """Return the number of steps from each tile to the target, -1 for the blocked and unreachable tiles"""
+        target = (int(target[0]), int(target[1]))
+        field = self._fields.get(target)
+        if field is not None:
+            self.hits += 1
+            self._fields.move_to_end(target)
+            return field
+
+        self.misses += 1
+        field = self._bfs(target)
+        self._fields[target] = field
+        while self.max_fields and len(self._fields) > self.max_fields:
+            self._fields.popitem(last=False)
+        return field
+
+    def _bfs(self, target: tuple[int, int]) -> np.ndarray:
+        width, height = self.width, self.height
+        blocked = self.blocked.ravel().tolist()
+        dist = [-1] * (width * height)
+        x, y = target
+        if blocked[y * width + x]:
+            return np.array(dist, dtype=np.int32).reshape(height, width)
+
+        dist[y * width + x] = 0
+        queue = deque([y * width + x])
+        while queue:
+            index = queue.popleft()
+            step = dist[index] + 1
+            x = index % width
+            neighbors = []
+            if index >= width:
+                neighbors.append(index - width)
+            if x > 0:
+                neighbors.append(index - 1)
+            if index < (height - 1) * width:
+                neighbors.append(index + width)
+            if x < width - 1:
+                neighbors.append(index + 1)
+            for neighbor in neighbors:
+                if dist[neighbor] < 0 and not blocked[neighbor]:
+                    dist[neighbor] = step
+                    queue.append(neighbor)
+        return np.array(dist, dtype=np.int32).reshape(height, width)
+
+    def _neighbors(self, x: int, y: int) -> list[tuple[int, int]]:
+        neighbors = []
+        if y > 0:
+            neighbors.append((x, y - 1))
+        if x > 0:
+            neighbors.append((x - 1, y))
+        if y < self.height - 1:
+            neighbors.append((x, y + 1))
+        if x < self.width - 1:
+            neighbors.append((x + 1, y))
+        return neighbors
+
+    def find_path(self, start: tuple[int, int], end: tuple[int, int]) -> list[tuple[int, int]]:
+        """
+        Return a shortest path of (x, y) tiles from `start` to `end`, both included. The start tile may be blocked, e.g.
+        a persona standing on a bed. If `end` is unreachable, return `[end]` like the former `path_finder`.
+        """
+        x, y = int(start[0]), int(start[1])
+        end = (int(end[0]), int(end[1]))
+        if (x, y) == end:
+            return [end]
+
+        field = self.distance_field(end)
+        path = [(x, y)]
+        if field[y, x] < 0:
+            candidates = [(field[ny, nx], (nx, ny)) for nx, ny in self._neighbors(x, y) if field[ny, nx] >= 0]
+            if not candidates:
+                return [end]
+            _, (x, y) = min(candidates)
+            path.append((x, y))
+
+        while field[y, x] > 0:
+            step = field[y, x] - 1
+            for nx, ny in self._neighbors(x, y):
+                if field[ny, nx] == step:
+                    x, y = nx, ny
+                    break
+            path.append((x, y))
+        return path
@@ -4,10 +4,12 @@
 #           refs to `generative_agents maze.py`
 
 import math
+from operator import itemgetter
 from pathlib import Path
 from typing import Any, Optional
 
-from pydantic import ConfigDict, Field, model_validator
+import numpy as np
+from pydantic import ConfigDict, Field, PrivateAttr, model_validator
 
 from metagpt.environment.base_env import ExtEnv, mark_as_readable, mark_as_writeable
 from metagpt.environment.stanford_town.env_space import (
@@ -19,6 +21,8 @@ from metagpt.environment.stanford_town.env_space import (
     get_action_space,
     get_observation_space,
 )
+from metagpt.environment.stanford_town.path_planner import GridPathPlanner
+from metagpt.ext.stanford_town.utils.const import collision_block_id
 from metagpt.utils.common import read_csv_to_list, read_json_file
 
 
@@ -36,6 +40,16 @@ class StanfordTownExtEnv(ExtEnv):
     address_tiles: dict[str, set] = Field(default=dict())
     collision_maze: list[list] = Field(default=[])
 
+    # the distinct {world, sector, arena, game_object} addresses, and the address id of each tile in [y, x]
+    _addresses: list[dict[str, str]] = PrivateAttr(default_factory=list)
+    _address_ids: np.ndarray = PrivateAttr(default_factory=lambda: np.zeros((0, 0), dtype=np.int32))
+    # the distinct arena level paths, and the arena id of each tile in [y, x]
+    _arena_paths: list[str] = PrivateAttr(default_factory=list)
+    _arena_ids: np.ndarray = PrivateAttr(default_factory=lambda: np.zeros((0, 0), dtype=np.int32))
+    # arena id -> the (x, y) tiles with events in the arena
+    _arena_event_tiles: dict[int, set[tuple[int, int]]] = PrivateAttr(default_factory=dict)
+    _path_planner: Optional[GridPathPlanner] = PrivateAttr(default=None)
+
     @model_validator(mode="before")
     @classmethod
     def _init_maze(cls, values):
@@ -211,6 +225,36 @@ class StanfordTownExtEnv(ExtEnv):
         values["observation_space"] = get_observation_space()
         return values
 
+    @model_validator(mode="after")
+    def _init_tile_index(self):
+        addresses, arena_paths = {}, {}
+        self._address_ids = np.zeros((self.maze_height, self.maze_width), dtype=np.int32)
+        self._arena_ids = np.zeros((self.maze_height, self.maze_width), dtype=np.int32)
+        for y, row in enumerate(self.tiles):
+            for x, tile in enumerate(row):
+                address = (tile["world"], tile["sector"], tile["arena"], tile["game_object"])
+                self._address_ids[y, x] = addresses.setdefault(address, len(addresses))
+                arena_path = f"{tile['world']}:{tile['sector']}:{tile['arena']}"
+                self._arena_ids[y, x] = arena_paths.setdefault(arena_path, len(arena_paths))
+        self._addresses = [dict(zip(["world", "sector", "arena", "game_object"], i)) for i in addresses]
+        self._arena_paths = list(arena_paths)
+        self._arena_event_tiles = {}
+        for y, row in enumerate(self.tiles):
+            for x, tile in enumerate(row):
+                if tile["events"]:
+                    self._update_event_index((x, y))
+        # the same blocked tiles as `path_finder`
+        self._path_planner = GridPathPlanner(np.array(self.collision_maze) == collision_block_id)
+        return self
+
+    def _update_event_index(self, tile: tuple[int, int]):
+        x, y = int(tile[0]), int(tile[1])
+        event_tiles = self._arena_event_tiles.setdefault(int(self._arena_ids[y, x]), set())
+        if self.tiles[y][x]["events"]:
+            event_tiles.add((x, y))
+        else:
+            event_tiles.discard((x, y))
+
     def reset(
         self,
         *,
@@ -245,6 +289,10 @@ class StanfordTownExtEnv(ExtEnv):
             obs = self.get_tile_path(tile=obs_params.coord, level=obs_params.level)
         elif obs_type == EnvObsType.TILE_NBR:
             obs = self.get_nearby_tiles(tile=obs_params.coord, vision_r=obs_params.vision_radius)
+        elif obs_type == EnvObsType.TILE_NBR_ADDRESS:
+            obs = self.get_nearby_addresses(tile=obs_params.coord, vision_r=obs_params.vision_radius)
+        elif obs_type == EnvObsType.TILE_NBR_EVENTS:
+            obs = self.get_nearby_events(tile=obs_params.coord, vision_r=obs_params.vision_radius)
         return obs
 
     def step(self, action: EnvAction) -> tuple[dict[str, EnvObsValType], float, bool, bool, dict[str, Any]]:
@@ -331,6 +379,8 @@ class StanfordTownExtEnv(ExtEnv):
         """
         x = tile[0]
         y = tile[1]
+        if level == "arena":
+            return self._arena_paths[self._arena_ids[y, x]]
         tile = self.tiles[y][x]
 
         path = f"{tile['world']}"
@@ -370,27 +420,54 @@ class StanfordTownExtEnv(ExtEnv):
         OUTPUT:
           nearby_tiles: a list of tiles that are within the radius.
         """
-        left_end = 0
-        if tile[0] - vision_r > left_end:
-            left_end = tile[0] - vision_r
+        left_end, right_end, top_end, bottom_end = self._get_nearby_bounds(tile, vision_r)
+        return [(i, j) for i in range(left_end, right_end) for j in range(top_end, bottom_end)]
 
-        right_end = self.maze_width - 1
-        if tile[0] + vision_r + 1 < right_end:
-            right_end = tile[0] + vision_r + 1
+    def _get_nearby_bounds(self, tile: tuple[int, int], vision_r: int) -> tuple[int, int, int, int]:
+        """Return the `left, right, top, bottom` bounds of the nearby tiles, right and bottom are exclusive"""
+        left_end = max(int(tile[0]) - vision_r, 0)
+        right_end = min(int(tile[0]) + vision_r + 1, self.maze_width - 1)
+        top_end = max(int(tile[1]) - vision_r, 0)
+        bottom_end = min(int(tile[1]) + vision_r + 1, self.maze_height - 1)
+        return left_end, right_end, top_end, bottom_end
 
-        bottom_end = self.maze_height - 1
-        if tile[1] + vision_r + 1 < bottom_end:
-            bottom_end = tile[1] + vision_r + 1
+    @mark_as_readable
+    def get_nearby_addresses(self, tile: tuple[int, int], vision_r: int) -> list[dict[str, str]]:
+        """
+        Return the distinct addresses of the tiles given by `get_nearby_tiles`, in the order of their first tile.
+        Each address is a dict of world, sector, arena and game_object, like `access_tile` without the tile states.
+        """
+        left_end, right_end, top_end, bottom_end = self._get_nearby_bounds(tile, vision_r)
+        # transpose to iterate x first like `get_nearby_tiles`
+        ids = self._address_ids[top_end:bottom_end, left_end:right_end].T.ravel()
+        _, first_indices = np.unique(ids, return_index=True)
+        return [self._addresses[ids[i]] for i in np.sort(first_indices)]
 
-        top_end = 0
-        if tile[1] - vision_r > top_end:
-            top_end = tile[1] - vision_r
+    @mark_as_readable
+    def get_nearby_events(self, tile: tuple[int, int], vision_r: int) -> list[tuple[float, tuple]]:
+        """
+        Return the distinct events of the tiles given by `get_nearby_tiles` which are in the same arena as `tile`,
+        as `(distance, event)` pairs sorted by the distance to `tile`. It only visits the tiles with events of the arena.
+        """
+        left_end, right_end, top_end, bottom_end = self._get_nearby_bounds(tile, vision_r)
+        event_tiles = self._arena_event_tiles.get(int(self._arena_ids[tile[1], tile[0]]), set())
+        event_tiles = sorted((x, y) for x, y in event_tiles if left_end <= x < right_end and top_end <= y < bottom_end)
+        events = dict()
+        for x, y in event_tiles:
+            dist = math.dist([x, y], [tile[0], tile[1]])
+            for event in self.tiles[y][x]["events"]:
+                if event not in events:
+                    events[event] = dist
+        return sorted([(dist, event) for event, dist in events.items()], key=itemgetter(0))
 
-        nearby_tiles = []
-        for i in range(left_end, right_end):
-            for j in range(top_end, bottom_end):
-                nearby_tiles += [(i, j)]
-        return nearby_tiles
+    @mark_as_readable
+    def find_path(self, start: tuple[int, int], end: tuple[int, int]) -> list[tuple[int, int]]:
+        """
+        Return a shortest walkable path from the `start` tile to the `end` tile, both included, e.g.
+        [(0, 1), (1, 1), (1, 2), (1, 3), (1, 4)...]. The distance fields to the targets are cached, so the personas
+        walking to the same tile share the search.
+        """
+        return self._path_planner.find_path(start, end)
 
     @mark_as_writeable
     def add_event_from_tile(self, curr_event: tuple[str], tile: tuple[int, int]) -> None:
@@ -406,6 +483,7 @@ class StanfordTownExtEnv(ExtEnv):
           None
         """
         self.tiles[tile[1]][tile[0]]["events"].add(curr_event)
+        self._update_event_index(tile)
 
     @mark_as_writeable
     def remove_event_from_tile(self, curr_event: tuple[str], tile: tuple[int, int]) -> None:
@@ -424,6 +502,7 @@ class StanfordTownExtEnv(ExtEnv):
         for event in curr_tile_ev_cp:
             if event == curr_event:
                 self.tiles[tile[1]][tile[0]]["events"].remove(event)
+        self._update_event_index(tile)
 
     @mark_as_writeable
     def turn_event_from_tile_idle(self, curr_event: tuple[str], tile: tuple[int, int]) -> None:
@@ -449,3 +528,4 @@ class StanfordTownExtEnv(ExtEnv):
         for event in curr_tile_ev_cp:
             if event[0] == subject:
                 self.tiles[tile[1]][tile[0]]["events"].remove(event)
+        self._update_event_index(tile)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : Parse the interactive UI elements from the xml dumped by `uiautomator`
+
+from pathlib import Path
+from typing import Iterable
+from xml.etree.ElementTree import Element, iterparse
+
+import numpy as np
+
+from metagpt.config2 import config
+from metagpt.environment.android.bbox_utils import (
+    as_boxes,
+    center_distance_matrix,
+    dedup_by_center,
+)
+from metagpt.ext.android_assistant.utils.schema import AndroidElement
+
+
+def parse_bounds(bounds: str) -> tuple[int, int, int, int]:
+    """`[x1,y1][x2,y2]` -> `(x1, y1, x2, y2)`"""
+    top_left, bottom_right = bounds[1:-1].split("][")
+    x1, y1 = map(int, top_left.split(","))
+    x2, y2 = map(int, bottom_right.split(","))
+    return x1, y1, x2, y2
+
+
+def get_id_from_element(elem: Element) -> str:
+    x1, y1, x2, y2 = parse_bounds(elem.attrib["bounds"])
+    elem_w, elem_h = x2 - x1, y2 - y1
+    if "resource-id" in elem.attrib and elem.attrib["resource-id"]:
+        elem_id = elem.attrib["resource-id"].replace(":", ".").replace("/", "_")
+    else:
+        elem_id = f"{elem.attrib['class']}_{elem_w}_{elem_h}"
+    if "content-desc" in elem.attrib and elem.attrib["content-desc"] and len(elem.attrib["content-desc"]) < 20:
+        content_desc = elem.attrib["content-desc"].replace("/", "_").replace(" ", "").replace(":", "_")
+        elem_id += f"_{content_desc}"
+    return elem_id
+
+
+class UIElements:
+    """The elements of one attrib, e.g. `clickable`, in document order with their boxes as a (n, 4) array"""
+
+    def __init__(self, attrib: str, uids: list[str], boxes: np.ndarray):
+        self.attrib = attrib
+        self.uids = uids
+        self.boxes = boxes
+
+    def __len__(self) -> int:
+        return len(self.uids)
+
+    def select(self, mask: np.ndarray) -> "UIElements":
+        indices = np.flatnonzero(mask)
+        return UIElements(self.attrib, [self.uids[i] for i in indices], self.boxes[indices])
+
+    def to_android_elements(self) -> list[AndroidElement]:
+        return [
+            AndroidElement(uid=uid, bbox=((x1, y1), (x2, y2)), attrib=self.attrib)
+            for uid, (x1, y1, x2, y2) in zip(self.uids, self.boxes.tolist())
+        ]
+
+
+def parse_ui_elements(xml_path: Path, attribs: Iterable[str], add_index: bool = False) -> dict[str, UIElements]:
+    """Collect the elements whose `attrib` is `true` for each of `attribs` in one pass over the xml"""
+    attribs = list(attribs)
+    found = {attrib: ([], []) for attrib in attribs}
+    path = []
+    for event, elem in iterparse(str(xml_path), ["start", "end"]):
+        if event == "end":
+            path.pop()
+            continue
+        path.append(elem)
+        matched = [attrib for attrib in attribs if elem.attrib.get(attrib) == "true"]
+        if not matched:
+            continue
+        elem_id = get_id_from_element(elem)
+        if len(path) > 1:
+            elem_id = get_id_from_element(path[-2]) + "_" + elem_id
+        if add_index:
+            elem_id += f"_{elem.attrib['index']}"
+        bbox = parse_bounds(elem.attrib["bounds"])
+        for attrib in matched:
+            found[attrib][0].append(elem_id)
+            found[attrib][1].append(bbox)
+    return {attrib: UIElements(attrib, uids, as_boxes(boxes)) for attrib, (uids, boxes) in found.items()}
+
+
+def _dedup(elements: UIElements, min_dist: float, kept_boxes: np.ndarray = None) -> UIElements:
+    return elements.select(dedup_by_center(elements.boxes, min_dist, kept_boxes))
+
+
+def traverse_xml_tree(xml_path: Path, elem_list: list[AndroidElement], attrib: str, add_index=False):
+    """Append the elements of `attrib` which are not close to the earlier ones, including those in `elem_list`"""
+    elements = parse_ui_elements(xml_path, [attrib], add_index)[attrib]
+    kept_boxes = as_boxes([[*e.bbox[0], *e.bbox[1]] for e in elem_list])
+    elem_list.extend(_dedup(elements, config.extra.get("min_dist", 30), kept_boxes).to_android_elements())
+
+
+def elem_list_from_xml_tree(xml_path: Path, useless_list: list[str], min_dist: int) -> list[AndroidElement]:
+    parsed = parse_ui_elements(xml_path, ["clickable", "focusable"], add_index=True)
+    dedup_dist = config.extra.get("min_dist", 30)
+    clickable = _dedup(parsed["clickable"], dedup_dist)
+    focusable = _dedup(parsed["focusable"], dedup_dist)
+
+    useless = set(useless_list)
+    elem_list = [elem for elem in clickable.to_android_elements() if elem.uid not in useless]
+    if len(focusable) and len(clickable):
+        # the focusable elements overlapping with the clickable ones, useless or not, are the same widgets
+        close = (center_distance_matrix(focusable.boxes, clickable.boxes) <= min_dist).any(axis=1)
+        focusable = focusable.select(~close)
+    elem_list.extend(elem for elem in focusable.to_android_elements() if elem.uid not in useless)
+    return elem_list
@@ -5,12 +5,10 @@
 import re
 from pathlib import Path
 from typing import Union
-from xml.etree.ElementTree import Element, iterparse
 
 import cv2
 import pyshine as ps
 
-from metagpt.config2 import config
 from metagpt.ext.android_assistant.utils.schema import (
     ActionOp,
     AndroidElement,
@@ -28,86 +26,14 @@ from metagpt.ext.android_assistant.utils.schema import (
     TapOpParam,
     TextOpParam,
 )
+from metagpt.ext.android_assistant.utils.ui_elements import (  # noqa: F401
+    elem_list_from_xml_tree,
+    get_id_from_element,
+    traverse_xml_tree,
+)
 from metagpt.logs import logger
 
 
-def get_id_from_element(elem: Element) -> str:
-    bounds = elem.attrib["bounds"][1:-1].split("][")
-    x1, y1 = map(int, bounds[0].split(","))
-    x2, y2 = map(int, bounds[1].split(","))
-    elem_w, elem_h = x2 - x1, y2 - y1
-    if "resource-id" in elem.attrib and elem.attrib["resource-id"]:
-        elem_id = elem.attrib["resource-id"].replace(":", ".").replace("/", "_")
-    else:
-        elem_id = f"{elem.attrib['class']}_{elem_w}_{elem_h}"
-    if "content-desc" in elem.attrib and elem.attrib["content-desc"] and len(elem.attrib["content-desc"]) < 20:
-        content_desc = elem.attrib["content-desc"].replace("/", "_").replace(" ", "").replace(":", "_")
-        elem_id += f"_{content_desc}"
-    return elem_id
-
-
-def traverse_xml_tree(xml_path: Path, elem_list: list[AndroidElement], attrib: str, add_index=False):
-    path = []
-    extra_config = config.extra
-    for event, elem in iterparse(str(xml_path), ["start", "end"]):
-        if event == "start":
-            path.append(elem)
-            if attrib in elem.attrib and elem.attrib[attrib] == "true":
-                parent_prefix = ""
-                if len(path) > 1:
-                    parent_prefix = get_id_from_element(path[-2])
-                bounds = elem.attrib["bounds"][1:-1].split("][")
-                x1, y1 = map(int, bounds[0].split(","))
-                x2, y2 = map(int, bounds[1].split(","))
-                center = (x1 + x2) // 2, (y1 + y2) // 2
-                elem_id = get_id_from_element(elem)
-                if parent_prefix:
-                    elem_id = parent_prefix + "_" + elem_id
-                if add_index:
-                    elem_id += f"_{elem.attrib['index']}"
-                close = False
-                for e in elem_list:
-                    bbox = e.bbox
-                    center_ = (bbox[0][0] + bbox[1][0]) // 2, (bbox[0][1] + bbox[1][1]) // 2
-                    dist = (abs(center[0] - center_[0]) ** 2 + abs(center[1] - center_[1]) ** 2) ** 0.5
-                    if dist <= extra_config.get("min_dist", 30):
-                        close = True
-                        break
-                if not close:
-                    elem_list.append(AndroidElement(uid=elem_id, bbox=((x1, y1), (x2, y2)), attrib=attrib))
-
-        if event == "end":
-            path.pop()
-
-
-def elem_list_from_xml_tree(xml_path: Path, useless_list: list[str], min_dist: int) -> list[AndroidElement]:
-    clickable_list = []
-    focusable_list = []
-    traverse_xml_tree(xml_path, clickable_list, "clickable", True)
-    traverse_xml_tree(xml_path, focusable_list, "focusable", True)
-    elem_list = []
-    for elem in clickable_list:
-        if elem.uid in useless_list:
-            continue
-        elem_list.append(elem)
-    for elem in focusable_list:
-        if elem.uid in useless_list:
-            continue
-        bbox = elem.bbox
-        center = (bbox[0][0] + bbox[1][0]) // 2, (bbox[0][1] + bbox[1][1]) // 2
-        close = False
-        for e in clickable_list:
-            bbox = e.bbox
-            center_ = (bbox[0][0] + bbox[1][0]) // 2, (bbox[0][1] + bbox[1][1]) // 2
-            dist = (abs(center[0] - center_[0]) ** 2 + abs(center[1] - center_[1]) ** 2) ** 0.5
-            if dist <= min_dist:
-                close = True
-                break
-        if not close:
-            elem_list.append(elem)
-    return elem_list
-
-
 def draw_bbox_multi(
     img_path: Path,
     output_path: Path,
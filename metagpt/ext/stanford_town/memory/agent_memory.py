@@ -4,10 +4,15 @@
 
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
 
-from pydantic import Field, field_serializer, model_validator
+import numpy as np
+from pydantic import Field, PrivateAttr, field_serializer, model_validator
 
+from metagpt.ext.stanford_town.utils.embedding_service import (
+    EMBEDDING_CACHE_FILENAME,
+    get_embedding_service,
+)
 from metagpt.logs import logger
 from metagpt.memory.memory import Memory
 from metagpt.schema import Message
@@ -92,6 +97,88 @@ class BasicMemory(Message):
         return memory_dict
 
 
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_seconds(time: Optional[datetime]) -> float:
+    """Seconds since a naive epoch, so that the differences agree with the naive datetime arithmetics"""
+    if time is None:
+        return np.nan
+    return (time.replace(tzinfo=None) - _EPOCH).total_seconds()
+
+
+class RetrievalIndex:
+    """Contiguous arrays of the memory nodes for vectorized retrieval.
+
+    Each node takes a row of the parallel `importance`/`created`/`last_accessed`/`retrievable` arrays, and refers by
+    `node_keys` to a row of `key_matrix`, which holds the unit embeddings of the distinct embedding keys. The relevance of
+    all nodes to a query is then a single matrix-vector product. The arrays grow by doubling their capacity.
+    """
+
+    def __init__(self):
+        self.size = 0
+        self.node_ids: list[str] = []
+        self.node_rows: dict[str, int] = {}
+        self.key_rows: dict[str, int] = {}
+        self.key_matrix = np.zeros((0, 0), dtype=np.float32)
+        self.node_keys = np.zeros(0, dtype=np.int64)
+        self.importance = np.zeros(0)
+        self.created = np.zeros(0)
+        self.last_accessed = np.zeros(0)
+        self.retrievable = np.zeros(0, dtype=bool)
+
+    @staticmethod
+    def _grow(array: np.ndarray, size: int) -> np.ndarray:
+        if size <= len(array):
+            return array
+        new_array = np.zeros((max(size, 2 * len(array), 16),) + array.shape[1:], dtype=array.dtype)
+        new_array[: len(array)] = array
+        return new_array
+
+    def set_embedding(self, key: str, embedding: Optional[list[float]]):
+        """Set the embedding of the key, nodes with the same key share it"""
+        if key not in self.key_rows:
+            self.key_rows[key] = len(self.key_rows)
+        elif embedding is None:
+            return
+        vector = np.asarray(embedding if embedding is not None else [], dtype=np.float32)
+        row = self.key_rows[key]
+        if not self.key_matrix.shape[1] and vector.size:
+            self.key_matrix = np.zeros((len(self.key_matrix), vector.size), dtype=np.float32)
+        self.key_matrix = self._grow(self.key_matrix, row + 1)
+        norm = np.linalg.norm(vector)
+        self.key_matrix[row] = vector / norm if norm else 0
+
+    def add(self, node: BasicMemory, embedding: Optional[list[float]], retrievable: bool):
+        self.set_embedding(node.embedding_key, embedding)
+        row = self.size
+        self.size += 1
+        for name in ["node_keys", "importance", "created", "last_accessed", "retrievable"]:
+            setattr(self, name, self._grow(getattr(self, name), self.size))
+        self.node_ids.append(node.memory_id)
+        self.node_rows[node.memory_id] = row
+        self.node_keys[row] = self.key_rows[node.embedding_key]
+        self.importance[row] = node.poignancy
+        self.created[row] = to_seconds(node.created)
+        self.last_accessed[row] = to_seconds(node.last_accessed)
+        self.retrievable[row] = retrievable
+
+    def get_rows(self, memory_ids: Iterable[str]) -> np.ndarray:
+        return np.fromiter((self.node_rows[i] for i in memory_ids), dtype=np.int64)
+
+    def get_retrievable_rows(self) -> np.ndarray:
+        return np.flatnonzero(self.retrievable[: self.size])
+
+    def relevance(self, rows: np.ndarray, query_embedding: list[float]) -> np.ndarray:
+        """Cosine similarities between the query and the nodes of the rows"""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if not norm or not self.key_matrix.shape[1]:
+            return np.zeros(len(rows))
+        scores = self.key_matrix[: len(self.key_rows)] @ (query / norm)
+        return scores[self.node_keys[rows]].astype(np.float64)
+
+
 class AgentMemory(Memory):
     """
     GA中主要存储三种JSON
@@ -115,6 +202,13 @@ class AgentMemory(Memory):
     memory_saved: Optional[Path] = Field(default=None)
     embeddings: dict[str, list[float]] = dict()
 
+    _nodes: dict[str, BasicMemory] = PrivateAttr(default_factory=dict)
+    _retrieval_index: RetrievalIndex = PrivateAttr(default_factory=RetrievalIndex)
+
+    @property
+    def retrieval_index(self) -> RetrievalIndex:
+        return self._retrieval_index
+
     def set_mem_path(self, memory_saved: Path):
         self.memory_saved = memory_saved
         self.load(memory_saved)
@@ -132,6 +226,8 @@ class AgentMemory(Memory):
             memory_json.update(memory_node)
         write_json_file(memory_saved.joinpath("nodes.json"), memory_json)
         write_json_file(memory_saved.joinpath("embeddings.json"), self.embeddings)
+        # the embeddings of the queries, e.g. focal points, which are not in `embeddings.json`
+        get_embedding_service().save(memory_saved.joinpath(EMBEDDING_CACHE_FILENAME), exclude=self.embeddings)
 
         strength_json = dict()
         strength_json["kw_strength_event"] = self.kw_strength_event
@@ -143,6 +239,8 @@ class AgentMemory(Memory):
         将GA的JSON解析，填充到AgentMemory类之中
         """
         self.embeddings = read_json_file(memory_saved.joinpath("embeddings.json"))
+        get_embedding_service().update(self.embeddings)
+        get_embedding_service().load(memory_saved.joinpath(EMBEDDING_CACHE_FILENAME))
         memory_load = read_json_file(memory_saved.joinpath("nodes.json"))
         for count in range(len(memory_load.keys())):
             node_id = f"node_{str(count + 1)}"
@@ -182,9 +280,10 @@ class AgentMemory(Memory):
         Add a new message to storage, while updating the index
         重写add方法，修改原有的Message类为BasicMemory类，并添加不同的记忆类型添加方式
         """
-        if memory_basic.memory_id in self.storage:
+        if memory_basic.memory_id in self._nodes:
             return
         self.storage.append(memory_basic)
+        self._index_node(memory_basic)
         if memory_basic.memory_type == "chat":
             self.chat_list[0:0] = [memory_basic]
             return
@@ -233,9 +332,8 @@ class AgentMemory(Memory):
             else:
                 self.chat_keywords[kw] = [memory_node]
 
-        self.add(memory_node)
-
         self.embeddings[embedding_pair[0]] = embedding_pair[1]
+        self.add(memory_node)
         return memory_node
 
     def add_thought(self, created, expiration, s, p, o, content, keywords, poignancy, embedding_pair, filling):
@@ -281,6 +379,7 @@ class AgentMemory(Memory):
             else:
                 self.thought_keywords[kw] = [memory_node]
 
+        self.embeddings[embedding_pair[0]] = embedding_pair[1]
         self.add(memory_node)
 
         if f"{p} {o}" != "is idle":
@@ -289,8 +388,6 @@ class AgentMemory(Memory):
                     self.kw_strength_thought[kw] += 1
                 else:
                     self.kw_strength_thought[kw] = 1
-
-        self.embeddings[embedding_pair[0]] = embedding_pair[1]
         return memory_node
 
     def add_event(self, created, expiration, s, p, o, content, keywords, poignancy, embedding_pair, filling):
@@ -331,6 +428,7 @@ class AgentMemory(Memory):
             else:
                 self.event_keywords[kw] = [memory_node]
 
+        self.embeddings[embedding_pair[0]] = embedding_pair[1]
         self.add(memory_node)
 
         if f"{p} {o}" != "is idle":
@@ -339,10 +437,30 @@ class AgentMemory(Memory):
                     self.kw_strength_event[kw] += 1
                 else:
                     self.kw_strength_event[kw] = 1
-
-        self.embeddings[embedding_pair[0]] = embedding_pair[1]
         return memory_node
 
+    def get_node(self, memory_id: str) -> Optional[BasicMemory]:
+        return self._nodes.get(memory_id)
+
+    def update_last_accessed(self, memory_ids: Iterable[str], last_accessed: datetime):
+        """Update the nodes and the retrieval index together, the index does not see direct assignments"""
+        memory_ids = list(memory_ids)
+        for memory_id in memory_ids:
+            self._nodes[memory_id].last_accessed = last_accessed
+        self._retrieval_index.last_accessed[self._retrieval_index.get_rows(memory_ids)] = to_seconds(last_accessed)
+
+    def _index_node(self, memory_node: BasicMemory):
+        self._nodes[memory_node.memory_id] = memory_node
+        retrievable = memory_node.memory_type in ["event", "thought"] and "idle" not in memory_node.embedding_key
+        self._retrieval_index.add(memory_node, self.embeddings.get(memory_node.embedding_key), retrievable)
+
+    def _rebuild_index(self):
+        super()._rebuild_index()
+        self._nodes = {}
+        self._retrieval_index = RetrievalIndex()
+        for memory_node in self.storage:
+            self._index_node(memory_node)
+
     def get_summarized_latest_events(self, retention):
         ret_set = set()
         for e_node in self.event_list[:retention]:
@@ -17,7 +17,7 @@ from metagpt.ext.stanford_town.actions.task_decomp import TaskDecomp
 from metagpt.ext.stanford_town.actions.wake_up import WakeUp
 from metagpt.ext.stanford_town.memory.retrieve import new_agent_retrieve
 from metagpt.ext.stanford_town.plan.converse import agent_conversation
-from metagpt.ext.stanford_town.utils.utils import get_embedding
+from metagpt.ext.stanford_town.utils.embedding_service import aget_embedding
 from metagpt.llm import LLM
 from metagpt.logs import logger
 
@@ -522,7 +522,7 @@ async def _long_term_planning(role: "STRole", new_day: bool):
         role.scratch.daily_req = await GenDailySchedule().run(role, wake_up_hour)
         logger.info(f"Role: {role.name} daily requirements: {role.scratch.daily_req}")
     elif new_day == "New day":
-        revise_identity(role)
+        await revise_identity(role)
 
         # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - TODO
         # We need to create a new daily_req here...
@@ -545,7 +545,7 @@ async def _long_term_planning(role: "STRole", new_day: bool):
     s, p, o = (role.scratch.name, "plan", role.scratch.curr_time.strftime("%A %B %d"))
     keywords = set(["plan"])
     thought_poignancy = 5
-    thought_embedding_pair = (thought, get_embedding(thought))
+    thought_embedding_pair = (thought, await aget_embedding(thought))
     role.a_mem.add_thought(
         created, expiration, s, p, o, thought, keywords, thought_poignancy, thought_embedding_pair, None
     )
@@ -655,14 +655,14 @@ async def _determine_action(role: "STRole"):
     role.scratch.add_new_action(**new_action_details)
 
 
-def revise_identity(role: "STRole"):
+async def revise_identity(role: "STRole"):
     p_name = role.scratch.name
 
     focal_points = [
         f"{p_name}'s plan for {role.scratch.get_str_curr_date_str()}.",
         f"Important recent events for {p_name}'s life.",
     ]
-    retrieved = new_agent_retrieve(role, focal_points)
+    retrieved = await new_agent_retrieve(role, focal_points)
 
     statements = "[Statements]\n"
     for key, val in retrieved.items():
@@ -674,14 +674,14 @@ def revise_identity(role: "STRole"):
     plan_prompt += f" *{role.scratch.curr_time.strftime('%A %B %d')}*? "
     plan_prompt += "If there is any scheduling information, be as specific as possible (include date, time, and location if stated in the statement)\n\n"
     plan_prompt += f"Write the response from {p_name}'s perspective."
-    plan_note = LLM().ask(plan_prompt)
+    plan_note = await LLM().aask(plan_prompt)
 
     thought_prompt = statements + "\n"
     thought_prompt += (
         f"Given the statements above, how might we summarize {p_name}'s feelings about their days up to now?\n\n"
     )
     thought_prompt += f"Write the response from {p_name}'s perspective."
-    thought_note = LLM().ask(thought_prompt)
+    thought_note = await LLM().aask(thought_prompt)
 
     currently_prompt = (
         f"{p_name}'s status from {(role.scratch.curr_time - datetime.timedelta(days=1)).strftime('%A %B %d')}:\n"
@@ -692,7 +692,7 @@ def revise_identity(role: "STRole"):
     currently_prompt += f"It is now {role.scratch.curr_time.strftime('%A %B %d')}. Given the above, write {p_name}'s status for {role.scratch.curr_time.strftime('%A %B %d')} that reflects {p_name}'s thoughts at the end of {(role.scratch.curr_time - datetime.timedelta(days=1)).strftime('%A %B %d')}. Write this in third-person talking about {p_name}."
     currently_prompt += "If there is any scheduling information, be as specific as possible (include date, time, and location if stated in the statement).\n\n"
     currently_prompt += "Follow this format below:\nStatus: <new status>"
-    new_currently = LLM().ask(currently_prompt)
+    new_currently = await LLM().aask(currently_prompt)
 
     role.scratch.currently = new_currently
 
@@ -701,6 +701,6 @@ def revise_identity(role: "STRole"):
     daily_req_prompt += "Follow this format (the list should have 4~6 items but no more):\n"
     daily_req_prompt += "1. wake up and complete the morning routine at <time>, 2. ..."
 
-    new_daily_req = LLM().ask(daily_req_prompt)
+    new_daily_req = await LLM().aask(daily_req_prompt)
     new_daily_req = new_daily_req.replace("\n", " ")
     role.scratch.daily_plan_req = new_daily_req
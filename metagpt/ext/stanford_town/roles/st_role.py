@@ -10,11 +10,9 @@ Do the steps following:
 - reflect, do the High-level thinking based on memories and re-add into the memory
 - execute, move or else in the Maze
 """
-import math
 import random
 import time
 from datetime import datetime, timedelta
-from operator import itemgetter
 from pathlib import Path
 from typing import TYPE_CHECKING, Optional
 
@@ -37,13 +35,16 @@ from metagpt.ext.stanford_town.memory.scratch import Scratch
 from metagpt.ext.stanford_town.memory.spatial_memory import MemoryTree
 from metagpt.ext.stanford_town.plan.st_plan import plan
 from metagpt.ext.stanford_town.reflect.reflect import generate_poig_score, role_reflect
-from metagpt.ext.stanford_town.utils.const import STORAGE_PATH, collision_block_id
+from metagpt.ext.stanford_town.utils.const import STORAGE_PATH
+from metagpt.ext.stanford_town.utils.embedding_service import (
+    aget_embedding,
+    get_embedding_service,
+)
 from metagpt.ext.stanford_town.utils.mg_ga_transform import (
     get_role_environment,
     save_environment,
     save_movement,
 )
-from metagpt.ext.stanford_town.utils.utils import get_embedding, path_finder
 from metagpt.logs import logger
 from metagpt.roles.role import Role, RoleContext
 from metagpt.schema import Message
@@ -217,7 +218,7 @@ class STRole(Role):
         s, p, o = await run_event_triple.run(thought, self)
         keywords = set([s, p, o])
         thought_poignancy = await generate_poig_score(self, "event", whisper)
-        thought_embedding_pair = (thought, get_embedding(thought))
+        thought_embedding_pair = (thought, await aget_embedding(thought))
         self.rc.memory.add_thought(
             created, expiration, s, p, o, thought, keywords, thought_poignancy, thought_embedding_pair, None
         )
@@ -238,74 +239,54 @@ class STRole(Role):
             ret_events: a list of <BasicMemory> that are perceived and new.
         """
         # PERCEIVE SPACE
-        # We get the nearby tiles given our current tile and the persona's vision
-        # radius.
-        nearby_tiles = self.rc.env.observe(
+        # We store the addresses of the nearby tiles given our current tile and the
+        # persona's vision radius. Note that the s_mem of the persona is in the form
+        # of a tree constructed using dictionaries.
+        nearby_addresses = self.rc.env.observe(
             EnvObsParams(
-                obs_type=EnvObsType.TILE_NBR, coord=self.rc.scratch.curr_tile, vision_radius=self.rc.scratch.vision_r
+                obs_type=EnvObsType.TILE_NBR_ADDRESS,
+                coord=self.rc.scratch.curr_tile,
+                vision_radius=self.rc.scratch.vision_r,
             )
         )
-
-        # We then store the perceived space. Note that the s_mem of the persona is
-        # in the form of a tree constructed using dictionaries.
-        for tile in nearby_tiles:
-            tile_info = self.rc.env.observe(EnvObsParams(obs_type=EnvObsType.GET_TITLE, coord=tile))
+        for tile_info in nearby_addresses:
             self.rc.spatial_memory.add_tile_info(tile_info)
 
         # PERCEIVE EVENTS.
         # We will perceive events that take place in the same arena as the
-        # persona's current arena.
-
-        curr_arena_path = self.rc.env.observe(
-            EnvObsParams(obs_type=EnvObsType.TILE_PATH, coord=self.rc.scratch.curr_tile, level="arena")
+        # persona's current arena. The env gives them without duplicates (an object
+        # can extend across multiple tiles), ordered by the distance to the persona.
+        percept_events_list = self.rc.env.observe(
+            EnvObsParams(
+                obs_type=EnvObsType.TILE_NBR_EVENTS,
+                coord=self.rc.scratch.curr_tile,
+                vision_radius=self.rc.scratch.vision_r,
+            )
         )
 
-        # We do not perceive the same event twice (this can happen if an object is
-        # extended across multiple tiles).
-        percept_events_set = set()
-        # We will order our percept based on the distance, with the closest ones
-        # getting priorities.
-        percept_events_list = []
-        # First, we put all events that are occuring in the nearby tiles into the
-        # percept_events_list
-        for tile in nearby_tiles:
-            tile_details = self.rc.env.observe(EnvObsParams(obs_type=EnvObsType.GET_TITLE, coord=tile))
-            if tile_details["events"]:
-                tmp_arena_path = self.rc.env.observe(
-                    EnvObsParams(obs_type=EnvObsType.TILE_PATH, coord=tile, level="arena")
-                )
-
-                if tmp_arena_path == curr_arena_path:
-                    # This calculates the distance between the persona's current tile,
-                    # and the target tile.
-                    dist = math.dist([tile[0], tile[1]], [self.rc.scratch.curr_tile[0], self.rc.scratch.curr_tile[1]])
-                    # Add any relevant events to our temp set/list with the distant info.
-                    for event in tile_details["events"]:
-                        if event not in percept_events_set:
-                            percept_events_list += [[dist, event]]
-                            percept_events_set.add(event)
-
-        # We sort, and perceive only self.rc.scratch.att_bandwidth of the closest
-        # events. If the bandwidth is larger, then it means the persona can perceive
-        # more elements within a small area.
-        percept_events_list = sorted(percept_events_list, key=itemgetter(0))
+        # We perceive only self.rc.scratch.att_bandwidth of the closest events. If the
+        # bandwidth is larger, then it means the persona can perceive more elements
+        # within a small area.
         perceived_events = []
         for dist, event in percept_events_list[: self.rc.scratch.att_bandwidth]:
             perceived_events += [event]
 
+        # Embed the descriptions of the new events in one batch instead of one request per event.
+        latest_events = self.rc.memory.get_summarized_latest_events(self.rc.scratch.retention)
+        new_event_texts = []
+        for p_event in perceived_events:
+            p_event, _, desc_embedding_in = self._parse_perceived_event(p_event)
+            if p_event not in latest_events and desc_embedding_in not in self.rc.memory.embeddings:
+                new_event_texts.append(desc_embedding_in)
+        await get_embedding_service().aget_embeddings(new_event_texts)
+
         # Storing events.
         # <ret_events> is a list of <BasicMemory> instances from the persona's
         # associative memory.
         ret_events = []
         for p_event in perceived_events:
-            s, p, o, desc = p_event
-            if not p:
-                # If the object is not present, then we default the event to "idle".
-                p = "is"
-                o = "idle"
-                desc = "idle"
-            desc = f"{s.split(':')[-1]} is {desc}"
-            p_event = (s, p, o)
+            p_event, desc, desc_embedding_in = self._parse_perceived_event(p_event)
+            s, p, o = p_event
 
             # We retrieve the latest self.rc.scratch.retention events. If there is
             # something new that is happening (that is, p_event not in latest_events),
@@ -323,13 +304,10 @@ class STRole(Role):
                 keywords.update([sub, obj])
 
                 # Get event embedding
-                desc_embedding_in = desc
-                if "(" in desc:
-                    desc_embedding_in = desc_embedding_in.split("(")[1].split(")")[0].strip()
                 if desc_embedding_in in self.rc.memory.embeddings:
                     event_embedding = self.rc.memory.embeddings[desc_embedding_in]
                 else:
-                    event_embedding = get_embedding(desc_embedding_in)
+                    event_embedding = await aget_embedding(desc_embedding_in)
                 event_embedding_pair = (desc_embedding_in, event_embedding)
 
                 # Get event poignancy.
@@ -344,7 +322,7 @@ class STRole(Role):
                     if self.rc.scratch.act_description in self.rc.memory.embeddings:
                         chat_embedding = self.rc.memory.embeddings[self.rc.scratch.act_description]
                     else:
-                        chat_embedding = get_embedding(self.rc.scratch.act_description)
+                        chat_embedding = await aget_embedding(self.rc.scratch.act_description)
                     chat_embedding_pair = (self.rc.scratch.act_description, chat_embedding)
                     chat_poignancy = await generate_poig_score(self, "chat", self.rc.scratch.act_description)
                     chat_node = self.rc.memory.add_chat(
@@ -381,6 +359,21 @@ class STRole(Role):
 
         return ret_events
 
+    @staticmethod
+    def _parse_perceived_event(event: tuple) -> tuple[tuple, str, str]:
+        """Return the (s, p, o) triple, the description and the text to embed of a perceived event"""
+        s, p, o, desc = event
+        if not p:
+            # If the object is not present, then we default the event to "idle".
+            p = "is"
+            o = "idle"
+            desc = "idle"
+        desc = f"{s.split(':')[-1]} is {desc}"
+        desc_embedding_in = desc
+        if "(" in desc:
+            desc_embedding_in = desc_embedding_in.split("(")[1].split(")")[0].strip()
+        return (s, p, o), desc, desc_embedding_in
+
     def retrieve(self, observed: list) -> dict:
         # TODO retrieve memories from agent_memory
         retrieved = dict()
@@ -427,26 +420,15 @@ class STRole(Role):
             if "<persona>" in plan:
                 # Executing persona-persona interaction.
                 target_p_tile = roles[plan.split("<persona>")[-1].strip()].scratch.curr_tile
-                collision_maze = self.rc.env.observe()["collision_maze"]
-                potential_path = path_finder(
-                    collision_maze, self.rc.scratch.curr_tile, target_p_tile, collision_block_id
-                )
+                potential_path = self.rc.env.find_path(self.rc.scratch.curr_tile, target_p_tile)
                 if len(potential_path) <= 2:
                     target_tiles = [potential_path[0]]
                 else:
-                    collision_maze = self.rc.env.observe()["collision_maze"]
-                    potential_1 = path_finder(
-                        collision_maze,
-                        self.rc.scratch.curr_tile,
-                        potential_path[int(len(potential_path) / 2)],
-                        collision_block_id,
+                    potential_1 = self.rc.env.find_path(
+                        self.rc.scratch.curr_tile, potential_path[int(len(potential_path) / 2)]
                     )
-
-                    potential_2 = path_finder(
-                        collision_maze,
-                        self.rc.scratch.curr_tile,
-                        potential_path[int(len(potential_path) / 2) + 1],
-                        collision_block_id,
+                    potential_2 = self.rc.env.find_path(
+                        self.rc.scratch.curr_tile, potential_path[int(len(potential_path) / 2) + 1]
                     )
                     if len(potential_1) <= len(potential_2):
                         target_tiles = [potential_path[int(len(potential_path) / 2)]]
@@ -512,12 +494,10 @@ class STRole(Role):
             closest_target_tile = None
             path = None
             for i in target_tiles:
-                # path_finder takes a collision_mze and the curr_tile coordinate as
-                # an input, and returns a list of coordinate tuples that becomes the
-                # path.
+                # find_path takes the curr_tile coordinate and the target as an input,
+                # and returns a list of coordinate tuples that becomes the path.
                 # e.g., [(0, 1), (1, 1), (1, 2), (1, 3), (1, 4)...]
-                collision_maze = self.rc.env.observe()["collision_maze"]
-                curr_path = path_finder(collision_maze, curr_tile, i, collision_block_id)
+                curr_path = self.rc.env.find_path(curr_tile, i)
                 if not closest_target_tile:
                     closest_target_tile = i
                     path = curr_path
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : embedding_service.py
+@Desc    : Batched and cached async embedding service of Stanford Town.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+from openai import AsyncOpenAI
+from tenacity import after_log, retry, stop_after_attempt, wait_random_exponential
+
+from metagpt.config2 import config
+from metagpt.logs import logger
+from metagpt.utils.common import read_json_file, write_json_file
+
+EMBEDDING_CACHE_FILENAME = "embedding_cache.json"
+
+
+def normalize_text(text: str) -> str:
+    """The text sent to the embedding model, which is also the cache key"""
+    text = " ".join(text.split())
+    return text or "this is blank"
+
+
+class BaseEmbeddingBackend(ABC):
+    """Turns a batch of normalized texts into their embeddings, in the same order"""
+
+    @abstractmethod
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        """Return the embeddings of the texts"""
+
+
+class OpenAIEmbeddingBackend(BaseEmbeddingBackend):
+    def __init__(self, model: str = "text-embedding-ada-002", api_key: str = ""):
+        self.model = model
+        self.api_key = api_key
+        self._client: Optional[AsyncOpenAI] = None
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        if self._client is None:
+            self._client = AsyncOpenAI(api_key=self.api_key or config.llm.api_key)
+        return self._client
+
+    @retry(
+        wait=wait_random_exponential(min=1, max=20),
+        stop=stop_after_attempt(3),
+        after=after_log(logger, logger.level("WARNING").name),
+        reraise=True,
+    )
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        rsp = await self.client.embeddings.create(input=texts, model=self.model)
+        return [i.embedding for i in sorted(rsp.data, key=lambda x: x.index)]
+
+
+class LocalEmbeddingBackend(BaseEmbeddingBackend):
+    """A deterministic stand-in for offline runs and benchmarks.
+
+    The vector of a text is drawn from a random generator seeded by the hash of the text, so equal texts always get the
+    same unit vector while different texts get nearly orthogonal ones. `latency` simulates the round trip of an API.
+    """
+
+    def __init__(self, dim: int = 1536, latency: float = 0):
+        self.dim = dim
+        self.latency = latency
+
+    def _embed(self, text: str) -> list[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dim)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+
+class EmbeddingService:
+    """Embeds texts with a backend, caching the results by normalized text.
+
+    The requests issued in the same event loop iteration, e.g. by `asyncio.gather`, are merged into one backend call
+    of at most `max_batch_size` texts, and concurrent requests of the same text share one result.
+    """
+
+    def __init__(self, backend: BaseEmbeddingBackend = None, max_batch_size: int = 256):
+        self.backend = backend or OpenAIEmbeddingBackend()
+        self.max_batch_size = max_batch_size
+        self.hits = 0
+        self.misses = 0
+        self.backend_calls = 0
+        self._cache: dict[str, list[float]] = {}
+        # texts embedded by the backend or loaded by `load`, the others are persisted by their owners, e.g. AgentMemory
+        self._persistent: set[str] = set()
+        self._pending: dict[str, asyncio.Future] = {}
+        self._flushing: Optional[asyncio.Task] = None
+
+    @property
+    def metrics(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "backend_calls": self.backend_calls,
+            "cached": len(self._cache),
+        }
+
+    async def aget_embedding(self, text: str) -> list[float]:
+        key = normalize_text(text)
+        if key in self._cache:
+            self.hits += 1
+            return self._cache[key]
+        if key in self._pending:
+            self.hits += 1
+            return await asyncio.shield(self._pending[key])
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        if self._flushing is None:
+            self._flushing = asyncio.create_task(self._flush())
+        return await asyncio.shield(future)
+
+    async def aget_embeddings(self, texts: Iterable[str]) -> list[list[float]]:
+        return list(await asyncio.gather(*[self.aget_embedding(text) for text in texts]))
+
+    async def _flush(self):
+        # Let the other requests of this loop iteration join the batch.
+        await asyncio.sleep(0)
+        try:
+            while self._pending:
+                batch = dict(list(self._pending.items())[: self.max_batch_size])
+                texts = list(batch.keys())
+                self.backend_calls += 1
+                try:
+                    embeddings = await self.backend.embed(texts)
+                except Exception as e:
+                    logger.error(f"embed {len(texts)} texts failed, exp: {e}")
+                    for text, future in batch.items():
+                        self._pending.pop(text, None)
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for text, embedding in zip(texts, embeddings):
+                    self._cache[text] = embedding
+                    self._persistent.add(text)
+                    future = self._pending.pop(text)
+                    if not future.done():
+                        future.set_result(embedding)
+        finally:
+            self._flushing = None
+
+    def get_cached(self, text: str) -> Optional[list[float]]:
+        return self._cache.get(normalize_text(text))
+
+    def update(self, embeddings: dict[str, list[float]]):
+        """Warm up the cache with known embeddings, e.g. the `embeddings.json` of an `AgentMemory`"""
+        for text, embedding in embeddings.items():
+            self._cache.setdefault(normalize_text(text), embedding)
+
+    def clear(self):
+        self._cache.clear()
+        self._persistent.clear()
+
+    def load(self, path: Path):
+        if not path.exists():
+            return
+        embeddings = read_json_file(str(path))
+        self.update(embeddings)
+        self._persistent.update(normalize_text(text) for text in embeddings)
+
+    def save(self, path: Path, exclude: Iterable[str] = ()):
+        """Persist the embedded texts, except the ones in `exclude` which are persisted elsewhere"""
+        excluded = {normalize_text(text) for text in exclude}
+        write_json_file(str(path), {k: self._cache[k] for k in self._persistent if k not in excluded})
+
+
+_EMBEDDING_SERVICE: Optional[EmbeddingService] = None
+
+
+def get_embedding_service() -> EmbeddingService:
+    global _EMBEDDING_SERVICE
+    if _EMBEDDING_SERVICE is None:
+        _EMBEDDING_SERVICE = EmbeddingService()
+    return _EMBEDDING_SERVICE
+
+
+def set_embedding_service(service: EmbeddingService):
+    """Swap the service used by Stanford Town, e.g. `EmbeddingService(LocalEmbeddingBackend())` for offline runs"""
+    global _EMBEDDING_SERVICE
+    _EMBEDDING_SERVICE = service
+
+
+async def aget_embedding(text: str) -> list[float]:
+    return await get_embedding_service().aget_embedding(text)
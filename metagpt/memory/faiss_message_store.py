@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Desc   : messages and their embeddings in a faiss index, persisted incrementally
+"""
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+import faiss
+import numpy as np
+
+from metagpt.schema import Message
+
+INDEX_FILENAME = "memory.index"
+VECTORS_FILENAME = "memory_vectors.bin"
+MESSAGES_FILENAME = "memory_messages.jsonl"
+OFFSETS_FILENAME = "memory_offsets.bin"
+META_FILENAME = "memory_meta.json"
+
+
+class FaissMessageStore:
+    """Messages and their embeddings in a faiss flat L2 index.
+
+    Nothing is rewritten on add, the files under `path` are:
+    - `memory.index`: a snapshot of the index written by faiss, which is memory-mapped when loaded;
+    - `memory_vectors.bin`: the float32 vectors added after the snapshot, appended on add;
+    - `memory_messages.jsonl`, `memory_offsets.bin`: the messages appended on add and the byte offset of each one, so a
+      message is only read when it is found;
+    - `memory_meta.json`: the dimension, and the size of the snapshot when the appended vectors started.
+    The appended vectors are compacted into a new snapshot when there are `compact_threshold` of them, so loading is
+    about constant time regardless of the number of messages.
+    """
+
+    def __init__(self, path: Path, compact_threshold: int = 1024):
+        self.path = Path(path)
+        self.compact_threshold = compact_threshold
+        self.index: Optional[faiss.IndexFlatL2] = None
+        self._offsets = np.zeros(0, dtype=np.int64)  # memory-mapped offsets of the messages in the snapshot
+        self._new_offsets: list[int] = []
+        self._tail_start = 0
+        self._load()
+
+    @staticmethod
+    def exists(path: Path) -> bool:
+        return Path(path).joinpath(META_FILENAME).exists()
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal if self.index is not None else 0
+
+    @property
+    def tail_size(self) -> int:
+        return self.ntotal - self._tail_start
+
+    def add(self, messages: list[Message], embeddings: list[list[float]]):
+        if not messages:
+            return
+        vectors = np.array(embeddings, dtype=np.float32)
+        if self.index is None:
+            self.index = faiss.IndexFlatL2(vectors.shape[1])
+            self._save_meta()
+
+        # the messages are written first, the ones without vectors are dropped on load
+        with open(self.path / MESSAGES_FILENAME, "ab") as f:
+            offset = f.tell()
+            offsets = []
+            for message in messages:
+                line = (message.model_dump_json() + "\n").encode("utf-8")
+                offsets.append(offset)
+                f.write(line)
+                offset += len(line)
+        with open(self.path / OFFSETS_FILENAME, "ab") as f:
+            f.write(np.array(offsets, dtype=np.int64).tobytes())
+        with open(self.path / VECTORS_FILENAME, "ab") as f:
+            f.write(vectors.tobytes())
+
+        self.index.add(vectors)
+        self._new_offsets.extend(offsets)
+        if self.tail_size >= self.compact_threshold:
+            self.compact()
+
+    def search(self, embeddings: list[list[float]], k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Return the distances and the ids of the k nearest messages of each embedding, the missing ids are -1"""
+        if not self.ntotal:
+            return np.zeros((len(embeddings), 0), dtype=np.float32), np.zeros((len(embeddings), 0), dtype=np.int64)
+        return self.index.search(np.array(embeddings, dtype=np.float32), k)
+
+    def get_messages(self, ids: list[int]) -> list[Message]:
+        messages = []
+        with open(self.path / MESSAGES_FILENAME, "rb") as f:
+            for i in ids:
+                f.seek(self._get_offset(i))
+                messages.append(Message(**json.loads(f.readline())))
+        return messages
+
+    def compact(self):
+        """Write a new snapshot of the index, then drop the appended vectors"""
+        if self.index is None:
+            return
+        tmp_path = self.path / f"{INDEX_FILENAME}.tmp"
+        faiss.write_index(self.index, str(tmp_path))
+        os.replace(tmp_path, self.path / INDEX_FILENAME)
+        # If interrupted here, the snapshot already contains some appended vectors, they are skipped by its size
+        open(self.path / VECTORS_FILENAME, "wb").close()
+        self._tail_start = self.ntotal
+        self._save_meta()
+
+    def _get_offset(self, i: int) -> int:
+        return int(self._offsets[i]) if i < len(self._offsets) else self._new_offsets[i - len(self._offsets)]
+
+    def _save_meta(self):
+        meta = {"dim": self.index.d, "tail_start": self._tail_start}
+        tmp_path = self.path / f"{META_FILENAME}.tmp"
+        tmp_path.write_text(json.dumps(meta))
+        os.replace(tmp_path, self.path / META_FILENAME)
+
+    def _load(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        if not self.exists(self.path):
+            return
+
+        meta = json.loads(self.path.joinpath(META_FILENAME).read_text())
+        index_path = self.path / INDEX_FILENAME
+        if index_path.exists():
+            self.index = faiss.read_index(str(index_path), faiss.IO_FLAG_MMAP)
+        else:
+            self.index = faiss.IndexFlatL2(meta["dim"])
+
+        vectors_path = self.path / VECTORS_FILENAME
+        tail = np.fromfile(vectors_path, dtype=np.float32) if vectors_path.exists() else np.zeros(0, np.float32)
+        tail = tail[: len(tail) // meta["dim"] * meta["dim"]].reshape(-1, meta["dim"])
+        tail = tail[max(self.index.ntotal - meta["tail_start"], 0) :]
+        self._tail_start = self.index.ntotal
+
+        offsets_path = self.path / OFFSETS_FILENAME
+        num_offsets = offsets_path.stat().st_size // 8 if offsets_path.exists() else 0
+        num_vectors = self.index.ntotal + len(tail)
+        if num_offsets > num_vectors:
+            # interrupted while adding, drop the messages without vectors
+            offsets = np.memmap(offsets_path, dtype=np.int64, mode="r", shape=(num_offsets,))
+            end = int(offsets[num_vectors])
+            del offsets
+            os.truncate(offsets_path, num_vectors * 8)
+            os.truncate(self.path / MESSAGES_FILENAME, end)
+        elif num_offsets < num_vectors:
+            raise ValueError(f"The memory at {self.path} is broken, {num_offsets} messages for {num_vectors} vectors")
+
+        if num_vectors:
+            self._offsets = np.memmap(offsets_path, dtype=np.int64, mode="r", shape=(num_vectors,))
+        if len(tail):
+            self.index.add(np.ascontiguousarray(tail))
+        # keep the meta in line with the snapshot, so the vectors are appended after the loaded ones
+        if len(tail) or meta["tail_start"] != self._tail_start:
+            self._rewrite_tail(tail)
+
+    def _rewrite_tail(self, tail: np.ndarray):
+        with open(self.path / VECTORS_FILENAME, "wb") as f:
+            f.write(tail.tobytes())
+        self._save_meta()
@@ -4,7 +4,7 @@
 @Desc   : the implement of Long-term memory
 """
 
-from typing import Optional
+from typing import Iterable, Optional
 
 from pydantic import ConfigDict, Field
 
@@ -41,11 +41,21 @@ class LongTermMemory(Memory):
 
     def add(self, message: Message):
         super().add(message)
-        for action in self.rc.watch:
-            if message.cause_by == action and not self.msg_from_recover:
-                # currently, only add role's watching messages to its memory_storage
-                # and ignore adding messages from recover repeatedly
-                self.memory_storage.add(message)
+        if self._is_watched(message):
+            self.memory_storage.add(message)
+
+    def add_batch(self, messages: Iterable[Message]):
+        watched = []
+        for message in messages:
+            super().add(message)
+            if self._is_watched(message):
+                watched.append(message)
+        self.memory_storage.add_batch(watched)
+
+    def _is_watched(self, message: Message) -> bool:
+        # currently, only add role's watching messages to its memory_storage
+        # and ignore adding messages from recover repeatedly
+        return not self.msg_from_recover and any(message.cause_by == action for action in self.rc.watch)
 
     async def find_news(self, observed: list[Message], k=0) -> list[Message]:
         """
@@ -58,12 +68,9 @@ class LongTermMemory(Memory):
             # memory_storage hasn't initialized, use default `find_news` to get stm_news
             return stm_news
 
-        ltm_news: list[Message] = []
-        for mem in stm_news:
-            # filter out messages similar to those seen previously in ltm, only keep fresh news
-            mem_searched = await self.memory_storage.search_similar(mem)
-            if len(mem_searched) == 0:
-                ltm_news.append(mem)
+        # filter out messages similar to those seen previously in ltm, only keep fresh news
+        mems_searched = await self.memory_storage.search_similar_batch(stm_news)
+        ltm_news = [mem for mem, mem_searched in zip(stm_news, mems_searched) if len(mem_searched) == 0]
         return ltm_news[-k:]
 
     def persist(self):
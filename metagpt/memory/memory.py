@@ -7,9 +7,9 @@
 @Modified By: mashenquan, 2023-11-1. According to RFC 116: Updated the type of index key.
 """
 from collections import defaultdict
-from typing import DefaultDict, Iterable, Set
+from typing import DefaultDict, Iterable, Optional, Set
 
-from pydantic import BaseModel, Field, SerializeAsAny
+from pydantic import BaseModel, Field, PrivateAttr, SerializeAsAny
 
 from metagpt.const import IGNORED_MESSAGE_ID
 from metagpt.schema import Message
@@ -17,21 +17,43 @@ from metagpt.utils.common import any_to_str, any_to_str_set
 
 
 class Memory(BaseModel):
-    """The most basic memory: super-memory"""
+    """The most basic memory: super-memory
+
+    Besides the serializable `storage` and `index`(by `cause_by`), the memory keeps some private hash indices which are
+    rebuilt on construction, so that dedup, deletion and lookups by `role`/`sent_from`/`send_to` do not need to scan
+    the whole storage. Messages are expected not to be modified after they are added.
+    """
 
     storage: list[SerializeAsAny[Message]] = []
     index: DefaultDict[str, list[SerializeAsAny[Message]]] = Field(default_factory=lambda: defaultdict(list))
     ignore_id: bool = False
 
+    # (id, content) -> messages, a message equals to another only if both of its id and content are the same.
+    _key_index: dict[tuple[str, str], list[Message]] = PrivateAttr(default_factory=dict)
+    # value -> {id(message): message}, the inner dict keeps the insertion order and supports O(1) deletion.
+    _role_index: DefaultDict[str, dict[int, Message]] = PrivateAttr(default_factory=lambda: defaultdict(dict))
+    _sent_from_index: DefaultDict[str, dict[int, Message]] = PrivateAttr(default_factory=lambda: defaultdict(dict))
+    _send_to_index: DefaultDict[str, dict[int, Message]] = PrivateAttr(default_factory=lambda: defaultdict(dict))
+    # id(message) -> its position in storage when indexed, it only moves towards the head by deletions before it.
+    _positions: dict[int, int] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context):
+        self._rebuild_index()
+
+    def __eq__(self, other):
+        # The private indices are derived from `storage` and keyed by object identity, leave them out of the comparison.
+        if not isinstance(other, BaseModel):
+            return NotImplemented
+        return type(self) is type(other) and self.__dict__ == other.__dict__
+
     def add(self, message: Message):
         """Add a new message to storage, while updating the index"""
         if self.ignore_id:
             message.id = IGNORED_MESSAGE_ID
-        if message in self.storage:
+        if self._contains(message):
             return
         self.storage.append(message)
-        if message.cause_by:
-            self.index[message.cause_by].append(message)
+        self._index_message(message, len(self.storage) - 1)
 
     def add_batch(self, messages: Iterable[Message]):
         for message in messages:
@@ -39,7 +61,15 @@ class Memory(BaseModel):
 
     def get_by_role(self, role: str) -> list[Message]:
         """Return all messages of a specified role"""
-        return [message for message in self.storage if message.role == role]
+        return list(self._role_index.get(role, {}).values())
+
+    def get_by_sent_from(self, sent_from) -> list[Message]:
+        """Return all messages sent from a specified role"""
+        return list(self._sent_from_index.get(any_to_str(sent_from), {}).values())
+
+    def get_by_send_to(self, send_to) -> list[Message]:
+        """Return all messages sent to a specified address"""
+        return list(self._send_to_index.get(any_to_str(send_to), {}).values())
 
     def get_by_content(self, content: str) -> list[Message]:
         """Return all messages containing a specified content"""
@@ -49,8 +79,7 @@ class Memory(BaseModel):
         """delete the newest message from the storage"""
         if len(self.storage) > 0:
             newest_msg = self.storage.pop()
-            if newest_msg.cause_by and newest_msg in self.index[newest_msg.cause_by]:
-                self.index[newest_msg.cause_by].remove(newest_msg)
+            self._unindex_message(newest_msg)
         else:
             newest_msg = None
         return newest_msg
@@ -59,14 +88,17 @@ class Memory(BaseModel):
         """Delete the specified message from storage, while updating the index"""
         if self.ignore_id:
             message.id = IGNORED_MESSAGE_ID
-        self.storage.remove(message)
-        if message.cause_by and message in self.index[message.cause_by]:
-            self.index[message.cause_by].remove(message)
+        stored = self._find(message)
+        if stored is None:
+            raise ValueError(f"{message} not in memory")
+        del self.storage[self._position(stored)]
+        self._unindex_message(stored)
 
     def clear(self):
         """Clear storage and index"""
         self.storage = []
         self.index = defaultdict(list)
+        self._rebuild_index()
 
     def count(self) -> int:
         """Return the number of messages in storage"""
@@ -82,10 +114,15 @@ class Memory(BaseModel):
 
     def find_news(self, observed: list[Message], k=0) -> list[Message]:
         """find news (previously unseen messages) from the the most recent k memories, from all memories when k=0"""
-        already_observed = self.get(k)
+        if k == 0:
+            return [i for i in observed if not self._contains(i)]
+
+        already_observed: dict[tuple[str, str], list[Message]] = defaultdict(list)
+        for message in self.get(k):
+            already_observed[self._key(message)].append(message)
         news: list[Message] = []
         for i in observed:
-            if i in already_observed:
+            if i in already_observed.get(self._key(i), []):
                 continue
             news.append(i)
         return news
@@ -104,3 +141,66 @@ class Memory(BaseModel):
                 continue
             rsp += self.index[action]
         return rsp
+
+    @staticmethod
+    def _key(message: Message) -> tuple[str, str]:
+        return message.id, message.content
+
+    def _find(self, message: Message) -> Optional[Message]:
+        """Return the stored message which equals to `message`"""
+        for stored in self._key_index.get(self._key(message), []):
+            if stored is message or stored == message:
+                return stored
+        return None
+
+    def _contains(self, message: Message) -> bool:
+        return self._find(message) is not None
+
+    def _position(self, message: Message) -> int:
+        """Return the position of a stored message, walking back from the recorded one by the deletions before it"""
+        pos = min(self._positions.get(id(message), -1), len(self.storage) - 1)
+        while pos >= 0 and self.storage[pos] is not message:
+            pos -= 1
+        if pos < 0:
+            # the storage was modified in place, fall back to search by identity
+            pos = next(i for i, stored in enumerate(self.storage) if stored is message)
+        return pos
+
+    def _index_message(self, message: Message, position: int):
+        self._positions[id(message)] = position
+        self._key_index.setdefault(self._key(message), []).append(message)
+        self._role_index[message.role][id(message)] = message
+        self._sent_from_index[message.sent_from][id(message)] = message
+        for addr in message.send_to:
+            self._send_to_index[addr][id(message)] = message
+        if message.cause_by:
+            self.index[message.cause_by].append(message)
+
+    def _unindex_message(self, message: Message):
+        self._positions.pop(id(message), None)
+        key = self._key(message)
+        bucket = self._key_index.get(key, [])
+        self._key_index[key] = [i for i in bucket if i is not message]
+        if not self._key_index[key]:
+            del self._key_index[key]
+        self._role_index[message.role].pop(id(message), None)
+        self._sent_from_index[message.sent_from].pop(id(message), None)
+        for addr in message.send_to:
+            self._send_to_index[addr].pop(id(message), None)
+        if message.cause_by and message.cause_by in self.index:
+            msgs = self.index[message.cause_by]
+            for i in range(len(msgs) - 1, -1, -1):
+                if msgs[i] is message:
+                    del msgs[i]
+                    break
+
+    def _rebuild_index(self):
+        """Rebuild all indices from the storage, the `index` field is rebuilt too so that it shares the same objects"""
+        self.index = defaultdict(list, {k: [] for k in self.index})
+        self._key_index = {}
+        self._role_index = defaultdict(dict)
+        self._sent_from_index = defaultdict(dict)
+        self._send_to_index = defaultdict(dict)
+        self._positions = {}
+        for i, message in enumerate(self.storage):
+            self._index_message(message, i)
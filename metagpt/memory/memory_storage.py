@@ -10,11 +10,12 @@ from llama_index.core.embeddings import BaseEmbedding
 
 from metagpt.const import DATA_PATH, MEM_TTL
 from metagpt.logs import logger
-from metagpt.rag.engines.simple import SimpleEngine
-from metagpt.rag.schema import FAISSIndexConfig, FAISSRetrieverConfig
+from metagpt.memory.faiss_message_store import FaissMessageStore
 from metagpt.schema import Message
 from metagpt.utils.embedding import get_embedding
 
+LEGACY_VECTOR_STORE_FILENAME = "default__vector_store.json"
+
 
 class MemoryStorage(object):
     """
@@ -26,10 +27,11 @@ class MemoryStorage(object):
         self.role_mem_path: str = None
         self.mem_ttl: int = mem_ttl  # later use
         self.threshold: float = 0.1  # experience value. TODO The threshold to filter similar memories
+        self.similarity_top_k: int = 5
         self._initialized: bool = False
         self.embedding = embedding or get_embedding()
 
-        self.faiss_engine = None
+        self.store: FaissMessageStore = None
 
     @property
     def is_initialized(self) -> bool:
@@ -41,37 +43,78 @@ class MemoryStorage(object):
         self.role_mem_path.mkdir(parents=True, exist_ok=True)
         self.cache_dir = self.role_mem_path
 
-        if self.role_mem_path.joinpath("default__vector_store.json").exists():
-            self.faiss_engine = SimpleEngine.from_index(
-                index_config=FAISSIndexConfig(persist_path=self.cache_dir),
-                retriever_configs=[FAISSRetrieverConfig()],
-                embed_model=self.embedding,
-            )
-        else:
-            self.faiss_engine = SimpleEngine.from_objs(
-                objs=[], retriever_configs=[FAISSRetrieverConfig()], embed_model=self.embedding
-            )
+        legacy = self.role_mem_path.joinpath(LEGACY_VECTOR_STORE_FILENAME).exists()
+        self.store = FaissMessageStore(self.cache_dir)
+        if legacy and not self.store.ntotal:
+            self._migrate_legacy_memory()
         self._initialized = True
 
     def add(self, message: Message) -> bool:
         """add message into memory storage"""
-        self.faiss_engine.add_objs([message])
-        logger.info(f"Role {self.role_id}'s memory_storage add a message")
+        self.add_batch([message])
+
+    def add_batch(self, messages: list[Message]):
+        """add messages into memory storage, they are embedded in one batch and appended to the files"""
+        if not messages:
+            return
+        embeddings = self.embedding.get_text_embedding_batch([message.content for message in messages])
+        self.store.add(messages, embeddings)
+        logger.info(f"Role {self.role_id}'s memory_storage add {len(messages)} messages")
 
     async def search_similar(self, message: Message, k=4) -> list[Message]:
         """search for similar messages"""
+        if not self.store.ntotal:
+            return []
+        embedding = await self.embedding.aget_query_embedding(message.content)
+        return self._filter_similar([embedding])[0]
+
+    async def search_similar_batch(self, messages: list[Message], k=4) -> list[list[Message]]:
+        """search for the similar messages of each message, with one embedding call and one faiss search"""
+        if not messages:
+            return []
+        if not self.store.ntotal:
+            return [[] for _ in messages]
+        embeddings = await self.embedding.aget_text_embedding_batch([message.content for message in messages])
+        return self._filter_similar(embeddings)
+
+    def _filter_similar(self, embeddings: list[list[float]]) -> list[list[Message]]:
+        dists, idxs = self.store.search(embeddings, self.similarity_top_k)
+
         # filter the result which score is smaller than the threshold
-        filtered_resp = []
-        resp = await self.faiss_engine.aretrieve(message.content)
-        for item in resp:
-            if item.score < self.threshold:
-                filtered_resp.append(item.metadata.get("obj"))
-        return filtered_resp
+        similar_ids = [
+            [idx for dist, idx in zip(row_dists, row_idxs) if 0 <= idx and dist < self.threshold]
+            for row_dists, row_idxs in zip(dists.tolist(), idxs.tolist())
+        ]
+        ids = list(dict.fromkeys(idx for row in similar_ids for idx in row))
+        messages = dict(zip(ids, self.store.get_messages(ids)))
+        return [[messages[idx] for idx in row] for row in similar_ids]
+
+    def _migrate_legacy_memory(self):
+        """Move the memory persisted by the llama-index storage context into the message store"""
+        from metagpt.rag.engines.simple import SimpleEngine
+        from metagpt.rag.schema import FAISSIndexConfig, FAISSRetrieverConfig
+
+        engine = SimpleEngine.from_index(
+            index_config=FAISSIndexConfig(persist_path=self.cache_dir),
+            retriever_configs=[FAISSRetrieverConfig()],
+            embed_model=self.embedding,
+        )
+        index = engine.retriever._index
+        faiss_index = index.vector_store.client
+        if faiss_index.ntotal:
+            nodes = index.docstore.get_nodes([index.index_struct.nodes_dict[str(i)] for i in range(faiss_index.ntotal)])
+            messages = [Message.model_validate_json(node.metadata["obj_json"]) for node in nodes]
+            self.store.add(messages, faiss_index.reconstruct_n(0, faiss_index.ntotal))
+            self.store.compact()
+        for filename in [LEGACY_VECTOR_STORE_FILENAME, "docstore.json", "index_store.json", "graph_store.json"]:
+            self.cache_dir.joinpath(filename).unlink(missing_ok=True)
+        logger.info(f"Role {self.role_id}'s memory_storage migrated {faiss_index.ntotal} messages")
 
     def clean(self):
         shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self.store = None
         self._initialized = False
 
     def persist(self):
-        if self.faiss_engine:
-            self.faiss_engine.retriever._index.storage_context.persist(self.cache_dir)
+        if self.store is not None:
+            self.store.compact()
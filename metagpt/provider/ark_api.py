@@ -18,7 +18,6 @@ from typing import Optional, Union
 
 from pydantic import BaseModel
 from volcenginesdkarkruntime import AsyncArk
-from volcenginesdkarkruntime._base_client import AsyncHttpxClientWrapper
 from volcenginesdkarkruntime._streaming import AsyncStream
 from volcenginesdkarkruntime.types.chat import ChatCompletion, ChatCompletionChunk
 
@@ -37,7 +36,7 @@ class ArkLLM(OpenAILLM):
     见：https://www.volcengine.com/docs/82379/1263482
     """
 
-    aclient: Optional[AsyncArk] = None
+    aclient: Optional[AsyncArk]
 
     def _init_client(self):
         """SDK: https://github.com/openai/openai-python#async-usage"""
@@ -57,9 +56,8 @@ class ArkLLM(OpenAILLM):
         }
         kwargs = {k: v for k, v in kvs.items() if v}
 
-        # to use proxy, openai v1 needs http_client
-        if proxy_params := self._get_proxy_params():
-            kwargs["http_client"] = AsyncHttpxClientWrapper(**proxy_params)
+        # to reuse connections and to use proxy, openai v1 needs http_client
+        kwargs["http_client"] = self._get_http_client()
 
         return kwargs
 
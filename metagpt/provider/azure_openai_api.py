@@ -7,7 +7,6 @@
 @Modified By: mashenquan, 2023/12/1. Fix bug: Unclosed connection caused by openai 0.x.
 """
 from openai import AsyncAzureOpenAI
-from openai._base_client import AsyncHttpxClientWrapper
 
 from metagpt.configs.llm_config import LLMType
 from metagpt.provider.llm_provider_registry import register_provider
@@ -34,9 +33,7 @@ class AzureOpenAILLM(OpenAILLM):
             azure_endpoint=self.config.base_url,
         )
 
-        # to use proxy, openai v1 needs http_client
-        proxy_params = self._get_proxy_params()
-        if proxy_params:
-            kwargs["http_client"] = AsyncHttpxClientWrapper(**proxy_params)
+        # to reuse connections and to use proxy, openai v1 needs http_client
+        kwargs["http_client"] = self._get_http_client()
 
         return kwargs
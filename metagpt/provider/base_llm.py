@@ -10,7 +10,7 @@ from __future__ import annotations
 
 import json
 from abc import ABC, abstractmethod
-from typing import Optional, Union
+from typing import Awaitable, Callable, Optional, Union
 
 from openai import AsyncOpenAI
 from pydantic import BaseModel
@@ -24,7 +24,12 @@ from tenacity import (
 
 from metagpt.configs.llm_config import LLMConfig
 from metagpt.const import LLM_API_TIMEOUT, USE_CONFIG_TIMEOUT
-from metagpt.logs import logger
+from metagpt.logs import log_llm_stream, logger
+from metagpt.provider.llm_cache import (
+    LLM_USAGE_COLLECTOR,
+    get_llm_cache,
+    make_cache_key,
+)
 from metagpt.schema import Message
 from metagpt.utils.common import log_and_reraise
 from metagpt.utils.cost_manager import CostManager, Costs
@@ -112,6 +117,9 @@ class BaseLLM(ABC):
         model = model or self.pricing_plan
         model = model or self.model
         usage = usage.model_dump() if isinstance(usage, BaseModel) else usage
+        collector = LLM_USAGE_COLLECTOR.get()
+        if collector is not None and usage:
+            collector.update(model=model, **usage)
         if calc_usage and self.cost_manager and usage:
             try:
                 prompt_tokens = int(usage.get("prompt_tokens", 0))
@@ -149,7 +157,11 @@ class BaseLLM(ABC):
         if stream is None:
             stream = self.config.stream
         logger.debug(message)
-        rsp = await self.acompletion_text(message, stream=stream, timeout=self.get_timeout(timeout))
+        rsp = await self._cached(
+            lambda: self.acompletion_text(message, stream=stream, timeout=self.get_timeout(timeout)),
+            stream=stream,
+            messages=message,
+        )
         return rsp
 
     def _extract_assistant_rsp(self, context):
@@ -161,10 +173,54 @@ class BaseLLM(ABC):
         for msg in msgs:
             umsg = self._user_msg(msg)
             context.append(umsg)
-            rsp_text = await self.acompletion_text(context, timeout=self.get_timeout(timeout))
+            rsp_text = await self._cached(
+                lambda: self.acompletion_text(context, timeout=self.get_timeout(timeout)), messages=context
+            )
             context.append(self._assistant_msg(rsp_text))
         return self._extract_assistant_rsp(context)
 
+    async def _cached(self, request: Callable[[], Awaitable], stream: bool = False, **key_kwargs):
+        """Return the cached response of the request if `config.cache` is enabled, otherwise send the request.
+
+        Args:
+            request: a coroutine function sending the request, its result must be json-serializable.
+            stream: replay the cached text via `log_llm_stream` if True.
+            key_kwargs: the request parameters besides the model and sampling config, e.g. messages and tools.
+        """
+        cache_config = getattr(self.config, "cache", None)
+        if not cache_config:
+            return await request()
+
+        cache = get_llm_cache(cache_config)
+        key = make_cache_key(
+            model=self.model or self.config.model,
+            temperature=self.config.temperature,
+            top_p=self.config.top_p,
+            max_token=self.config.max_token,
+            stop=self.config.stop,
+            **key_kwargs,
+        )
+        cached = await cache.get(key)
+        if cached is not None:
+            rsp, usage = cached["rsp"], cached.get("usage") or {}
+            if stream and isinstance(rsp, str):
+                log_llm_stream(rsp)
+                log_llm_stream("\n")
+            if self.cost_manager:
+                self.cost_manager.update_cache_savings(
+                    usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0), usage.get("model")
+                )
+            return rsp
+
+        usage = {}
+        token = LLM_USAGE_COLLECTOR.set(usage)
+        try:
+            rsp = await request()
+        finally:
+            LLM_USAGE_COLLECTOR.reset(token)
+        await cache.set(key, {"rsp": rsp, "usage": usage})
+        return rsp
+
     async def aask_code(self, messages: Union[str, Message, list[dict]], timeout=USE_CONFIG_TIMEOUT, **kwargs) -> dict:
         raise NotImplementedError
 
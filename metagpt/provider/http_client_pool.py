@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : http_client_pool.py
+@Desc    : Share keep-alive http connection pools between LLM instances which connect to the same endpoint.
+"""
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import httpx
+from openai._base_client import AsyncHttpxClientWrapper
+
+from metagpt.configs.llm_config import LLMConfig
+from metagpt.logs import logger
+
+
+class HttpClientPool:
+    """A registry of bounded httpx clients keyed by (event loop, api_type, base_url, proxy).
+
+    Every LLM instance used to create its own http client, so no TLS connection could be reused between the roles and
+    actions of a team. The clients of the pool are closed when the last `session` exits, and are recreated on demand
+    after that. The connections of a client are bound to the event loop running it, so each loop has its own clients,
+    those of a closed loop are dropped.
+    """
+
+    def __init__(self, max_connections: int = 100, max_keepalive_connections: int = 20):
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections)
+        self._clients: dict[tuple, AsyncHttpxClientWrapper] = {}
+        self._loops: dict[int, weakref.ref] = {}  # id of the event loops of the clients
+        self._sessions = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, config: LLMConfig) -> tuple:
+        loop = _running_loop()
+        loop_id = None
+        if loop is not None:
+            loop_id = id(loop)
+            ref = self._loops.get(loop_id)
+            if ref is None or ref() is not loop:
+                self._drop_closed_loops()
+                self._loops[loop_id] = weakref.ref(loop)
+        return loop_id, config.api_type, config.base_url, config.proxy
+
+    def _drop_closed_loops(self):
+        """Drop the clients of the event loops closed or collected, they cannot be used or closed any more"""
+        for loop_id, ref in list(self._loops.items()):
+            loop = ref()
+            if loop is None or loop.is_closed():
+                del self._loops[loop_id]
+                for key in [key for key in self._clients if key[0] == loop_id]:
+                    del self._clients[key]
+
+    def get(self, config: LLMConfig) -> AsyncHttpxClientWrapper:
+        """Return the shared http client of the endpoint configured by `config` for the running event loop,
+        create it if needed."""
+        key = self._key(config)
+        client = self._clients.get(key)
+        if client is not None and not client.is_closed:
+            self.hits += 1
+            return client
+
+        self.misses += 1
+        kwargs = {"limits": self.limits, "follow_redirects": True}
+        if config.proxy:
+            kwargs["proxies"] = config.proxy
+        client = AsyncHttpxClientWrapper(**kwargs)
+        self._clients[key] = client
+        return client
+
+    def is_current(self, client: AsyncHttpxClientWrapper, config: LLMConfig) -> bool:
+        """Whether `client` is the open shared client of the endpoint for the running event loop"""
+        return not client.is_closed and self._clients.get(self._key(config)) is client
+
+    @property
+    def metrics(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "clients": len(self._clients)}
+
+    @asynccontextmanager
+    async def session(self):
+        """Keep the pooled clients open until the last concurrent session exits, e.g. for a `Team.run`."""
+        self._sessions += 1
+        try:
+            yield self
+        finally:
+            self._sessions -= 1
+            if self._sessions == 0:
+                await self.aclose()
+
+    async def aclose(self):
+        """Close the pooled clients of the running event loop, and of no loop"""
+        self._drop_closed_loops()
+        loop = _running_loop()
+        loop_ids = {None, id(loop) if loop else None}
+        keys = [key for key in self._clients if key[0] in loop_ids]
+        clients = [self._clients.pop(key) for key in keys]
+        for client in clients:
+            if not client.is_closed:
+                await client.aclose()
+        logger.debug(f"http client pool closed, {self.metrics}")
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+HTTP_CLIENT_POOL = HttpClientPool()
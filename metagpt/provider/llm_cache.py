@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : llm_cache.py
+@Desc    : Provider-agnostic prompt -> completion cache of LLM, enabled by `LLMConfig.cache`.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Optional
+
+from metagpt.configs.llm_cache_config import LLMCacheConfig, LLMCacheType
+from metagpt.const import DEFAULT_WORKSPACE_ROOT
+from metagpt.utils.redis import Redis
+
+# Collects the usage reported by `BaseLLM._update_costs` during a cache miss, so that a later hit knows what it saved.
+LLM_USAGE_COLLECTOR: ContextVar[Optional[dict]] = ContextVar("llm_usage_collector", default=None)
+
+
+def make_cache_key(**kwargs) -> str:
+    """Return the canonical hash of the request, e.g. model, messages, temperature and tools."""
+    data = json.dumps(kwargs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class BaseLLMCache(ABC):
+    """Base class of the LLM response cache, values are json-serializable dicts."""
+
+    def __init__(self, config: LLMCacheConfig):
+        self.config = config
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[dict]:
+        value = await self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: dict):
+        await self._set(key, value)
+
+    @abstractmethod
+    async def _get(self, key: str) -> Optional[dict]:
+        """Return the cached value, None if missing or expired"""
+
+    @abstractmethod
+    async def _set(self, key: str, value: dict):
+        """Cache the value, evict the least recently used ones if needed"""
+
+    def _expired(self, created: float) -> bool:
+        return self.config.ttl > 0 and time.time() - created > self.config.ttl
+
+
+class MemoryLLMCache(BaseLLMCache):
+    """In-memory LRU cache"""
+
+    def __init__(self, config: LLMCacheConfig):
+        super().__init__(config)
+        self._data: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    async def _get(self, key: str) -> Optional[dict]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        created, value = item
+        if self._expired(created):
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def _set(self, key: str, value: dict):
+        self._data[key] = (time.time(), value)
+        self._data.move_to_end(key)
+        while self.config.max_size and len(self._data) > self.config.max_size:
+            self._data.popitem(last=False)
+
+
+class SQLiteLLMCache(BaseLLMCache):
+    """On-disk LRU cache, it survives process restarts such as `Team.deserialize`."""
+
+    def __init__(self, config: LLMCacheConfig):
+        super().__init__(config)
+        path = Path(config.path) if config.path else DEFAULT_WORKSPACE_ROOT / "llm_cache.sqlite3"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed)")
+
+    def _get_sync(self, key: str) -> Optional[dict]:
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self._expired(row[1]):
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def _set_sync(self, key: str, value: dict):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            if self.config.max_size:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.config.max_size,),
+                )
+
+    async def _get(self, key: str) -> Optional[dict]:
+        return await asyncio.to_thread(self._get_sync, key)
+
+    async def _set(self, key: str, value: dict):
+        await asyncio.to_thread(self._set_sync, key, value)
+
+
+class RedisLLMCache(BaseLLMCache):
+    """Cache shared by processes via `metagpt.utils.redis.Redis`, entries expire by `ttl`."""
+
+    PREFIX = "metagpt:llm_cache:"
+
+    def __init__(self, config: LLMCacheConfig):
+        super().__init__(config)
+        self._redis = Redis(config.redis)
+
+    async def _get(self, key: str) -> Optional[dict]:
+        value = await self._redis.get(self.PREFIX + key)
+        return json.loads(value) if value else None
+
+    async def _set(self, key: str, value: dict):
+        await self._redis.set(self.PREFIX + key, json.dumps(value, ensure_ascii=False), timeout_sec=self.config.ttl)
+
+
+_CACHE_CLASSES = {
+    LLMCacheType.MEMORY: MemoryLLMCache,
+    LLMCacheType.SQLITE: SQLiteLLMCache,
+    LLMCacheType.REDIS: RedisLLMCache,
+}
+_CACHES: dict[str, BaseLLMCache] = {}
+
+
+def get_llm_cache(config: LLMCacheConfig) -> BaseLLMCache:
+    """Return the cache of the config, LLM instances with the same cache config share one cache."""
+    key = config.model_dump_json()
+    if key not in _CACHES:
+        _CACHES[key] = _CACHE_CLASSES[config.cache_type](config)
+    return _CACHES[key]
@@ -13,7 +13,6 @@ import re
 from typing import Optional, Union
 
 from openai import APIConnectionError, AsyncOpenAI, AsyncStream
-from openai._base_client import AsyncHttpxClientWrapper
 from openai.types import CompletionUsage
 from openai.types.chat import ChatCompletion, ChatCompletionChunk
 from tenacity import (
@@ -29,6 +28,7 @@ from metagpt.const import USE_CONFIG_TIMEOUT
 from metagpt.logs import log_llm_stream, logger
 from metagpt.provider.base_llm import BaseLLM
 from metagpt.provider.constant import GENERAL_FUNCTION_SCHEMA
+from metagpt.provider.http_client_pool import HTTP_CLIENT_POOL
 from metagpt.provider.llm_provider_registry import register_provider
 from metagpt.utils.common import CodeParser, decode_image, log_and_reraise
 from metagpt.utils.cost_manager import CostManager
@@ -57,10 +57,24 @@ class OpenAILLM(BaseLLM):
 
     def __init__(self, config: LLMConfig):
         self.config = config
+        self._aclient = None
+        self._http_client = None
         self._init_client()
         self.auto_max_tokens = False
         self.cost_manager: Optional[CostManager] = None
 
+    @property
+    def aclient(self):
+        """The http connections of the client are shared via `HTTP_CLIENT_POOL`"""
+        if self._http_client is not None and not HTTP_CLIENT_POOL.is_current(self._http_client, self.config):
+            # the shared http client has been closed along with the pool, or is bound to another event loop
+            self._init_client()
+        return self._aclient
+
+    @aclient.setter
+    def aclient(self, client):
+        self._aclient = client
+
     def _init_client(self):
         """https://github.com/openai/openai-python#async-usage"""
         self.model = self.config.model  # Used in _calc_usage & _cons_kwargs
@@ -71,20 +85,15 @@ class OpenAILLM(BaseLLM):
     def _make_client_kwargs(self) -> dict:
         kwargs = {"api_key": self.config.api_key, "base_url": self.config.base_url}
 
-        # to use proxy, openai v1 needs http_client
-        if proxy_params := self._get_proxy_params():
-            kwargs["http_client"] = AsyncHttpxClientWrapper(**proxy_params)
+        # to reuse connections and to use proxy, openai v1 needs http_client
+        kwargs["http_client"] = self._get_http_client()
 
         return kwargs
 
-    def _get_proxy_params(self) -> dict:
-        params = {}
-        if self.config.proxy:
-            params = {"proxies": self.config.proxy}
-            if self.config.base_url:
-                params["base_url"] = self.config.base_url
-
-        return params
+    def _get_http_client(self):
+        """The shared http client of the endpoint for the running event loop, kept to check if it is still usable"""
+        self._http_client = HTTP_CLIENT_POOL.get(self.config)
+        return self._http_client
 
     async def _achat_completion_stream(self, messages: list[dict], timeout=USE_CONFIG_TIMEOUT) -> str:
         response: AsyncStream[ChatCompletionChunk] = await self.aclient.chat.completions.create(
@@ -182,8 +191,12 @@ class OpenAILLM(BaseLLM):
         if "tools" not in kwargs:
             configs = {"tools": [{"type": "function", "function": GENERAL_FUNCTION_SCHEMA}]}
             kwargs.update(configs)
-        rsp = await self._achat_completion_function(messages, **kwargs)
-        return self.get_choice_function_arguments(rsp)
+
+        async def _request():
+            rsp = await self._achat_completion_function(messages, **kwargs)
+            return self.get_choice_function_arguments(rsp)
+
+        return await self._cached(_request, messages=self.format_msg(messages), **kwargs)
 
     def _parse_arguments(self, arguments: str) -> dict:
         """parse arguments in openai function call"""
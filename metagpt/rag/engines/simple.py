@@ -2,6 +2,8 @@
 
 import json
 import os
+from functools import partial
+from pathlib import Path
 from typing import Any, Optional, Union
 
 from llama_index.core import SimpleDirectoryReader
@@ -30,6 +32,7 @@ from llama_index.core.schema import (
 )
 
 from metagpt.config2 import config
+from metagpt.logs import logger
 from metagpt.rag.factories import (
     get_index,
     get_rag_embedding,
@@ -37,6 +40,11 @@ from metagpt.rag.factories import (
     get_rankers,
     get_retriever,
 )
+from metagpt.rag.ingestion import (
+    CHECKPOINT_FILENAME,
+    IngestionStats,
+    StreamingIngestion,
+)
 from metagpt.rag.interface import NoEmbedding, RAGObject
 from metagpt.rag.parsers import OmniParse
 from metagpt.rag.retrievers.base import ModifiableRAGRetriever, PersistableRAGRetriever
@@ -46,6 +54,9 @@ from metagpt.rag.schema import (
     BaseRankerConfig,
     BaseRetrieverConfig,
     BM25RetrieverConfig,
+    FAISSIndexConfig,
+    FAISSRetrieverConfig,
+    IngestionConfig,
     ObjectNode,
     OmniParseOptions,
     OmniParseType,
@@ -70,6 +81,7 @@ class SimpleEngine(RetrieverQueryEngine):
         node_postprocessors: Optional[list[BaseNodePostprocessor]] = None,
         callback_manager: Optional[CallbackManager] = None,
         transformations: Optional[list[TransformComponent]] = None,
+        embed_model: Optional[BaseEmbedding] = None,
     ) -> None:
         super().__init__(
             retriever=retriever,
@@ -78,6 +90,7 @@ class SimpleEngine(RetrieverQueryEngine):
             callback_manager=callback_manager,
         )
         self._transformations = transformations or self._default_transformations()
+        self._embed_model = embed_model
 
     @classmethod
     def from_docs(
@@ -89,10 +102,14 @@ class SimpleEngine(RetrieverQueryEngine):
         llm: LLM = None,
         retriever_configs: list[BaseRetrieverConfig] = None,
         ranker_configs: list[BaseRankerConfig] = None,
+        ingestion_config: Optional[IngestionConfig] = None,
     ) -> "SimpleEngine":
         """From docs.
 
         Must provide either `input_dir` or `input_files`.
+        If `ingestion_config` is given, the files are ingested batch by batch, see `StreamingIngestion`, then the
+        retriever must be modifiable, e.g. FAISS or BM25. An interrupted ingestion into `persist_dir` is resumed from
+        the index persisted there.
 
         Args:
             input_dir: Path to the directory.
@@ -102,10 +119,35 @@ class SimpleEngine(RetrieverQueryEngine):
             llm: Must supported by llama index. Default OpenAI.
             retriever_configs: Configuration for retrievers. If more than one config, will use SimpleHybridRetriever.
             ranker_configs: Configuration for rankers.
+            ingestion_config: Configuration for the streaming ingestion.
         """
         if not input_dir and not input_files:
             raise ValueError("Must provide either `input_dir` or `input_files`.")
 
+        if ingestion_config:
+            index_config = cls._get_ingested_index_config(retriever_configs, ingestion_config)
+            if index_config:
+                engine = cls.from_index(
+                    index_config,
+                    embed_model=embed_model,
+                    llm=llm,
+                    retriever_configs=retriever_configs,
+                    ranker_configs=ranker_configs,
+                    transformations=transformations,
+                )
+            else:
+                engine = cls._from_nodes(
+                    nodes=[],
+                    transformations=transformations,
+                    embed_model=embed_model,
+                    llm=llm,
+                    retriever_configs=retriever_configs,
+                    ranker_configs=ranker_configs,
+                )
+            input_files = SimpleDirectoryReader(input_dir=input_dir, input_files=input_files).input_files
+            engine.add_docs(input_files, ingestion_config=ingestion_config)
+            return engine
+
         file_extractor = cls._get_file_extractor()
         documents = SimpleDirectoryReader(
             input_dir=input_dir, input_files=input_files, file_extractor=file_extractor
@@ -169,10 +211,26 @@ class SimpleEngine(RetrieverQueryEngine):
         llm: LLM = None,
         retriever_configs: list[BaseRetrieverConfig] = None,
         ranker_configs: list[BaseRankerConfig] = None,
+        transformations: Optional[list[TransformComponent]] = None,
     ) -> "SimpleEngine":
         """Load from previously maintained index by self.persist(), index_config contains persis_path."""
-        index = get_index(index_config, embed_model=cls._resolve_embed_model(embed_model, [index_config]))
-        return cls._from_index(index, llm=llm, retriever_configs=retriever_configs, ranker_configs=ranker_configs)
+        embed_model = cls._resolve_embed_model(embed_model, [index_config])
+        index = get_index(index_config, embed_model=embed_model)
+        # the bm25 index is persisted along with the index, the configs of the caller are not changed
+        retriever_configs = [
+            config.model_copy(update={"persist_path": index_config.persist_path})
+            if isinstance(config, BM25RetrieverConfig) and config.persist_path is None
+            else config
+            for config in retriever_configs or []
+        ]
+        return cls._from_index(
+            index,
+            embed_model=embed_model,
+            llm=llm,
+            retriever_configs=retriever_configs,
+            ranker_configs=ranker_configs,
+            transformations=transformations,
+        )
 
     async def asearch(self, content: str, **kwargs) -> str:
         """Inplement tools.SearchInterface"""
@@ -193,10 +251,18 @@ class SimpleEngine(RetrieverQueryEngine):
         self._try_reconstruct_obj(nodes)
         return nodes
 
-    def add_docs(self, input_files: list[str]):
-        """Add docs to retriever. retriever must has add_nodes func."""
+    def add_docs(
+        self, input_files: list[str], ingestion_config: Optional[IngestionConfig] = None
+    ) -> Optional[IngestionStats]:
+        """Add docs to retriever. retriever must has add_nodes func.
+
+        If `ingestion_config` is given, the files are ingested batch by batch, see `StreamingIngestion`.
+        """
         self._ensure_retriever_modifiable()
 
+        if ingestion_config:
+            return self._ingest_files(input_files, ingestion_config)
+
         documents = SimpleDirectoryReader(input_files=input_files).load_data()
         self._fix_document_metadata(documents)
 
@@ -237,15 +303,18 @@ class SimpleEngine(RetrieverQueryEngine):
             node_postprocessors=rankers,
             response_synthesizer=get_response_synthesizer(llm=llm),
             transformations=transformations,
+            embed_model=embed_model,
         )
 
     @classmethod
     def _from_index(
         cls,
         index: BaseIndex,
+        embed_model: BaseEmbedding = None,
         llm: LLM = None,
         retriever_configs: list[BaseRetrieverConfig] = None,
         ranker_configs: list[BaseRankerConfig] = None,
+        transformations: Optional[list[TransformComponent]] = None,
     ) -> "SimpleEngine":
         llm = llm or get_rag_llm()
 
@@ -256,8 +325,35 @@ class SimpleEngine(RetrieverQueryEngine):
             retriever=retriever,
             node_postprocessors=rankers,
             response_synthesizer=get_response_synthesizer(llm=llm),
+            transformations=transformations,
+            embed_model=embed_model,
         )
 
+    @staticmethod
+    def _get_ingested_index_config(
+        retriever_configs: Optional[list[BaseRetrieverConfig]], ingestion_config: IngestionConfig
+    ) -> Optional[FAISSIndexConfig]:
+        """The index persisted by an interrupted streaming ingestion, to resume from, None to start from empty.
+
+        The files in the checkpoint are skipped by the ingestion, so the checkpoint is removed if the index they went
+        into can not be loaded, e.g. a BM25 retriever alone persists no docstore. Chroma and Elasticsearch keep their
+        data by themselves, the checkpoint holds for them.
+        """
+        if not ingestion_config.persist_dir:
+            return None
+        persist_dir = Path(ingestion_config.persist_dir)
+        checkpoint_path = persist_dir / CHECKPOINT_FILENAME
+        if not checkpoint_path.exists():
+            return None
+
+        configs = retriever_configs or []
+        if any(isinstance(c, FAISSRetrieverConfig) for c in configs) and persist_dir.joinpath("docstore.json").exists():
+            return FAISSIndexConfig(persist_path=persist_dir)
+        if any(isinstance(c, (FAISSRetrieverConfig, BM25RetrieverConfig)) for c in configs):
+            logger.warning(f"No index to resume the ingestion in {persist_dir} from, all the files are ingested again")
+            checkpoint_path.unlink()
+        return None
+
     def _ensure_retriever_modifiable(self):
         self._ensure_retriever_of_type(ModifiableRAGRetriever)
 
@@ -285,6 +381,32 @@ class SimpleEngine(RetrieverQueryEngine):
     def _persist(self, persist_dir: str, **kwargs):
         self.retriever.persist(persist_dir, **kwargs)
 
+    def _ingest_files(self, input_files: list[str], ingestion_config: IngestionConfig) -> IngestionStats:
+        if ingestion_config.persist_dir:
+            self._ensure_retriever_persistable()
+
+        load_fn = partial(
+            self._load_and_split, transformations=self._transformations, file_extractor=self._get_file_extractor()
+        )
+        ingestion = StreamingIngestion(
+            load_fn=load_fn,
+            insert_fn=self._save_nodes,
+            embed_model=self._embed_model,
+            persist_fn=self._persist,
+            config=ingestion_config,
+        )
+        return ingestion.run(input_files)
+
+    @classmethod
+    def _load_and_split(
+        cls, input_file: str, transformations: list[TransformComponent], file_extractor: dict[str, BaseReader] = None
+    ) -> list[BaseNode]:
+        """Read one file into nodes, it runs in the worker processes of the streaming ingestion."""
+        documents = SimpleDirectoryReader(input_files=[input_file], file_extractor=file_extractor).load_data()
+        cls._fix_document_metadata(documents)
+
+        return run_transformations(documents, transformations=transformations)
+
     @staticmethod
     def _try_reconstruct_obj(nodes: list[NodeWithScore]):
         """If node is object, then dynamically reconstruct object, and save object to node.metadata["obj"]."""
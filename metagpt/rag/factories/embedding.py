@@ -13,6 +13,7 @@ from metagpt.config2 import config
 from metagpt.configs.embedding_config import EmbeddingType
 from metagpt.configs.llm_config import LLMType
 from metagpt.rag.factories.base import GenericFactory
+from metagpt.utils.embedding_cache import with_embedding_cache
 
 
 class RAGEmbeddingFactory(GenericFactory):
@@ -31,8 +32,8 @@ class RAGEmbeddingFactory(GenericFactory):
         super().__init__(creators)
 
     def get_rag_embedding(self, key: EmbeddingType = None) -> BaseEmbedding:
-        """Key is EmbeddingType."""
-        return super().get_instance(key or self._resolve_embedding_type())
+        """Key is EmbeddingType, the embedding is cached if `embedding.cache` is enabled."""
+        return with_embedding_cache(super().get_instance(key or self._resolve_embedding_type()))
 
     def _resolve_embedding_type(self) -> EmbeddingType | LLMType:
         """Resolves the embedding type.
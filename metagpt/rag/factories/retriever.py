@@ -27,6 +27,7 @@ from metagpt.rag.schema import (
     ElasticsearchKeywordRetrieverConfig,
     ElasticsearchRetrieverConfig,
     FAISSRetrieverConfig,
+    HybridRetrieverConfig,
 )
 
 
@@ -62,14 +63,25 @@ class RetrieverFactory(ConfigBasedFactory):
     def get_retriever(self, configs: list[BaseRetrieverConfig] = None, **kwargs) -> RAGRetriever:
         """Creates and returns a retriever instance based on the provided configurations.
 
-        If multiple retrievers, using SimpleHybridRetriever.
+        If multiple retrievers, using SimpleHybridRetriever, which fuses the results by the HybridRetrieverConfig if any.
         """
+        hybrid_configs = [c for c in configs or [] if isinstance(c, HybridRetrieverConfig)]
+        configs = [c for c in configs or [] if not isinstance(c, HybridRetrieverConfig)]
         if not configs:
             return self._create_default(**kwargs)
 
         retrievers = super().get_instances(configs, **kwargs)
-
-        return SimpleHybridRetriever(*retrievers) if len(retrievers) > 1 else retrievers[0]
+        if len(retrievers) == 1:
+            return retrievers[0]
+
+        hybrid_config = hybrid_configs[0] if hybrid_configs else HybridRetrieverConfig()
+        return SimpleHybridRetriever(
+            *retrievers,
+            fusion_mode=hybrid_config.fusion_mode,
+            weights=hybrid_config.weights,
+            rrf_k=hybrid_config.rrf_k,
+            similarity_top_k=hybrid_config.similarity_top_k,
+        )
 
     def _create_default(self, **kwargs) -> RAGRetriever:
         index = self._extract_index(None, **kwargs) or self._build_default_index(**kwargs)
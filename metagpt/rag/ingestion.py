@@ -0,0 +1,160 @@
+"""Streaming ingestion of documents."""
+
+import hashlib
+import json
+import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+from llama_index.core.embeddings import BaseEmbedding
+from llama_index.core.schema import BaseNode, MetadataMode
+from pydantic import BaseModel
+
+from metagpt.logs import logger
+from metagpt.rag.schema import IngestionConfig
+
+CHECKPOINT_FILENAME = "ingestion_checkpoint.json"
+
+
+def file_hash(file_path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """Sha256 of the file content, read in chunks."""
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _load_files(load_fn: Callable[[str], list[BaseNode]], input_files: list[str]) -> list[BaseNode]:
+    nodes = []
+    for input_file in input_files:
+        nodes.extend(load_fn(input_file))
+    return nodes
+
+
+class IngestionCheckpoint:
+    """The content hashes of the files already in the index."""
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path) if path else None
+        self.files: dict[str, str] = {}  # content hash -> file path
+        if self.path and self.path.exists():
+            self.files = json.loads(self.path.read_text(encoding="utf-8"))["files"]
+
+    def __contains__(self, content_hash: str) -> bool:
+        return content_hash in self.files
+
+    def add(self, content_hash: str, file_path: str):
+        self.files[content_hash] = file_path
+
+    def save(self):
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"files": self.files}, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+class IngestionStats(BaseModel):
+    files: int = 0
+    skipped_files: int = 0
+    nodes: int = 0
+
+
+class StreamingIngestion:
+    """Ingest files batch by batch instead of loading all of them into memory.
+
+    The files are read and split by `load_fn` in a process pool, a few batches ahead of the embedding. The nodes of a
+    batch are embedded by `embed_model` with bounded concurrency, then passed to `insert_fn`. If `config.persist_dir`
+    is set, `persist_fn` is called and the checkpoint is saved after each batch, so an interrupted ingestion can be
+    resumed by running it again, the files already ingested are skipped by their content hash.
+    """
+
+    def __init__(
+        self,
+        load_fn: Callable[[str], list[BaseNode]],
+        insert_fn: Callable[[list[BaseNode]], None],
+        embed_model: Optional[BaseEmbedding] = None,
+        persist_fn: Optional[Callable[[str], None]] = None,
+        config: Optional[IngestionConfig] = None,
+    ):
+        self.load_fn = load_fn
+        self.insert_fn = insert_fn
+        self.embed_model = embed_model
+        self.persist_fn = persist_fn
+        self.config = config or IngestionConfig()
+
+    def run(self, input_files: Iterable[Union[str, Path]]) -> IngestionStats:
+        stats = IngestionStats()
+        persist_dir = self.config.persist_dir
+        checkpoint = IngestionCheckpoint(Path(persist_dir) / CHECKPOINT_FILENAME if persist_dir else None)
+        batches = self._iter_batches(self._iter_new_files(input_files, checkpoint, stats))
+
+        num_workers = self.config.num_workers if self.config.num_workers is not None else os.cpu_count() or 1
+        with self._create_executor(num_workers) as executor, ThreadPoolExecutor(
+            max(self.config.max_concurrency, 1), thread_name_prefix="embed"
+        ) as embed_executor:
+            # The batches loaded ahead are bounded to bound the memory
+            pending = deque()
+            for batch in batches:
+                pending.append((batch, executor.submit(_load_files, self.load_fn, [f for f, _ in batch])))
+                if len(pending) > max(num_workers, 1):
+                    self._ingest_batch(*pending.popleft(), checkpoint, embed_executor, stats)
+            while pending:
+                self._ingest_batch(*pending.popleft(), checkpoint, embed_executor, stats)
+
+        logger.info(f"Ingested {stats.files} files into {stats.nodes} nodes, skipped {stats.skipped_files} files")
+        return stats
+
+    def _ingest_batch(self, batch, future, checkpoint: IngestionCheckpoint, embed_executor: Executor, stats):
+        nodes = future.result()
+        self._embed(nodes, embed_executor)
+        if nodes:
+            self.insert_fn(nodes)
+
+        for file_path, content_hash in batch:
+            checkpoint.add(content_hash, file_path)
+        if self.config.persist_dir and self.persist_fn:
+            self.persist_fn(str(self.config.persist_dir))
+        checkpoint.save()
+
+        stats.files += len(batch)
+        stats.nodes += len(nodes)
+        logger.debug(f"Ingested {len(batch)} files into {len(nodes)} nodes")
+
+    def _embed(self, nodes: list[BaseNode], embed_executor: Executor):
+        if not self.embed_model:
+            return
+        nodes = [node for node in nodes if node.embedding is None]
+        size = max(self.config.embed_batch_size, 1)
+        node_batches = [nodes[i : i + size] for i in range(0, len(nodes), size)]
+        text_batches = [[node.get_content(metadata_mode=MetadataMode.EMBED) for node in b] for b in node_batches]
+        for node_batch, embeddings in zip(
+            node_batches, embed_executor.map(self.embed_model.get_text_embedding_batch, text_batches)
+        ):
+            for node, embedding in zip(node_batch, embeddings):
+                node.embedding = embedding
+
+    def _iter_new_files(self, input_files: Iterable, checkpoint: IngestionCheckpoint, stats) -> Iterator[tuple]:
+        seen = set()
+        for input_file in input_files:
+            content_hash = file_hash(input_file)
+            if content_hash in checkpoint or content_hash in seen:
+                stats.skipped_files += 1
+                continue
+            seen.add(content_hash)
+            yield str(input_file), content_hash
+
+    def _iter_batches(self, files: Iterator[tuple]) -> Iterator[list[tuple]]:
+        while batch := list(islice(files, max(self.config.file_batch_size, 1))):
+            yield batch
+
+    @staticmethod
+    def _create_executor(num_workers: int) -> Executor:
+        if num_workers <= 0:
+            return ThreadPoolExecutor(1, thread_name_prefix="ingestion")
+        return ProcessPoolExecutor(num_workers)
@@ -1,16 +1,220 @@
 """BM25 retriever."""
-from typing import Callable, Optional
+import hashlib
+import heapq
+import json
+import math
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Union
 
+import numpy as np
 from llama_index.core import VectorStoreIndex
 from llama_index.core.callbacks.base import CallbackManager
 from llama_index.core.constants import DEFAULT_SIMILARITY_TOP_K
-from llama_index.core.schema import BaseNode, IndexNode
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import BaseNode, IndexNode, NodeWithScore, QueryBundle
 from llama_index.retrievers.bm25 import BM25Retriever
-from rank_bm25 import BM25Okapi
+from llama_index.retrievers.bm25.base import tokenize_remove_stopwords
+
+from metagpt.logs import logger
+
+BM25_INDEX_FILENAME = "bm25_index.json"
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index, which is updated in place when documents are added or deleted.
+
+    The scores are the same as `rank_bm25.BM25Okapi` built from the live documents, including the epsilon floor of
+    the negative idf. Only the term frequencies of each document are kept, so it can be persisted and reloaded
+    without tokenizing the documents again, as long as their content hashes match.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+
+        # Documents are stored in slots, a deleted slot is None until the slots are compacted
+        self.doc_ids: list[Optional[str]] = []
+        self.doc_freqs: list[Optional[dict[str, int]]] = []
+        self.doc_len: list[int] = []
+        self.doc_hashes: dict[str, str] = {}  # doc_id -> hash of the tokenized content, if known
+        self.postings: dict[str, dict[int, int]] = {}  # term -> {slot: term frequency}
+        self.total_len = 0
+        self._slots: dict[str, int] = {}
+
+        self._average_idf: Optional[float] = None
+        self._doc_len_array: Optional[np.ndarray] = None
+        self._posting_arrays: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+
+    @property
+    def corpus_size(self) -> int:
+        return len(self._slots)
+
+    @property
+    def avgdl(self) -> float:
+        return self.total_len / self.corpus_size if self.corpus_size else 0.0
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._slots
+
+    def __len__(self) -> int:
+        return self.corpus_size
+
+    def add(self, doc_id: str, tokens: Iterable[str], content_hash: Optional[str] = None):
+        """Add a document by its tokens, an existing document with the same id is replaced."""
+        self.add_frequencies(doc_id, Counter(tokens), content_hash)
+
+    def add_frequencies(self, doc_id: str, frequencies: dict[str, int], content_hash: Optional[str] = None):
+        if doc_id in self._slots:
+            self.delete(doc_id)
+        if content_hash:
+            self.doc_hashes[doc_id] = content_hash
+
+        slot = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        self.doc_freqs.append(dict(frequencies))
+        self.doc_len.append(sum(frequencies.values()))
+        self.total_len += self.doc_len[slot]
+        self._slots[doc_id] = slot
+        for term, freq in frequencies.items():
+            self.postings.setdefault(term, {})[slot] = freq
+            self._posting_arrays.pop(term, None)
+        self._invalidate()
+
+    def delete(self, doc_id: str) -> bool:
+        """Delete a document, return False if it is not in the index."""
+        slot = self._slots.pop(doc_id, None)
+        if slot is None:
+            return False
+        self.doc_hashes.pop(doc_id, None)
+
+        for term in self.doc_freqs[slot]:
+            posting = self.postings[term]
+            del posting[slot]
+            if not posting:
+                del self.postings[term]
+            self._posting_arrays.pop(term, None)
+        self.total_len -= self.doc_len[slot]
+        self.doc_ids[slot] = None
+        self.doc_freqs[slot] = None
+        self.doc_len[slot] = 0
+        self._invalidate()
+
+        if len(self.doc_ids) > 1024 and len(self.doc_ids) > 2 * self.corpus_size:
+            self.compact()
+        return True
+
+    def compact(self):
+        """Drop the slots of the deleted documents."""
+        docs = [(doc_id, freqs) for doc_id, freqs in zip(self.doc_ids, self.doc_freqs) if doc_id is not None]
+        doc_hashes = self.doc_hashes
+        self.__init__(self.k1, self.b, self.epsilon)
+        for doc_id, freqs in docs:
+            self.add_frequencies(doc_id, freqs, doc_hashes.get(doc_id))
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        if not df:
+            return 0.0
+        idf = math.log(self.corpus_size - df + 0.5) - math.log(df + 0.5)
+        return idf if idf >= 0 else self.epsilon * self.average_idf
+
+    @property
+    def average_idf(self) -> float:
+        if self._average_idf is None:
+            dfs = np.fromiter((len(posting) for posting in self.postings.values()), dtype=np.float64)
+            idfs = np.log(self.corpus_size - dfs + 0.5) - np.log(dfs + 0.5)
+            self._average_idf = float(idfs.mean()) if len(idfs) else 0.0
+        return self._average_idf
+
+    def get_scores(self, query: list[str]) -> np.ndarray:
+        """Scores of all the slots, the deleted ones are 0."""
+        scores = np.zeros(len(self.doc_ids))
+        if not self.corpus_size:
+            return scores
+
+        doc_len = self._get_doc_len_array()
+        norm = self.k1 * (1 - self.b + self.b * doc_len / self.avgdl)
+        for term in query:
+            if term not in self.postings:
+                continue
+            slots, tfs = self._get_posting_array(term)
+            scores[slots] += self.idf(term) * (tfs * (self.k1 + 1) / (tfs + norm[slots]))
+        return scores
+
+    def top_k(self, query: list[str], k: int) -> list[tuple[str, float]]:
+        """The `k` best documents with their scores, the ties are in the order of addition."""
+        scores = self.get_scores(query)
+        matched = [self._get_posting_array(term)[0] for term in set(query) if term in self.postings]
+        matched = np.unique(np.concatenate(matched)) if matched else np.zeros(0, dtype=np.int64)
+
+        # The unmatched documents score 0, only the first k of them may be in the result
+        candidates = matched.tolist()
+        matched_set = set(candidates)
+        unmatched = 0
+        for slot, doc_id in enumerate(self.doc_ids):
+            if unmatched >= k:
+                break
+            if doc_id is not None and slot not in matched_set:
+                candidates.append(slot)
+                unmatched += 1
+
+        best = heapq.nlargest(k, sorted(candidates), key=lambda slot: scores[slot])
+        return [(self.doc_ids[slot], float(scores[slot])) for slot in best]
+
+    def to_dict(self) -> dict:
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "epsilon": self.epsilon,
+            "docs": [
+                [doc_id, freqs, self.doc_hashes.get(doc_id)]
+                for doc_id, freqs in zip(self.doc_ids, self.doc_freqs)
+                if doc_id is not None
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BM25Index":
+        index = cls(k1=data["k1"], b=data["b"], epsilon=data["epsilon"])
+        for doc_id, freqs, *content_hash in data["docs"]:  # the hash is missing in the older indexes
+            index.add_frequencies(doc_id, freqs, content_hash[0] if content_hash else None)
+        return index
+
+    def save(self, path: Union[str, Path]):
+        Path(path).write_text(json.dumps(self.to_dict(), ensure_ascii=False), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "BM25Index":
+        return cls.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    def _invalidate(self):
+        self._average_idf = None
+        self._doc_len_array = None
+
+    def _get_doc_len_array(self) -> np.ndarray:
+        if self._doc_len_array is None:
+            self._doc_len_array = np.array(self.doc_len, dtype=np.float64)
+        return self._doc_len_array
+
+    def _get_posting_array(self, term: str) -> tuple[np.ndarray, np.ndarray]:
+        if term not in self._posting_arrays:
+            posting = self.postings[term]
+            self._posting_arrays[term] = (
+                np.fromiter(posting.keys(), dtype=np.int64, count=len(posting)),
+                np.fromiter(posting.values(), dtype=np.float64, count=len(posting)),
+            )
+        return self._posting_arrays[term]
 
 
 class DynamicBM25Retriever(BM25Retriever):
-    """BM25 retriever."""
+    """BM25 retriever.
+
+    Nodes are added to and deleted from an incremental `BM25Index`, instead of rebuilding `BM25Okapi` from the whole
+    corpus. If `persist_path` contains a persisted bm25 index, the nodes in it with the same content are not tokenized
+    again.
+    """
 
     def __init__(
         self,
@@ -22,28 +226,76 @@ class DynamicBM25Retriever(BM25Retriever):
         object_map: Optional[dict] = None,
         verbose: bool = False,
         index: VectorStoreIndex = None,
+        persist_path: Optional[Union[str, Path]] = None,
     ) -> None:
-        super().__init__(
-            nodes=nodes,
-            tokenizer=tokenizer,
-            similarity_top_k=similarity_top_k,
+        self._tokenizer = tokenizer or tokenize_remove_stopwords
+        self._similarity_top_k = similarity_top_k
+        self._node_map: dict[str, BaseNode] = {}
+        self._index = index
+        self.bm25 = self._load_bm25(persist_path)
+
+        node_ids = {node.node_id for node in nodes}
+        for doc_id in [doc_id for doc_id in self.bm25.doc_ids if doc_id is not None and doc_id not in node_ids]:
+            self.bm25.delete(doc_id)
+        self._add_to_bm25(nodes, tokenize_known=False)
+
+        BaseRetriever.__init__(
+            self,
             callback_manager=callback_manager,
             object_map=object_map,
             objects=objects,
             verbose=verbose,
         )
-        self._index = index
+
+    @property
+    def _nodes(self) -> list[BaseNode]:
+        return list(self._node_map.values())
 
     def add_nodes(self, nodes: list[BaseNode], **kwargs) -> None:
         """Support add nodes."""
-        self._nodes.extend(nodes)
-        self._corpus = [self._tokenizer(node.get_content()) for node in self._nodes]
-        self.bm25 = BM25Okapi(self._corpus)
+        self._add_to_bm25(nodes)
 
         if self._index:
             self._index.insert_nodes(nodes, **kwargs)
 
+    def delete_nodes(self, node_ids: list[str], **kwargs) -> None:
+        """Delete nodes by their ids."""
+        for node_id in node_ids:
+            self._node_map.pop(node_id, None)
+            self.bm25.delete(node_id)
+
+        if self._index:
+            self._index.delete_nodes(node_ids, **kwargs)
+
     def persist(self, persist_dir: str, **kwargs) -> None:
         """Support persist."""
         if self._index:
             self._index.storage_context.persist(persist_dir)
+
+        Path(persist_dir).mkdir(parents=True, exist_ok=True)
+        self.bm25.save(Path(persist_dir) / BM25_INDEX_FILENAME)
+
+    def _retrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        if query_bundle.custom_embedding_strs or query_bundle.embedding:
+            logger.warning("BM25Retriever does not support embeddings, skipping...")
+
+        tokenized_query = self._tokenizer(query_bundle.query_str)
+        return [
+            NodeWithScore(node=self._node_map[node_id], score=score)
+            for node_id, score in self.bm25.top_k(tokenized_query, self._similarity_top_k)
+        ]
+
+    def _add_to_bm25(self, nodes: list[BaseNode], tokenize_known: bool = True):
+        for node in nodes:
+            self._node_map[node.node_id] = node
+            content = node.get_content()
+            content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            if tokenize_known or self.bm25.doc_hashes.get(node.node_id) != content_hash:
+                self.bm25.add(node.node_id, self._tokenizer(content), content_hash)
+
+    @staticmethod
+    def _load_bm25(persist_path: Optional[Union[str, Path]]) -> BM25Index:
+        path = Path(persist_path) / BM25_INDEX_FILENAME if persist_path else None
+        if path and path.exists():
+            return BM25Index.load(path)
+        return BM25Index()
@@ -1,41 +1,123 @@
 """Hybrid retriever."""
 
+import asyncio
 import copy
+import time
+from typing import Optional
 
-from llama_index.core.schema import BaseNode, QueryType
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import BaseNode, NodeWithScore, QueryBundle, QueryType
 
+from metagpt.logs import logger
 from metagpt.rag.retrievers.base import RAGRetriever
+from metagpt.rag.schema import FusionMode
 
 
 class SimpleHybridRetriever(RAGRetriever):
-    """A composite retriever that aggregates search results from multiple retrievers."""
+    """A composite retriever that aggregates search results from multiple retrievers.
 
-    def __init__(self, *retrievers):
+    The retrievers are queried concurrently, the ones without a native async implementation run in threads. Their
+    results are fused by `fusion_mode`, see `FusionMode`.
+    """
+
+    def __init__(
+        self,
+        *retrievers,
+        fusion_mode: FusionMode = FusionMode.SIMPLE,
+        weights: Optional[list[float]] = None,
+        rrf_k: int = 60,
+        similarity_top_k: Optional[int] = None,
+    ):
         self.retrievers: list[RAGRetriever] = retrievers
+        if weights is not None and len(weights) != len(retrievers):
+            raise ValueError(f"Expect {len(retrievers)} weights, got {len(weights)}")
+        self.fusion_mode = FusionMode(fusion_mode)
+        self.weights = list(weights) if weights is not None else [1.0] * len(retrievers)
+        self.rrf_k = rrf_k
+        self.similarity_top_k = similarity_top_k
+        self._metrics = [{"calls": 0, "total_time": 0.0, "last_time": 0.0} for _ in retrievers]
         super().__init__()
 
+    @property
+    def metrics(self) -> dict[str, dict]:
+        """Latency of each retriever in seconds, keyed by `{index}:{class name}`"""
+        return {f"{i}:{type(r).__name__}": dict(m) for i, (r, m) in enumerate(zip(self.retrievers, self._metrics))}
+
     async def _aretrieve(self, query: QueryType, **kwargs):
-        """Asynchronously retrieves and aggregates search results from all configured retrievers.
-
-        This method queries each retriever in the `retrievers` list with the given query and
-        additional keyword arguments. It then combines the results, ensuring that each node is
-        unique, based on the node's ID.
-        """
-        all_nodes = []
-        for retriever in self.retrievers:
-            # Prevent retriever changing query
-            query_copy = copy.deepcopy(query)
-            nodes = await retriever.aretrieve(query_copy, **kwargs)
-            all_nodes.extend(nodes)
-
-        # combine all nodes
-        result = []
-        node_ids = set()
-        for n in all_nodes:
-            if n.node.node_id not in node_ids:
-                result.append(n)
-                node_ids.add(n.node.node_id)
-        return result
+        """Asynchronously retrieves and fuses search results from all configured retrievers."""
+        if isinstance(query, str):
+            query = QueryBundle(query)
+        results = await asyncio.gather(*[self._aretrieve_one(i, query, **kwargs) for i in range(len(self.retrievers))])
+        if self.fusion_mode == FusionMode.RECIPROCAL_RANK:
+            nodes = self._reciprocal_rank_fusion(results)
+        elif self.fusion_mode == FusionMode.RELATIVE_SCORE:
+            nodes = self._relative_score_fusion(results)
+        else:
+            nodes = self._simple_fusion(results)
+        return nodes[: self.similarity_top_k] if self.similarity_top_k else nodes
+
+    async def _aretrieve_one(self, index: int, query: QueryBundle, **kwargs) -> list[NodeWithScore]:
+        retriever = self.retrievers[index]
+        # Prevent retriever changing query, e.g. setting the embedding
+        query = copy.copy(query)
+        start = time.perf_counter()
+        if getattr(type(retriever), "_aretrieve", None) is BaseRetriever._aretrieve:
+            # The default `_aretrieve` of llama_index calls the blocking `_retrieve` in the event loop
+            nodes = await asyncio.to_thread(retriever.retrieve, query)
+        else:
+            nodes = await retriever.aretrieve(query, **kwargs)
+        cost = time.perf_counter() - start
+
+        metrics = self._metrics[index]
+        metrics["calls"] += 1
+        metrics["total_time"] += cost
+        metrics["last_time"] = cost
+        logger.debug(f"{type(retriever).__name__} retrieved {len(nodes)} nodes in {cost * 1000:.1f}ms")
+        return nodes
+
+    @staticmethod
+    def _simple_fusion(results: list[list[NodeWithScore]]) -> list[NodeWithScore]:
+        """Keep the first occurrence of each node, with the highest score among the retrievers."""
+        fused: dict[str, NodeWithScore] = {}
+        for nodes in results:
+            for n in nodes:
+                node_id = n.node.node_id
+                if node_id not in fused:
+                    fused[node_id] = NodeWithScore(node=n.node, score=n.score)
+                elif n.score is not None and (fused[node_id].score is None or n.score > fused[node_id].score):
+                    fused[node_id].score = n.score
+        return list(fused.values())
+
+    def _reciprocal_rank_fusion(self, results: list[list[NodeWithScore]]) -> list[NodeWithScore]:
+        scores: dict[str, float] = {}
+        node_map: dict[str, BaseNode] = {}
+        for weight, nodes in zip(self.weights, results):
+            for rank, n in enumerate(nodes, start=1):
+                node_id = n.node.node_id
+                node_map.setdefault(node_id, n.node)
+                scores[node_id] = scores.get(node_id, 0.0) + weight / (self.rrf_k + rank)
+        return self._sorted_nodes(scores, node_map)
+
+    def _relative_score_fusion(self, results: list[list[NodeWithScore]]) -> list[NodeWithScore]:
+        scores: dict[str, float] = {}
+        node_map: dict[str, BaseNode] = {}
+        for weight, nodes in zip(self.weights, results):
+            raw = [n.score or 0.0 for n in nodes]
+            if not raw:
+                continue
+            low, high = min(raw), max(raw)
+            for n, score in zip(nodes, raw):
+                node_id = n.node.node_id
+                node_map.setdefault(node_id, n.node)
+                normalized = (score - low) / (high - low) if high > low else 1.0
+                scores[node_id] = scores.get(node_id, 0.0) + weight * normalized
+        return self._sorted_nodes(scores, node_map)
+
+    @staticmethod
+    def _sorted_nodes(scores: dict[str, float], node_map: dict[str, BaseNode]) -> list[NodeWithScore]:
+        # sorted is stable, the ties keep the order of their first appearance
+        node_ids = sorted(scores, key=lambda node_id: scores[node_id], reverse=True)
+        return [NodeWithScore(node=node_map[node_id], score=scores[node_id]) for node_id in node_ids]
 
     def add_nodes(self, nodes: list[BaseNode]) -> None:
         """Support add nodes."""
@@ -59,6 +59,10 @@ class FAISSRetrieverConfig(IndexRetrieverConfig):
 class BM25RetrieverConfig(IndexRetrieverConfig):
     """Config for BM25-based retrievers."""
 
+    persist_path: Optional[Union[str, Path]] = Field(
+        default=None, description="The directory of the persisted bm25 index, which is loaded without re-tokenizing."
+    )
+
     _no_embedding: bool = PrivateAttr(default=True)
 
 
@@ -101,6 +105,26 @@ class ElasticsearchKeywordRetrieverConfig(ElasticsearchRetrieverConfig):
     )
 
 
+class FusionMode(str, Enum):
+    """How SimpleHybridRetriever combines the results of its retrievers."""
+
+    SIMPLE = "simple"  # keep the first occurrence of each node and the highest score
+    RECIPROCAL_RANK = "reciprocal_rank"  # sum of weight / (rrf_k + rank)
+    RELATIVE_SCORE = "relative_score"  # sum of weight * min-max normalized score
+
+
+class HybridRetrieverConfig(BaseRetrieverConfig):
+    """Config of how the results of the other retrievers in the list are fused by SimpleHybridRetriever."""
+
+    _no_embedding: bool = PrivateAttr(default=True)
+    similarity_top_k: Optional[int] = Field(default=None, description="Number of fused results, None for all.")
+    fusion_mode: FusionMode = Field(default=FusionMode.SIMPLE, description="The fusion algorithm.")
+    weights: Optional[list[float]] = Field(
+        default=None, description="Weight of each retriever, in the order of the configs, default to 1.0 for each."
+    )
+    rrf_k: int = Field(default=60, description="The rank constant of reciprocal rank fusion.")
+
+
 class BaseRankerConfig(BaseModel):
     """Common config for rankers.
 
@@ -189,6 +213,24 @@ class ElasticsearchKeywordIndexConfig(ElasticsearchIndexConfig):
     _no_embedding: bool = PrivateAttr(default=True)
 
 
+class IngestionConfig(BaseModel):
+    """Config for the streaming ingestion of documents, see `SimpleEngine.from_docs`."""
+
+    num_workers: Optional[int] = Field(
+        default=None,
+        description="Number of processes to read and split the files, None for the number of CPUs, "
+        "0 to do it in a thread of the current process, e.g. when the file extractors can't be pickled.",
+    )
+    file_batch_size: int = Field(default=16, description="Number of files inserted into the index at a time.")
+    embed_batch_size: int = Field(default=64, description="Number of nodes embedded in one request.")
+    max_concurrency: int = Field(default=4, description="Max number of concurrent embedding requests.")
+    persist_dir: Optional[Union[str, Path]] = Field(
+        default=None,
+        description="Persist the index and a checkpoint after each batch of files, "
+        "then the files whose content hash is in the checkpoint are skipped when resuming.",
+    )
+
+
 class ObjectNodeMetadata(BaseModel):
     """Metadata of ObjectNode."""
 
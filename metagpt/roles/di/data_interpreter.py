@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import json
 from typing import Literal
 
@@ -7,6 +8,7 @@ from pydantic import Field, model_validator
 
 from metagpt.actions.di.ask_review import ReviewConst
 from metagpt.actions.di.execute_nb_code import ExecuteNbCode
+from metagpt.actions.di.kernel_pool import KernelPool
 from metagpt.actions.di.write_analysis_code import CheckData, WriteAnalysisCode
 from metagpt.logs import logger
 from metagpt.prompts.di.write_analysis_code import DATA_INFO
@@ -43,6 +45,11 @@ class DataInterpreter(Role):
     tool_recommender: ToolRecommender = None
     react_mode: Literal["plan_and_act", "react"] = "plan_and_act"
     max_react_loop: int = 10  # used for react mode
+    # write and execute the given number of candidates concurrently at each trial, each in a fork of the kernel.
+    # A fork runs the successful cells so far again, so the cells should be idempotent, without e.g. randomness or
+    # writing files, and the trials are serial once a fork would run more than `max_replay_cells` cells.
+    speculative_trials: int = 1
+    max_replay_cells: int = 20
 
     @model_validator(mode="after")
     def set_plan_and_tool(self) -> "Interpreter":
@@ -60,6 +67,19 @@ class DataInterpreter(Role):
     def working_memory(self):
         return self.rc.working_memory
 
+    async def react(self) -> Message:
+        kernel_pool = None
+        if self.speculative_trials > 1 and not self.execute_code.kernel_pool:
+            # one kernel for each candidate, and one for the committed state
+            kernel_pool = self.execute_code.kernel_pool = KernelPool(size=self.speculative_trials + 1)
+        try:
+            return await super().react()
+        finally:
+            if kernel_pool:
+                await self.execute_code.terminate()
+                await kernel_pool.close()
+                self.execute_code.kernel_pool = None
+
     async def _think(self) -> bool:
         """Useful in 'react' mode. Use LLM to decide whether and what to do next."""
         user_requirement = self.get_memories()[0].content
@@ -121,16 +141,19 @@ class DataInterpreter(Role):
         await self._check_data()
 
         while not success and counter < max_retry:
-            ### write code ###
-            code, cause_by = await self._write_code(counter, plan_status, tool_info)
+            if self.speculative_trials > 1 and len(self.execute_code.replay_cells) <= self.max_replay_cells:
+                code, result, success = await self._write_and_exec_candidates(counter, plan_status, tool_info)
+            else:
+                ### write code ###
+                code, cause_by = await self._write_code(counter, plan_status, tool_info)
 
-            self.working_memory.add(Message(content=code, role="assistant", cause_by=cause_by))
+                self.working_memory.add(Message(content=code, role="assistant", cause_by=cause_by))
 
-            ### execute code ###
-            result, success = await self.execute_code.run(code)
-            print(result)
+                ### execute code ###
+                result, success = await self.execute_code.run(code)
+                print(result)
 
-            self.working_memory.add(Message(content=result, role="user", cause_by=ExecuteNbCode))
+                self.working_memory.add(Message(content=result, role="user", cause_by=ExecuteNbCode))
 
             ### process execution result ###
             counter += 1
@@ -143,6 +166,49 @@ class DataInterpreter(Role):
 
         return code, result, success
 
+    async def _write_and_exec_candidates(self, counter: int, plan_status: str = "", tool_info: str = ""):
+        """Write `speculative_trials` candidates concurrently, execute each one in a fork of the kernel as soon as it
+        is written, and commit the kernel of the first successful one. The candidates are added to the working memory
+        only if they all fail."""
+
+        async def write_and_exec():
+            code, cause_by = await self._write_code(counter, plan_status, tool_info)
+            forked = await self.execute_code.fork()
+            try:
+                result, success = await forked.run(code)
+            except BaseException:
+                if forked.nb_client.km is not None:
+                    await forked.nb_client.km.interrupt_kernel()  # do not wait for the cell to return it to the pool
+                await forked.terminate()
+                raise
+            return code, cause_by, result, success, forked
+
+        tasks = [asyncio.create_task(write_and_exec()) for _ in range(self.speculative_trials)]
+        failed = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                code, cause_by, result, success, forked = await next_done
+                print(result)
+                if success:
+                    await self.execute_code.commit(forked)
+                    self.working_memory.add(Message(content=code, role="assistant", cause_by=cause_by))
+                    self.working_memory.add(Message(content=result, role="user", cause_by=ExecuteNbCode))
+                    return code, result, success
+                await forked.terminate()
+                failed.append((code, cause_by, result))
+        finally:
+            for task in tasks:
+                task.cancel()
+            # release the forks of the candidates finished but not looked at, a committed fork has no kernel left
+            for outcome in await asyncio.gather(*tasks, return_exceptions=True):
+                if isinstance(outcome, tuple):
+                    await outcome[-1].terminate()
+
+        for code, cause_by, result in failed:
+            self.working_memory.add(Message(content=code, role="assistant", cause_by=cause_by))
+            self.working_memory.add(Message(content=result, role="user", cause_by=ExecuteNbCode))
+        return code, result, False
+
     async def _write_code(
         self,
         counter: int,
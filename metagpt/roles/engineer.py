@@ -19,14 +19,21 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
+import re
 from collections import defaultdict
 from pathlib import Path
 from typing import Optional, Set
 
 from metagpt.actions import Action, WriteCode, WriteCodeReview, WriteTasks
 from metagpt.actions.fix_bug import FixBug
-from metagpt.actions.project_management_an import REFINED_TASK_LIST, TASK_LIST
+from metagpt.actions.project_management_an import (
+    LOGIC_ANALYSIS,
+    REFINED_LOGIC_ANALYSIS,
+    REFINED_TASK_LIST,
+    TASK_LIST,
+)
 from metagpt.actions.summarize_code import SummarizeCode
 from metagpt.actions.write_code_plan_and_change_an import WriteCodePlanAndChange
 from metagpt.const import (
@@ -69,6 +76,7 @@ class Engineer(Role):
         constraints (str): Constraints for the engineer.
         n_borg (int): Number of borgs.
         use_code_review (bool): Whether to use code review.
+        max_code_concurrency (int): Maximum number of files written concurrently, files wait for their dependencies.
     """
 
     name: str = "Alex"
@@ -84,6 +92,7 @@ class Engineer(Role):
     summarize_todos: list = []
     next_todo_action: str = ""
     n_summarize: int = 0
+    max_code_concurrency: int = 1
 
     def __init__(self, **kwargs) -> None:
         super().__init__(**kwargs)
@@ -99,44 +108,109 @@ class Engineer(Role):
         m = json.loads(task_msg.content)
         return m.get(TASK_LIST.key) or m.get(REFINED_TASK_LIST.key)
 
+    @staticmethod
+    def _parse_logic_analysis(task_msg: Document) -> dict[str, str]:
+        m = json.loads(task_msg.content)
+        logic_analysis = m.get(LOGIC_ANALYSIS.key) or m.get(REFINED_LOGIC_ANALYSIS.key)
+        if not isinstance(logic_analysis, list):  # Legacy format, a plain text analysis
+            return {}
+        return {i[0]: i[1] for i in logic_analysis if isinstance(i, list) and len(i) >= 2}
+
+    async def _get_code_todo_dependencies(self) -> list[set[int]]:
+        """Return the indices of the preceding `code_todos` each todo depends on.
+
+        The dependencies come from the `Logic Analysis` of the task document, where a file depends on the files whose
+        names or module names are mentioned in its analysis, and from the source files recorded in
+        `.dependencies.json`. A todo without any analysis depends on all the preceding todos, as the task list is
+        prioritized by dependency order. Only preceding todos are considered, so the graph is always acyclic.
+        """
+        filenames = [todo.i_context.filename for todo in self.code_todos]
+        dependencies = []
+        for i, todo in enumerate(self.code_todos):
+            coding_context = CodingContext.loads(todo.i_context.content)
+            analysis = self._parse_logic_analysis(coding_context.task_doc) if coding_context.task_doc else {}
+            desc = analysis.get(filenames[i], analysis.get(Path(filenames[i]).name))
+            if desc is None:
+                dependencies.append(set(range(i)))
+                continue
+            src_dependencies = await self.project_repo.srcs.get_dependency(filename=filenames[i])
+            depends = set()
+            for j in range(i):
+                rpath = str(self.project_repo.src_relative_path / filenames[j])
+                names = {filenames[j], Path(filenames[j]).name, Path(filenames[j]).stem}
+                if rpath in src_dependencies or any(re.search(rf"\b{re.escape(n)}\b", desc) for n in names):
+                    depends.add(j)
+            dependencies.append(depends)
+        return dependencies
+
     async def _act_sp_with_cr(self, review=False) -> Set[str]:
+        """Write the code of `code_todos`.
+
+        The todos are written level by level of their dependencies, the independent files of a level are written
+        concurrently up to `max_code_concurrency`, after all the files of the previous levels are saved. The files of a
+        level are saved once all of them are written, in the order of `code_todos`, so that each file is written with
+        the same code context regardless of the order the others finish in, and the outcome is deterministic. Without
+        concurrency, each todo is a level of its own, and is written with the code of all the preceding ones.
+        """
         changed_files = set()
-        for todo in self.code_todos:
-            """
-            # Select essential information from the historical data to reduce the length of the prompt (summarized from human experience):
-            1. All from Architect
-            2. All from ProjectManager
-            3. Do we need other codes (currently needed)?
-            TODO: The goal is not to need it. After clear task decomposition, based on the design idea, you should be able to write a single file without needing other codes. If you can't, it means you need a clearer definition. This is the key to writing longer code.
-            """
-            coding_context = await todo.run()
-            # Code review
-            if review:
-                action = WriteCodeReview(i_context=coding_context, context=self.context, llm=self.llm)
-                self._init_action(action)
-                coding_context = await action.run()
-
-            dependencies = {coding_context.design_doc.root_relative_path, coding_context.task_doc.root_relative_path}
-            if self.config.inc:
-                dependencies.add(coding_context.code_plan_and_change_doc.root_relative_path)
-            await self.project_repo.srcs.save(
-                filename=coding_context.filename,
-                dependencies=list(dependencies),
-                content=coding_context.code_doc.content,
-            )
-            msg = Message(
-                content=coding_context.model_dump_json(),
-                instruct_content=coding_context,
-                role=self.profile,
-                cause_by=WriteCode,
-            )
-            self.rc.memory.add(msg)
-
-            changed_files.add(coding_context.code_doc.filename)
+        if self.max_code_concurrency > 1:
+            levels = []
+            for depends in await self._get_code_todo_dependencies():
+                levels.append(max((levels[j] + 1 for j in depends), default=0))
+        else:
+            levels = list(range(len(self.code_todos)))
+        semaphore = asyncio.Semaphore(max(self.max_code_concurrency, 1))
+
+        async def _write(todo: WriteCode) -> CodingContext:
+            async with semaphore:
+                """
+                # Select essential information from the historical data to reduce the length of the prompt (summarized from human experience):
+                1. All from Architect
+                2. All from ProjectManager
+                3. Do we need other codes (currently needed)?
+                TODO: The goal is not to need it. After clear task decomposition, based on the design idea, you should be able to write a single file without needing other codes. If you can't, it means you need a clearer definition. This is the key to writing longer code.
+                """
+                coding_context = await todo.run()
+                # Code review
+                if review:
+                    action = WriteCodeReview(i_context=coding_context, context=self.context, llm=self.llm)
+                    self._init_action(action)
+                    coding_context = await action.run()
+                return coding_context
+
+        for level in range(max(levels, default=-1) + 1):
+            todos = [todo for todo, i in zip(self.code_todos, levels) if i == level]
+            tasks = [asyncio.create_task(_write(todo)) for todo in todos]
+            try:
+                coding_contexts = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+            for coding_context in coding_contexts:
+                await self._save_code(coding_context)
+                changed_files.add(coding_context.code_doc.filename)
         if not changed_files:
             logger.info("Nothing has changed.")
         return changed_files
 
+    async def _save_code(self, coding_context: CodingContext):
+        dependencies = {coding_context.design_doc.root_relative_path, coding_context.task_doc.root_relative_path}
+        if self.config.inc:
+            dependencies.add(coding_context.code_plan_and_change_doc.root_relative_path)
+        await self.project_repo.srcs.save(
+            filename=coding_context.filename,
+            dependencies=list(dependencies),
+            content=coding_context.code_doc.content,
+        )
+        msg = Message(
+            content=coding_context.model_dump_json(),
+            instruct_content=coding_context,
+            role=self.profile,
+            cause_by=WriteCode,
+        )
+        self.rc.memory.add(msg)
+
     async def _act(self) -> Message | None:
         """Determines the mode of action based on whether code review is used."""
         if self.rc.todo is None:
@@ -19,6 +19,7 @@ from metagpt.const import MESSAGE_ROUTE_TO_ALL, SERDESER_PATH
 from metagpt.context import Context
 from metagpt.environment import Environment
 from metagpt.logs import logger
+from metagpt.provider.http_client_pool import HTTP_CLIENT_POOL
 from metagpt.roles import Role
 from metagpt.schema import Message
 from metagpt.utils.common import (
@@ -120,19 +121,27 @@ class Team(BaseModel):
         return self.run_project(idea=idea, send_to=send_to)
 
     @serialize_decorator
-    async def run(self, n_round=3, idea="", send_to="", auto_archive=True):
-        """Run company until target round or no money"""
+    async def run(self, n_round=3, idea="", send_to="", auto_archive=True, event_driven=False):
+        """Run company until target round or no money
+
+        If `event_driven`, roles run as soon as they receive messages instead of in lock-step rounds, and each role
+        runs `n_round` times at most.
+        """
         if idea:
             self.run_project(idea=idea, send_to=send_to)
 
-        while n_round > 0:
-            if self.env.is_idle:
-                logger.debug("All roles are idle.")
-                break
-            n_round -= 1
-            self._check_balance()
-            await self.env.run()
-
-            logger.debug(f"max {n_round=} left.")
+        async with HTTP_CLIENT_POOL.session():
+            if event_driven:
+                await self.env.run_until_idle(max_runs_per_role=n_round, before_run=self._check_balance)
+            else:
+                while n_round > 0:
+                    if self.env.is_idle:
+                        logger.debug("All roles are idle.")
+                        break
+                    n_round -= 1
+                    self._check_balance()
+                    await self.env.run()
+
+                    logger.debug(f"max {n_round=} left.")
         self.env.archive(auto_archive)
         return self.env.history
@@ -7,10 +7,10 @@
 """
 
 from enum import Enum
-from metagpt.tools import libs  # this registers all tools
-from metagpt.tools.tool_registry import TOOL_REGISTRY
 
-_ = libs, TOOL_REGISTRY  # Avoid pre-commit error
+from metagpt.tools.tool_registry import TOOL_REGISTRY  # the tools are registered on first access
+
+_ = TOOL_REGISTRY  # Avoid pre-commit error
 
 
 class SearchEngineType(Enum):
@@ -4,20 +4,15 @@
 # @Author  : lidanyang
 # @File    : __init__.py
 # @Desc    :
-from metagpt.tools.libs import (
-    data_preprocess,
-    feature_engineering,
-    sd_engine,
-    gpt_v_generator,
-    web_scraping,
-    email_login,
-)
 
-_ = (
-    data_preprocess,
-    feature_engineering,
-    sd_engine,
-    gpt_v_generator,
-    web_scraping,
-    email_login,
-)  # Avoid pre-commit error
+# The modules registering tools, they are imported on first use only, see `metagpt.tools.tool_registry.TOOL_REGISTRY`.
+# Rebuild the tool manifest after changing them:
+# python -c "from metagpt.tools.tool_registry import build_tool_manifest; build_tool_manifest()"
+TOOL_LIBS = [
+    "metagpt.tools.libs.data_preprocess",
+    "metagpt.tools.libs.feature_engineering",
+    "metagpt.tools.libs.sd_engine",
+    "metagpt.tools.libs.gpt_v_generator",
+    "metagpt.tools.libs.web_scraping",
+    "metagpt.tools.libs.email_login",
+]
@@ -8,6 +8,7 @@ class ToolSchema(BaseModel):
 class Tool(BaseModel):
     name: str
     path: str
+    module: str = ""  # the module to import the tool from
     schemas: dict = {}
     code: str = ""
     tags: list[str] = []
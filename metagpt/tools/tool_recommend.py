@@ -200,14 +200,42 @@ class BM25ToolRecommender(ToolRecommender):
 
 class EmbeddingToolRecommender(ToolRecommender):
     """
-    NOTE: To be implemented.
     A ToolRecommender using embeddings at the recall stage:
     1. Recall: Use embeddings to calculate the similarity between query and tool info;
     2. Rank: LLM rank, the same as the default ToolRecommender.
+    The tool info is embedded once per recommender, and by the embedding cache across runs if `embedding.cache` is enabled.
     """
 
+    embed_model: Any = None
+    tool_embeddings: Any = None
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
+    def _init_embed_model(self):
+        if self.embed_model is None:
+            from metagpt.rag.factories import get_rag_embedding
+
+            self.embed_model = get_rag_embedding()
+
+    async def _init_tool_embeddings(self):
+        if self.tool_embeddings is None:
+            corpus = [f"{tool.name} {tool.tags}: {tool.schemas['description']}" for tool in self.tools.values()]
+            embeddings = np.array(await self.embed_model.aget_text_embedding_batch(corpus))
+            self.tool_embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
     async def recall_tools(self, context: str = "", plan: Plan = None, topk: int = 20) -> list[Tool]:
-        pass
+        query = plan.current_task.instruction if plan else context
+
+        self._init_embed_model()
+        await self._init_tool_embeddings()
+        query_embedding = np.array(await self.embed_model.aget_query_embedding(query))
+        doc_scores = self.tool_embeddings @ (query_embedding / np.linalg.norm(query_embedding))
+        top_indexes = np.argsort(doc_scores)[::-1][:topk]
+        recalled_tools = [list(self.tools.values())[index] for index in top_indexes]
+
+        logger.info(
+            f"Recalled tools: \n{[tool.name for tool in recalled_tools]}; Scores: {[np.round(doc_scores[index], 4) for index in top_indexes]}"
+        )
+
+        return recalled_tools
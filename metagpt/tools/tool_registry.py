@@ -7,16 +7,23 @@
 """
 from __future__ import annotations
 
+import hashlib
+import importlib
+import importlib.util
 import inspect
+import json
 import os
+import threading
 from collections import defaultdict
 from pathlib import Path
+from typing import Any, Optional
 
 import yaml
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
-from metagpt.const import TOOL_SCHEMA_PATH
+from metagpt.const import TOOL_MANIFEST_PATH
 from metagpt.logs import logger
+from metagpt.tools.libs import TOOL_LIBS
 from metagpt.tools.tool_convert import (
     convert_code_to_tool_schema,
     convert_code_to_tool_schema_ast,
@@ -27,11 +34,19 @@ from metagpt.tools.tool_data_type import Tool, ToolSchema
 class ToolRegistry(BaseModel):
     tools: dict = {}
     tools_by_tags: dict = defaultdict(dict)  # two-layer k-v, {tag: {tool_name: {...}, ...}, ...}
+    # the tools of the modules are registered from the manifest on first access, the modules are imported instead if
+    # the manifest is missing or outdated
+    tool_modules: list[str] = []
+    manifest_path: Optional[Path] = None
+
+    _loaded: bool = PrivateAttr(default=False)
+    _lock: threading.RLock = PrivateAttr(default_factory=threading.RLock)
 
     def register_tool(
         self,
         tool_name: str,
         tool_path: str,
+        tool_module: str = "",
         schemas: dict = None,
         schema_path: str = "",
         tool_code: str = "",
@@ -43,8 +58,6 @@ class ToolRegistry(BaseModel):
         if self.has_tool(tool_name):
             return
 
-        schema_path = schema_path or TOOL_SCHEMA_PATH / f"{tool_name}.yml"
-
         if not schemas:
             schemas = make_schema(tool_source_object, include_functions, schema_path)
 
@@ -60,68 +73,119 @@ class ToolRegistry(BaseModel):
             #     f"{tool_name} schema not conforms to required format, but will be used anyway. Mismatch: {e}"
             # )
         tags = tags or []
-        tool = Tool(name=tool_name, path=tool_path, schemas=schemas, code=tool_code, tags=tags)
-        self.tools[tool_name] = tool
-        for tag in tags:
-            self.tools_by_tags[tag].update({tool_name: tool})
+        self._add_tool(
+            Tool(name=tool_name, path=tool_path, module=tool_module, schemas=schemas, code=tool_code, tags=tags)
+        )
         if verbose:
             logger.info(f"{tool_name} registered")
-            logger.info(f"schema made at {str(schema_path)}, can be used for checking")
+            if schema_path:
+                logger.info(f"schema made at {str(schema_path)}, can be used for checking")
 
     def has_tool(self, key: str) -> Tool:
+        self.load()
         return key in self.tools
 
     def get_tool(self, key) -> Tool:
+        self.load()
         return self.tools.get(key)
 
     def get_tools_by_tag(self, key) -> dict[str, Tool]:
+        self.load()
         return self.tools_by_tags.get(key, {})
 
     def get_all_tools(self) -> dict[str, Tool]:
+        self.load()
         return self.tools
 
     def has_tool_tag(self, key) -> bool:
+        self.load()
         return key in self.tools_by_tags
 
     def get_tool_tags(self) -> list[str]:
+        self.load()
         return list(self.tools_by_tags.keys())
 
+    def import_tool(self, key) -> Any:
+        """Import the class or function of a tool, its module is imported on first use only"""
+        tool = self.get_tool(key)
+        if not tool or not tool.module:
+            raise ValueError(f"Tool {key} not registered from a module")
+        return getattr(importlib.import_module(tool.module), tool.name)
+
+    def load(self):
+        """Register the tools of `tool_modules`, from the manifest if it is up to date"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True  # the imported modules register their tools through this registry
+            if not self.tool_modules:
+                return
+            manifest = read_tool_manifest(self.manifest_path) if self.manifest_path else {}
+            if manifest.get("code_hash") == get_code_hash(self.tool_modules):
+                for tool in manifest["tools"]:
+                    self._add_tool(Tool(**tool))
+                return
+            if self.manifest_path:
+                logger.warning(f"Tool manifest {self.manifest_path} outdated, importing the tools instead")
+            for module_name in self.tool_modules:
+                importlib.import_module(module_name)
+
+    def _add_tool(self, tool: Tool):
+        self.tools[tool.name] = tool
+        for tag in tool.tags:
+            self.tools_by_tags[tag].update({tool.name: tool})
+
 
 # Registry instance
-TOOL_REGISTRY = ToolRegistry()
+TOOL_REGISTRY = ToolRegistry(tool_modules=TOOL_LIBS, manifest_path=TOOL_MANIFEST_PATH)
+
+# the decorated tools of each module, for building the manifest
+_TOOL_DEFINITIONS: dict[str, list[tuple[Any, dict]]] = defaultdict(list)
 
 
 def register_tool(tags: list[str] = None, schema_path: str = "", **kwargs):
     """register a tool to registry"""
 
     def decorator(cls):
-        # Get the file path where the function / class is defined and the source code
-        file_path = inspect.getfile(cls)
-        if "metagpt" in file_path:
-            # split to handle ../metagpt/metagpt/tools/... where only metapgt/tools/... is needed
-            file_path = "metagpt" + file_path.split("metagpt")[-1]
-        source_code = inspect.getsource(cls)
-
-        TOOL_REGISTRY.register_tool(
-            tool_name=cls.__name__,
-            tool_path=file_path,
-            schema_path=schema_path,
-            tool_code=source_code,
-            tags=tags,
-            tool_source_object=cls,
-            **kwargs,
-        )
+        registry_kwargs = dict(tags=tags, schema_path=schema_path, **kwargs)
+        _TOOL_DEFINITIONS[cls.__module__].append((cls, registry_kwargs))
+        # the tools listed in the manifest are registered already
+        if not TOOL_REGISTRY.has_tool(cls.__name__):
+            register_tool_object(TOOL_REGISTRY, cls, **registry_kwargs)
         return cls
 
     return decorator
 
 
-def make_schema(tool_source_object, include, path):
-    os.makedirs(os.path.dirname(path), exist_ok=True)  # Create the necessary directories
+def register_tool_object(registry: ToolRegistry, cls, **kwargs):
+    """register a class or function to the registry, with the schema made from its source code"""
+    # Get the file path where the function / class is defined and the source code
+    file_path = inspect.getfile(cls)
+    if "metagpt" in file_path:
+        # split to handle ../metagpt/metagpt/tools/... where only metapgt/tools/... is needed
+        file_path = "metagpt" + file_path.split("metagpt")[-1]
+    source_code = inspect.getsource(cls)
+
+    registry.register_tool(
+        tool_name=cls.__name__,
+        tool_path=file_path,
+        tool_module=cls.__module__,
+        tool_code=source_code,
+        tool_source_object=cls,
+        **kwargs,
+    )
+
+
+def make_schema(tool_source_object, include, path=""):
+    """Make the schema of a class or function, it is also dumped to `path` if provided"""
     try:
         schema = convert_code_to_tool_schema(tool_source_object, include=include)
-        with open(path, "w", encoding="utf-8") as f:
-            yaml.dump(schema, f, sort_keys=False)
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)  # Create the necessary directories
+            with open(path, "w", encoding="utf-8") as f:
+                yaml.dump(schema, f, sort_keys=False)
     except Exception as e:
         schema = {}
         logger.error(f"Fail to make schema: {e}")
@@ -129,6 +193,38 @@ def make_schema(tool_source_object, include, path):
     return schema
 
 
+def get_code_hash(module_names: list[str]) -> str:
+    """The sha256 of the source files of the modules, without importing them"""
+    sha256 = hashlib.sha256()
+    for module_name in module_names:
+        spec = importlib.util.find_spec(module_name)
+        sha256.update(module_name.encode("utf-8"))
+        sha256.update(Path(spec.origin).read_bytes())
+    return sha256.hexdigest()
+
+
+def read_tool_manifest(path: Path) -> dict:
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def build_tool_manifest(module_names: list[str] = TOOL_LIBS, path: Path = TOOL_MANIFEST_PATH) -> dict:
+    """Import the modules and dump the tools they register, so that they can be registered without importing"""
+    registry = ToolRegistry()
+    for module_name in module_names:
+        importlib.import_module(module_name)
+        for cls, kwargs in _TOOL_DEFINITIONS[module_name]:
+            register_tool_object(registry, cls, **kwargs)
+    manifest = {
+        "code_hash": get_code_hash(module_names),
+        "tools": [tool.model_dump() for tool in registry.get_all_tools().values()],
+    }
+    Path(path).write_text(json.dumps(manifest, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    return manifest
+
+
 def validate_tool_names(tools: list[str]) -> dict[str, Tool]:
     assert isinstance(tools, list), "tools must be a list of str"
     valid_tools = {}
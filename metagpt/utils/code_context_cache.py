@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : code_context_cache.py
+@Desc    : Cache of the per-file code snippets used to assemble the code context of `WriteCode`.
+"""
+from __future__ import annotations
+
+import stat
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from metagpt.utils.common import aread
+from metagpt.utils.token_counter import count_output_tokens
+
+
+class CodeSnippet:
+    """A rendered code snippet, the number of tokens is counted on demand and cached.
+
+    `size` is the number of bytes of the text, which is an upper bound of the number of tokens and far cheaper to get.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.size = len(text.encode("utf-8"))
+        self._tokens: dict[str, int] = {}
+
+    def count_tokens(self, model: str) -> int:
+        if model not in self._tokens:
+            self._tokens[model] = count_output_tokens(self.text, model)
+        return self._tokens[model]
+
+
+class _CacheEntry:
+    def __init__(self, version: tuple[int, int], content: str):
+        self.version = version
+        self.content = content
+        self.snippets: dict[tuple[str, str], CodeSnippet] = {}
+
+
+class CodeContextCache:
+    """LRU cache of the file contents and their rendered snippets, keyed by the absolute path of the file.
+
+    Entries are invalidated by `FileRepository.save` and `FileRepository.delete`. The modification time and size of the
+    file are checked on every lookup as well, so that edits made outside `FileRepository` are not missed.
+    """
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+
+    def invalidate(self, pathname: Path | str):
+        self._entries.pop(str(pathname), None)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def get(self, pathname: Path | str) -> Optional[str]:
+        """Return the content of the file, None if it is not a file."""
+        entry = await self._get_entry(pathname)
+        return entry.content if entry else None
+
+    async def get_snippet(self, pathname: Path | str, prefix: str, suffix: str = "") -> Optional[CodeSnippet]:
+        """Return the snippet rendered as `{prefix}```{content}```{suffix}`, None if it is not a file."""
+        entry = await self._get_entry(pathname)
+        if not entry:
+            return None
+        key = (prefix, suffix)
+        if key not in entry.snippets:
+            entry.snippets[key] = CodeSnippet(f"{prefix}```{entry.content}```{suffix}")
+        return entry.snippets[key]
+
+    async def _get_entry(self, pathname: Path | str) -> Optional[_CacheEntry]:
+        key = str(pathname)
+        try:
+            st = Path(pathname).stat()
+        except (FileNotFoundError, NotADirectoryError):
+            st = None
+        if not st or not stat.S_ISREG(st.st_mode):
+            self.invalidate(key)
+            return None
+        version = (st.st_mtime_ns, st.st_size)
+        entry = self._entries.get(key)
+        if entry and entry.version == version:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+        self.misses += 1
+        entry = _CacheEntry(version=version, content=await aread(pathname))
+        self._entries[key] = entry
+        while self.max_size and len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return entry
+
+
+CODE_CONTEXT_CACHE = CodeContextCache()
@@ -31,6 +31,11 @@ class CostManager(BaseModel):
     max_budget: float = 10.0
     total_cost: float = 0
     token_costs: dict[str, dict[str, float]] = TOKEN_COSTS  # different model's token cost
+    # Savings of the LLM response cache, not counted into the totals above
+    cache_hits: int = 0
+    saved_prompt_tokens: int = 0
+    saved_completion_tokens: int = 0
+    saved_cost: float = 0
 
     def update_cost(self, prompt_tokens, completion_tokens, model):
         """
@@ -59,6 +64,28 @@ class CostManager(BaseModel):
             f"Current cost: ${cost:.3f}, prompt_tokens: {prompt_tokens}, completion_tokens: {completion_tokens}"
         )
 
+    def update_cache_savings(self, prompt_tokens, completion_tokens, model):
+        """
+        Record a response cache hit, which saves the tokens and the cost of an API call.
+
+        Args:
+        prompt_tokens (int): The number of prompt tokens of the cached API call.
+        completion_tokens (int): The number of completion tokens of the cached API call.
+        model (str): The model used for the cached API call.
+        """
+        self.cache_hits += 1
+        self.saved_prompt_tokens += prompt_tokens
+        self.saved_completion_tokens += completion_tokens
+        if model in self.token_costs:
+            self.saved_cost += (
+                prompt_tokens * self.token_costs[model]["prompt"]
+                + completion_tokens * self.token_costs[model]["completion"]
+            ) / 1000
+        logger.info(
+            f"LLM response cache hits: {self.cache_hits} | Saved cost: ${self.saved_cost:.3f}, "
+            f"prompt_tokens: {self.saved_prompt_tokens}, completion_tokens: {self.saved_completion_tokens}"
+        )
+
     def get_total_prompt_tokens(self):
         """
         Get the total number of prompt tokens.
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : embedding_cache.py
+@Desc    : An on-disk embedding cache keyed by the embedding model and the content hash of the text.
+"""
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.embeddings import BaseEmbedding
+
+from metagpt.config2 import config
+from metagpt.const import DATA_PATH
+from metagpt.logs import logger
+
+DEFAULT_EMBEDDING_CACHE_PATH = DATA_PATH / "embedding_cache.sqlite"
+
+
+class EmbeddingCacheStore:
+    """Embeddings in a SQLite database, keyed by hex digests. It can be shared by threads."""
+
+    def __init__(self, path: Union[str, Path] = ":memory:", max_variables: int = 500):
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = str(path)
+        self.max_variables = max_variables
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        if self.path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), self.max_variables):
+                chunk = keys[i : i + self.max_variables]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update((key, np.frombuffer(vector, dtype=np.float64).tolist()) for key, vector in rows)
+        return found
+
+    def put_many(self, embeddings: dict[str, list[float]]):
+        rows = [(key, np.asarray(vector, dtype=np.float64).tobytes()) for key, vector in embeddings.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbedding(BaseEmbedding):
+    """Wraps an embedding model, caching its vectors by the model and the sha256 of the text.
+
+    The cache misses of a batch are deduplicated and embedded by the wrapped model in its own batches. Texts and queries
+    are cached apart, since some models embed them differently.
+    """
+
+    namespace: str = ""
+
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _store: EmbeddingCacheStore = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr()
+    _hits: int = PrivateAttr(default=0)
+    _misses: int = PrivateAttr(default=0)
+    _model_calls: int = PrivateAttr(default=0)
+
+    def __init__(
+        self, embed_model: BaseEmbedding, store: Optional[EmbeddingCacheStore] = None, namespace: str = "", **kwargs
+    ):
+        super().__init__(
+            model_name=embed_model.model_name,
+            embed_batch_size=embed_model.embed_batch_size,
+            namespace=namespace or self.get_namespace(embed_model),
+            **kwargs,
+        )
+        self._embed_model = embed_model
+        self._store = store if store is not None else EmbeddingCacheStore()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @staticmethod
+    def get_namespace(embed_model: BaseEmbedding) -> str:
+        """Identify the vectors of a model, including its output dimensions if configurable"""
+        namespace = f"{embed_model.class_name()}/{embed_model.model_name}"
+        dimensions = getattr(embed_model, "dimensions", None)
+        return f"{namespace}/{dimensions}" if dimensions else namespace
+
+    @property
+    def embed_model(self) -> BaseEmbedding:
+        return self._embed_model
+
+    @property
+    def store(self) -> EmbeddingCacheStore:
+        return self._store
+
+    @property
+    def hit_rate(self) -> float:
+        total = self._hits + self._misses
+        return self._hits / total if total else 0.0
+
+    @property
+    def metrics(self) -> dict:
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self.hit_rate,
+            "model_calls": self._model_calls,
+        }
+
+    def get_text_embedding_batch(self, texts: list[str], show_progress: bool = False, **kwargs) -> list[list[float]]:
+        keys, found, misses = self._lookup(texts, "text")
+        if misses:
+            embeddings = self._embed_model.get_text_embedding_batch(list(misses.values()), show_progress=show_progress)
+            found.update(self._save(misses, embeddings))
+        return [found[key] for key in keys]
+
+    async def aget_text_embedding_batch(
+        self, texts: list[str], show_progress: bool = False, **kwargs
+    ) -> list[list[float]]:
+        keys, found, misses = self._lookup(texts, "text")
+        if misses:
+            embeddings = await self._embed_model.aget_text_embedding_batch(
+                list(misses.values()), show_progress=show_progress
+            )
+            found.update(self._save(misses, embeddings))
+        return [found[key] for key in keys]
+
+    def _get_text_embedding(self, text: str) -> list[float]:
+        return self.get_text_embedding_batch([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> list[float]:
+        return (await self.aget_text_embedding_batch([text]))[0]
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        return self.get_text_embedding_batch(texts)
+
+    async def _aget_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        return await self.aget_text_embedding_batch(texts)
+
+    def _get_query_embedding(self, query: str) -> list[float]:
+        keys, found, misses = self._lookup([query], "query")
+        if misses:
+            found.update(self._save(misses, [self._embed_model.get_query_embedding(query)]))
+        return found[keys[0]]
+
+    async def _aget_query_embedding(self, query: str) -> list[float]:
+        keys, found, misses = self._lookup([query], "query")
+        if misses:
+            found.update(self._save(misses, [await self._embed_model.aget_query_embedding(query)]))
+        return found[keys[0]]
+
+    def _key(self, text: str, kind: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, texts: list[str], kind: str) -> tuple[list[str], dict[str, list[float]], dict[str, str]]:
+        """Return the keys of the texts, the cached embeddings and the unique missed texts by key"""
+        keys = [self._key(text, kind) for text in texts]
+        found = self._store.get_many(list(dict.fromkeys(keys)))
+        misses = {key: text for key, text in zip(keys, texts) if key not in found}
+        with self._lock:
+            self._hits += len(texts) - len(misses)
+            self._misses += len(misses)
+            self._model_calls += bool(misses)
+        if misses:
+            logger.debug(f"Embedding cache: {len(texts) - len(misses)} hits, {len(misses)} misses")
+        return keys, found, misses
+
+    def _save(self, misses: dict[str, str], embeddings: list[list[float]]) -> dict[str, list[float]]:
+        computed = dict(zip(misses.keys(), embeddings))
+        self._store.put_many(computed)
+        return computed
+
+
+_STORES: dict[str, EmbeddingCacheStore] = {}
+
+
+def get_embedding_cache_store(path: Union[str, Path] = DEFAULT_EMBEDDING_CACHE_PATH) -> EmbeddingCacheStore:
+    """One store per database file, shared by all the cached embeddings"""
+    key = str(Path(path).resolve()) if str(path) != ":memory:" else str(path)
+    if key not in _STORES:
+        _STORES[key] = EmbeddingCacheStore(path)
+    return _STORES[key]
+
+
+def with_embedding_cache(embed_model: BaseEmbedding) -> BaseEmbedding:
+    """Wrap the model by `CachedEmbedding` if `embedding.cache` is enabled in the config"""
+    if not config.embedding.cache or isinstance(embed_model, CachedEmbedding):
+        return embed_model
+    store = get_embedding_cache_store(config.embedding.cache_path or DEFAULT_EMBEDDING_CACHE_PATH)
+    return CachedEmbedding(embed_model, store=store)
@@ -16,6 +16,7 @@ from typing import Dict, List, Set
 
 from metagpt.logs import logger
 from metagpt.schema import Document
+from metagpt.utils.code_context_cache import CODE_CONTEXT_CACHE
 from metagpt.utils.common import aread, awrite
 from metagpt.utils.json_to_markdown import json_to_markdown
 
@@ -54,6 +55,7 @@ class FileRepository:
         pathname.parent.mkdir(parents=True, exist_ok=True)
         content = content if content else ""  # avoid `argument must be str, not None` to make it continue
         await awrite(filename=str(pathname), data=content)
+        CODE_CONTEXT_CACHE.invalidate(pathname)
         logger.info(f"save to: {str(pathname)}")
 
         if dependencies is not None:
@@ -231,6 +233,7 @@ class FileRepository:
         if not pathname.exists():
             return
         pathname.unlink(missing_ok=True)
+        CODE_CONTEXT_CACHE.invalidate(pathname)
 
         dependency_file = await self._git_repo.get_dependency()
         await dependency_file.update(filename=pathname, dependencies=None)
@@ -1,6 +1,12 @@
+import os
+import time
+from contextlib import asynccontextmanager
+
+import nbformat
 import pytest
 
-from metagpt.actions.di.execute_nb_code import ExecuteNbCode
+from metagpt.actions.di.execute_nb_code import TRUNCATED_MARK, ExecuteNbCode
+from metagpt.actions.di.kernel_pool import KernelPool
 
 
 @pytest.mark.asyncio
@@ -126,3 +132,166 @@ async def test_parse_outputs():
     assert "KeyError: 'DUMMPY_ID'" in output
     assert "columns num:2" in output
     await executor.terminate()
+
+
+@asynccontextmanager
+async def started_kernel_pool(**kwargs):
+    pool = KernelPool(**kwargs)
+    await pool.start()
+    try:
+        yield pool
+    finally:
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_kernel_pool():
+    async with started_kernel_pool(size=1, preload_code="import math", recycle=True) as pool:
+        executor = ExecuteNbCode(kernel_pool=pool)
+        code = "import os, sys\nos.chdir('/')\nos.environ['KERNEL_POOL_TEST'] = '1'\nsys.path.append('/nowhere')"
+        assert (await executor.run(code))[1]
+        cwd = os.getcwd()
+        output, is_success = await executor.run("x = math.sqrt(4)\nprint(x)")
+        assert is_success and "2.0" in output
+        kernel_id = executor.nb_client.km.kernel_id
+        await executor.terminate()
+        assert executor.nb_client.km is None
+        await pool.start()  # wait for the released kernel to be reset in the background
+        assert pool.idle_size == 1
+
+        # the released kernel is reused, with the namespace reset
+        executor = ExecuteNbCode(kernel_pool=pool)
+        output, is_success = await executor.run("print(math.pi)\nprint(x)")
+        assert executor.nb_client.km.kernel_id == kernel_id
+        assert not is_success and "3.14" in output and "NameError" in output
+        # the process state changed by the previous lease is restored
+        code = "import os, sys\nprint(os.getcwd(), 'KERNEL_POOL_TEST' in os.environ, '/nowhere' in sys.path)"
+        output, is_success = await executor.run(code)
+        assert is_success and output.strip() == f"{cwd} False False"
+
+        # a dead kernel is replaced
+        output, is_success = await executor.run("import os\nos._exit(1)")
+        assert (output, is_success) == ("DeadKernelError", False)
+        output, is_success = await executor.run("print(math.e)")
+        assert is_success
+        assert executor.nb_client.km.kernel_id != kernel_id
+        await executor.terminate()
+
+
+@pytest.mark.asyncio
+async def test_kernel_pool_restart():
+    async with started_kernel_pool(size=1, preload_code="") as pool:
+        executor = ExecuteNbCode(kernel_pool=pool)
+        assert (await executor.run("import json\njson.dumps = None"))[1]
+        kernel_id = executor.nb_client.km.kernel_id
+        await executor.terminate()
+        await pool.start()
+
+        # a released kernel is replaced by default, the monkeypatched modules are not left to the next lease
+        executor = ExecuteNbCode(kernel_pool=pool)
+        output, is_success = await executor.run("import json\nprint(json.dumps is None)")
+        assert is_success and output.strip() == "False"
+        assert executor.nb_client.km.kernel_id != kernel_id
+        await executor.terminate()
+
+
+@pytest.mark.asyncio
+async def test_kernel_pool_limits():
+    async with started_kernel_pool(size=1, preload_code="", max_lease_seconds=1, check_interval=0.2) as pool:
+        executor = ExecuteNbCode(kernel_pool=pool)
+        output, is_success = await executor.run("import time\ntime.sleep(5)")
+        assert not is_success
+        assert output == "DeadKernelError: the lease exceeded 1 seconds"
+        await executor.terminate()
+
+    async with started_kernel_pool(size=1, preload_code="", max_memory_mb=300, check_interval=0.2) as pool:
+        executor = ExecuteNbCode(kernel_pool=pool)
+        output, is_success = await executor.run("import time\nx = bytearray(400 * 1024**2)\ntime.sleep(5)")
+        assert not is_success
+        assert "300 MB" in output
+        await executor.terminate()
+
+
+@pytest.mark.asyncio
+async def test_kernel_pool_time_to_first_cell():
+    code = "import pandas as pd\nprint(pd.DataFrame({'a': [1]}).shape)"
+    start = time.perf_counter()
+    executor = ExecuteNbCode()
+    assert (await executor.run(code))[1]
+    cold = time.perf_counter() - start
+    await executor.terminate()
+
+    async with started_kernel_pool(size=1) as pool:
+        start = time.perf_counter()
+        executor = ExecuteNbCode(kernel_pool=pool)
+        assert (await executor.run(code))[1]
+        warm = time.perf_counter() - start
+        await executor.terminate()
+
+    print(f"time to first cell: {cold:.2f}s with a new kernel, {warm:.2f}s with the kernel pool")
+    assert warm < cold
+
+
+@pytest.mark.asyncio
+async def test_bounded_outputs():
+    outputs = []
+    executor = ExecuteNbCode(max_output_len=100, output_callback=outputs.append)
+    code = "import sys, time\nfor i in range(1000):\n    print('x' * 100)\n    if i % 100 == 0:\n        sys.stdout.flush(); time.sleep(0.01)"
+    output, is_success = await executor.run(code)
+    assert is_success
+    assert executor.nb.cells[-1].outputs[0].text == "x" * 100 + TRUNCATED_MARK
+    assert len(executor.nb.cells[-1].outputs) == 1
+    assert outputs[0].output_type == "stream"
+
+    output, is_success = await executor.run("'y' * 1000")
+    assert is_success and output.endswith("[output truncated]")
+    assert len(output) < 200
+
+    output, is_success = await executor.run("def f(n):\n    return f(n + 1)\nf(0)")
+    assert not is_success
+    assert "RecursionError" in output
+    assert len("\n".join(executor.nb.cells[-1].outputs[0].traceback)) <= 100
+    await executor.terminate()
+
+
+@pytest.mark.asyncio
+async def test_bounded_outputs_stream_chunks():
+    chunks = []
+    executor = ExecuteNbCode(max_output_len=25, output_callback=chunks.append)
+    code = "import sys, time\nfor i in range(5):\n    print(f'line {i}')\n    sys.stdout.flush(); time.sleep(0.1)"
+    output, is_success = await executor.run(code)
+    assert is_success
+    # each chunk is reported once, as it is kept, nothing is reported once the output is truncated
+    assert [chunk.text for chunk in chunks] == ["line 0\n", "line 1\n", "line 2\n", "line" + TRUNCATED_MARK]
+    assert executor.nb.cells[-1].outputs[0].text == "".join(chunk.text for chunk in chunks)
+    assert all(chunk is not executor.nb.cells[-1].outputs[0] for chunk in chunks)
+    await executor.terminate()
+
+
+@pytest.mark.asyncio
+async def test_evict_outputs():
+    executor = ExecuteNbCode(max_output_cells=2)
+    for i in range(4):
+        await executor.run(f"x = {i}\nprint(x)")
+    assert [len(cell.outputs) for cell in executor.nb.cells] == [0, 0, 1, 1]
+    assert [cell.source for cell in executor.nb.cells][0] == "x = 0\nprint(x)"
+    output, is_success = await executor.run("print(x)")
+    assert output.strip() == "3"
+    await executor.terminate()
+
+
+@pytest.mark.asyncio
+async def test_long_session_memory():
+    """The notebook size is bounded over a long session with large outputs"""
+    code = "print('x' * 1_000_000)\n'y' * 1_000_000"
+    executor = ExecuteNbCode()
+    sizes = []
+    for _ in range(30):
+        _, is_success = await executor.run(code)
+        assert is_success
+        sizes.append(len(nbformat.writes(executor.nb)))
+    await executor.terminate()
+
+    print(f"notebook size after 30 cells of 2MB outputs: {sizes[-1] / 1024:.0f}KB")
+    assert sizes[-1] < 30 * executor.max_output_len * 2 + 100 * 1024
+    assert sizes[-1] - sizes[executor.max_output_cells] < 10 * 1024
@@ -2,9 +2,17 @@
 # -*- coding: utf-8 -*-
 # @Desc   : unittest of action_outcls_registry
 
+import time
 from typing import List
+from unittest import mock
 
+from pydantic import Field
+
+from metagpt.actions import WritePRD
 from metagpt.actions.action_node import ActionNode
+from metagpt.actions.action_outcls_registry import action_outcls_registry
+from metagpt.actions.write_prd_an import WRITE_PRD_NODE
+from metagpt.schema import Message
 
 
 def test_action_outcls_registry():
@@ -44,3 +52,62 @@ def test_action_outcls_registry():
     outcls6 = ActionNode.create_model_class(class_name, out_mapping)
     outinst6 = outcls6(**out_data2)
     assert outinst5 == outinst6
+
+
+def test_action_outcls_registry_nested():
+    mapping = {"field": {"sub1": (List[str], ...), "sub2": (str, Field(default="", description="sub2"))}}
+    outcls = ActionNode.create_model_class("nested", mapping)
+
+    mapping = {"field": {"sub2": (str, Field(default="", description="sub2")), "sub1": (list[str], ...)}}
+    assert ActionNode.create_model_class("nested", mapping) is outcls
+
+    mapping = {"field": {"sub2": (str, Field(default="", description="other")), "sub1": (list[str], ...)}}
+    assert ActionNode.create_model_class("nested", mapping) is not outcls
+
+    # an unhashable default
+    outcls = ActionNode.create_model_class("unhashable", {"field": (list[str], Field(default=["a"]))})
+    assert ActionNode.create_model_class("unhashable", {"field": (list[str], Field(default=["a"]))}) is outcls
+
+
+def test_action_outcls_registry_bounded(mocker):
+    mocker.patch("metagpt.actions.action_outcls_registry.MAX_ACTION_OUTCLS", 2)
+    outcls = ActionNode.create_model_class("bounded0", {"field": (str, ...)})
+    ActionNode.create_model_class("bounded1", {"field": (str, ...)})
+    assert ActionNode.create_model_class("bounded0", {"field": (str, ...)}) is outcls  # the most recently used
+    ActionNode.create_model_class("bounded2", {"field": (str, ...)})
+
+    assert len(action_outcls_registry) == 2
+    assert ActionNode.create_model_class("bounded0", {"field": (str, ...)}) is outcls
+    assert ActionNode.create_model_class("bounded1", {"field": (str, ...)}) is not outcls
+
+
+def test_action_outcls_registry_throughput():
+    create_model_class = ActionNode.create_model_class.__func__.__wrapped__
+    value = {
+        key: "value" if field.annotation is str else []
+        for key, field in WRITE_PRD_NODE.create_class().model_fields.items()
+    }
+    message = Message(content="", instruct_content=WRITE_PRD_NODE.create_class()(**value), cause_by=WritePRD)
+    message_json = message.model_dump_json()
+
+    def fill(n: int) -> float:
+        start = time.perf_counter()
+        for _ in range(n):
+            WRITE_PRD_NODE.create_class()(**value)
+        return n / (time.perf_counter() - start)
+
+    def deserialize(n: int) -> float:
+        start = time.perf_counter()
+        for _ in range(n):
+            assert Message.model_validate_json(message_json).instruct_content.model_dump() == value
+        return n / (time.perf_counter() - start)
+
+    cached = fill(200), deserialize(200)
+    # a new class for each call, as `create_model` does without the registry
+    with mock.patch.object(ActionNode, "create_model_class", classmethod(create_model_class)):
+        uncached = fill(20), deserialize(20)
+
+    print(f"fill: {uncached[0]:.0f}/s uncached, {cached[0]:.0f}/s cached")
+    print(f"deserialize: {uncached[1]:.0f}/s uncached, {cached[1]:.0f}/s cached")
+    assert cached[0] > uncached[0] * 3
+    assert cached[1] > uncached[1] * 3
@@ -159,5 +159,58 @@ async def test_get_codes(context):
     assert codes_inc
 
 
+@pytest.mark.asyncio
+async def test_get_codes_with_budget(context, mocker):
+    mocker.patch("metagpt.utils.code_context_cache.count_output_tokens", lambda text, model: len(text) // 4)
+    task_doc = Document(
+        filename="1.json",
+        content=json.dumps(
+            {
+                "Logic Analysis": [
+                    ["a.py", "Contains A class"],
+                    ["b.py", "Contains B class"],
+                    ["c.py", "Contains C class"],
+                    ["main.py", "Contains main function, from c import C"],
+                ],
+                "Task list": ["a.py", "b.py", "c.py", "main.py"],
+            }
+        ),
+    )
+    project_repo = context.repo.with_src_path(context.git_repo.workdir / "src")
+    for filename in ["a.py", "b.py", "c.py"]:
+        await project_repo.srcs.save(filename=filename, content=f"# {filename}\n" + "x = 1\n" * 500)
+
+    codes = await WriteCode.get_codes(task_doc=task_doc, exclude="main.py", project_repo=project_repo)
+    assert codes == await WriteCode.get_codes(task_doc=task_doc, exclude="main.py", project_repo=project_repo)
+    assert all(f"----- {i}" in codes for i in ["a.py", "b.py", "c.py"])
+
+    # The relevant file first, followed by the others in order
+    codes = await WriteCode.get_codes(task_doc=task_doc, exclude="main.py", project_repo=project_repo, max_tokens=1600)
+    assert "----- a.py" in codes
+    assert "----- b.py" not in codes
+    assert "----- c.py" in codes
+    assert codes.index("----- a.py") < codes.index("----- c.py")
+
+    # Invalidated by save
+    await project_repo.srcs.save(filename="a.py", content="# a.py")
+    codes = await WriteCode.get_codes(task_doc=task_doc, exclude="main.py", project_repo=project_repo, max_tokens=1600)
+    assert "----- a.py\n```# a.py```" in codes
+    assert "----- b.py" in codes
+
+    # No room for the codes at all
+    assert not await WriteCode.get_codes(task_doc=task_doc, exclude="main.py", project_repo=project_repo, max_tokens=-1)
+
+
+def test_get_code_context_budget(mocker):
+    mocker.patch("metagpt.actions.write_code.count_output_tokens", lambda text, model: len(text) // 4)
+    llm = mocker.Mock(model="gpt-4", config=mocker.Mock(max_token=4096))
+
+    # counted by tokens rather than bytes, which would leave 96 tokens only
+    assert WriteCode.get_code_context_budget(llm, "x " * 2000) == 8192 - 1000 - 4096
+    assert WriteCode.get_code_context_budget(llm, "x " * 10000) == -1
+    llm.model = "unknown-model"
+    assert WriteCode.get_code_context_budget(llm, "x " * 10000) == 0
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-s"])
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : A fake adb executable for the unittests, it emulates one device whose storage is `FAKE_ADB_ROOT`.
+#           `FAKE_ADB_DELAY` is the startup cost of each adb process in seconds.
+
+import io
+import os
+import shlex
+import shutil
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image
+
+DEVICE_ID = "emulator-5554"
+UI_XML = '<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0"><node index="0" text="OK" /></hierarchy>'
+ROOT = Path(os.environ.get("FAKE_ADB_ROOT", "/tmp/fake_adb"))
+
+
+def screencap_png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (72, 108), (30, 144, 255)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def device_path(path: str) -> Path:
+    return ROOT.joinpath(path.lstrip("/"))
+
+
+def run_shell_cmd(cmd: str, stdout, stdin=None) -> int:
+    """`stdin` is the iterator of the lines of the interactive shell, None if the stdin is not readable"""
+    args = shlex.split(cmd)
+    if args[-1:] == ["</dev/null"]:
+        args, stdin = args[:-1], None
+    if not args:
+        return 0
+    if args[0] == "sh" and args[1:2] == ["-c"] and len(args) == 3:
+        try:
+            return run_shell_cmd(args[2], stdout, stdin)
+        except ValueError:
+            sys.stderr.write("sh: syntax error: unterminated quoted string\n")
+            return 2
+    if args[0] == "wm" and args[1:] == ["size"]:
+        stdout.write(b"Physical size: 720x1080\n")
+    elif args[0] == "input" and args[1:2] == ["text"] and len(args) == 3:
+        device_path("input_text").parent.mkdir(parents=True, exist_ok=True)
+        device_path("input_text").write_text(args[2])
+    elif args[0] == "input" and len(args) > 1:
+        pass
+    elif args[0] == "mkdir":
+        for path in args[1:]:
+            if path != "-p":
+                device_path(path).mkdir(parents=True, exist_ok=True)
+    elif args[0] == "screencap" and args[1:2] == ["-p"]:
+        if len(args) > 2:
+            device_path(args[2]).write_bytes(screencap_png())
+        else:
+            stdout.write(screencap_png())
+    elif args[0] == "uiautomator" and args[1:2] == ["dump"] and len(args) == 3:
+        if args[2] == "/dev/tty":
+            stdout.write(f"{UI_XML}UI hierchary dumped to: /dev/tty\n".encode())
+        else:
+            device_path(args[2]).write_text(UI_XML)
+            stdout.write(f"UI hierchary dumped to: {args[2]}\n".encode())
+    elif args[0] == "echo":
+        stdout.write((" ".join(args[1:]) + "\n").encode())
+    elif args[0] == "sleep" and len(args) == 2:
+        time.sleep(float(args[1]))
+    elif args[0] == "cat" and len(args) == 1:
+        stdout.write(next(stdin, "").encode() if stdin else b"")
+    elif args[0] == "rm":
+        for path in args[1:]:
+            device_path(path).unlink(missing_ok=True)
+    else:
+        sys.stderr.write(f"/system/bin/sh: {args[0]}: not found\n")
+        return 127
+    return 0
+
+
+def interactive_shell(stdout) -> int:
+    code = 0
+    lines = iter(sys.stdin.readline, "")
+    cmd = ""
+    for line in lines:
+        cmd += line.replace("$?", str(code))
+        try:
+            shlex.split(cmd)
+        except ValueError:
+            continue  # a quote is not closed, the shell waits for the rest of the command as sh does
+        code = run_shell_cmd(cmd, stdout, lines)
+        cmd = ""
+        stdout.flush()
+    return code
+
+
+def main(argv: list[str]) -> int:
+    time.sleep(float(os.environ.get("FAKE_ADB_DELAY", "0")))
+    if argv[:1] == ["-s"]:
+        if argv[1] != DEVICE_ID:
+            sys.stderr.write(f"adb: device '{argv[1]}' not found\n")
+            return 1
+        argv = argv[2:]
+    stdout = sys.stdout.buffer
+    if argv == ["devices"]:
+        stdout.write(f"List of devices attached\n{DEVICE_ID}\tdevice\n".encode())
+        return 0
+    if argv == ["shell"]:
+        return interactive_shell(stdout)
+    if argv[:1] in (["shell"], ["exec-out"]):
+        return run_shell_cmd(" ".join(argv[1:]), stdout)
+    if argv[:1] == ["pull"] and len(argv) == 3:
+        shutil.copyfile(device_path(argv[1]), argv[2])
+        return 0
+    sys.stderr.write(f"adb: unknown command {' '.join(argv)}\n")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
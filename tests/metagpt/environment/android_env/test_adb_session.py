@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : the unittest of AdbSession against a fake adb executable
+
+import subprocess
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from metagpt.environment.android.adb_session import AdbSession
+
+FAKE_ADB = f"{sys.executable} {Path(__file__).parent.joinpath('fake_adb.py')}"
+DEVICE_ID = "emulator-5554"
+
+
+@pytest.fixture
+def fake_device(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_ADB_ROOT", str(tmp_path / "device"))
+    session = AdbSession(f"{FAKE_ADB} -s {DEVICE_ID}")
+    yield session
+    session.close()
+
+
+def test_adb_session_run(fake_device):
+    session = fake_device
+    assert session.run("wm size") == (0, "Physical size: 720x1080\n")
+    assert session.run("input tap 10 10") == (0, "")
+    assert session.run("unknown_cmd")[0] == 127
+
+    results = session.run_batch(["input keyevent KEYCODE_BACK", "wm size", "input swipe 1 1 2 2 400"])
+    assert results == [(0, ""), (0, "Physical size: 720x1080\n"), (0, "")]
+
+    # the commands share one adb process, which is restarted once it exits
+    process = session._process
+    assert session.run("wm size")[0] == 0
+    assert session._process is process
+    process.kill()
+    process.wait()
+    assert session.run("wm size") == (0, "Physical size: 720x1080\n")
+    assert session._process is not process
+
+
+def test_adb_session_malformed_cmds(fake_device):
+    session = fake_device
+    # an unclosed quote fails rather than leaving the shell waiting for the rest of the command
+    assert session.run('input text say"hi')[0] == 2
+    # a command reading stdin does not take the commands after it
+    assert session.run_batch(["cat", "wm size"]) == [(0, ""), (0, "Physical size: 720x1080\n")]
+
+
+def test_adb_session_timeout(fake_device):
+    session = AdbSession(fake_device.adb_prefix, timeout=0.5)
+    assert session.run("wm size")[0] == 0
+    process = session._process
+
+    start = time.perf_counter()
+    # the session is killed, the command timed out is not run again and the commands left run by adb each
+    results = session.run_batch(["sleep 5", "wm size", "input tap 1 1"])
+    assert time.perf_counter() - start < 3
+    assert results == [(-1, ""), (0, "Physical size: 720x1080\n"), (0, "")]
+    assert process.poll() is not None
+    assert session.run("wm size")[0] == 0
+    session.close()
+
+
+@pytest.mark.asyncio
+async def test_adb_session_exec_out_timeout(fake_device):
+    session = AdbSession(fake_device.adb_prefix, timeout=0.5)
+    start = time.perf_counter()
+    assert session.exec_out("sleep 5") is None
+    assert await session.aexec_out("sleep 5") is None
+    assert time.perf_counter() - start < 3
+    assert session.exec_out("wm size") == b"Physical size: 720x1080\n"
+
+
+def test_adb_session_screencap_and_dump_ui(fake_device):
+    image = fake_device.screencap()
+    assert Image.open(BytesIO(image)).size == (72, 108)
+
+    xml = fake_device.dump_ui()
+    assert xml.startswith("<?xml") and xml.endswith("</hierarchy>")
+
+    assert AdbSession(f"{FAKE_ADB} -s emulator-0000").screencap() is None
+
+
+@pytest.mark.asyncio
+async def test_adb_session_async(fake_device):
+    assert await fake_device.arun("wm size") == (0, "Physical size: 720x1080\n")
+    image = await fake_device.ascreencap()
+    assert Image.open(BytesIO(image)).size == (72, 108)
+    assert (await fake_device.adump_ui()).endswith("</hierarchy>")
+
+
+def test_adb_session_latency(fake_device, tmp_path, monkeypatch):
+    # the startup cost of adb, mostly connecting to the adb server
+    monkeypatch.setenv("FAKE_ADB_DELAY", "0.05")
+    adb_prefix = f"{FAKE_ADB} -s {DEVICE_ID}"
+    steps = 5
+
+    def old_step(i: int):
+        # `execute_adb_with_cmd` spawned adb per command and `get_screenshot` went through the device storage
+        def run(cmd: str):
+            res = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            assert not res.returncode
+
+        run(f"{adb_prefix} shell input tap 10 10")
+        run(f"{adb_prefix} shell screencap -p /sdcard/{i}.png")
+        time.sleep(0.1)
+        run(f"{adb_prefix} pull /sdcard/{i}.png {tmp_path}/{i}.png")
+        time.sleep(0.1)
+
+    def new_step(i: int):
+        assert fake_device.run("input tap 10 10")[0] == 0
+        tmp_path.joinpath(f"{i}.png").write_bytes(fake_device.screencap())
+
+    subprocess.run(f"{adb_prefix} shell mkdir -p /sdcard", shell=True, check=True)
+    fake_device.run("wm size")  # start the session
+
+    start = time.perf_counter()
+    for i in range(steps):
+        old_step(i)
+    old_cost = (time.perf_counter() - start) / steps
+
+    start = time.perf_counter()
+    for i in range(steps):
+        new_step(i)
+    new_cost = (time.perf_counter() - start) / steps
+
+    print(f"per-step latency, spawn per command: {old_cost * 1000:.1f}ms, adb session: {new_cost * 1000:.1f}ms")
+    assert new_cost * 2 < old_cost
@@ -2,11 +2,14 @@
 # -*- coding: utf-8 -*-
 # @Desc   : the unittest of AndroidExtEnv
 
+import sys
 from pathlib import Path
 
 from metagpt.environment.android.android_ext_env import AndroidExtEnv
 from metagpt.environment.android.const import ADB_EXEC_FAIL
 
+FAKE_ADB = f"{sys.executable} {Path(__file__).parent.joinpath('fake_adb.py')}"
+
 
 def mock_device_shape(self, adb_cmd: str) -> str:
     return "shape: 720x1080"
@@ -32,7 +35,7 @@ def mock_write_read_operation(self, adb_cmd: str) -> str:
     return "OK"
 
 
-def test_android_ext_env(mocker):
+def test_android_ext_env(mocker, tmp_path):
     device_id = "emulator-5554"
     mocker.patch("metagpt.environment.android.android_ext_env.AndroidExtEnv.execute_adb_with_cmd", mock_device_shape)
     mocker.patch("metagpt.environment.android.android_ext_env.AndroidExtEnv.list_devices", mock_list_devices)
@@ -51,9 +54,20 @@ def test_android_ext_env(mocker):
 
     assert ext_env.list_devices() == [device_id]
 
+    mocker.patch("metagpt.environment.android.adb_session.AdbSession.screencap", return_value=b"\x89PNG\r\n\x1a\n")
+    assert ext_env.get_screenshot("screenshot", tmp_path) == tmp_path / "screenshot.png"
+    assert tmp_path.joinpath("screenshot.png").read_bytes() == b"\x89PNG\r\n\x1a\n"
+
+    mocker.patch("metagpt.environment.android.adb_session.AdbSession.dump_ui", return_value="<?xml ?><hierarchy />")
+    assert ext_env.get_xml("xml", tmp_path) == tmp_path / "xml.xml"
+    assert tmp_path.joinpath("xml.xml").read_text() == "<?xml ?><hierarchy />"
+
+    # fallback to the device storage if `exec-out` is not supported
+    mocker.patch("metagpt.environment.android.adb_session.AdbSession.screencap", return_value=None)
     mocker.patch("metagpt.environment.android.android_ext_env.AndroidExtEnv.execute_adb_with_cmd", mock_get_screenshot)
     assert ext_env.get_screenshot("screenshot_xxxx-xx-xx", "/data/") == Path("/data/screenshot_xxxx-xx-xx.png")
 
+    mocker.patch("metagpt.environment.android.adb_session.AdbSession.dump_ui", return_value=None)
     mocker.patch("metagpt.environment.android.android_ext_env.AndroidExtEnv.execute_adb_with_cmd", mock_get_xml)
     assert ext_env.get_xml("xml_xxxx-xx-xx", "/data/") == Path("/data/xml_xxxx-xx-xx.xml")
 
@@ -67,3 +81,13 @@ def test_android_ext_env(mocker):
     assert ext_env.user_longpress(10, 10) == res
     assert ext_env.user_swipe(10, 10) == res
     assert ext_env.user_swipe_to((10, 10), (20, 20)) == res
+
+
+def test_android_ext_env_user_input(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_ADB_ROOT", str(tmp_path))
+    ext_env = AndroidExtEnv.model_construct(adb_path=FAKE_ADB, device_id="emulator-5554")
+    # the text is quoted for the shell of the device
+    for text in ['say "hi', "a `b` $HOME;c"]:
+        assert ext_env.user_input(text) == ""
+        assert tmp_path.joinpath("input_text").read_text() == text.replace(" ", "%s")
+    ext_env.close()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : the unittest of the vectorized bbox math
+
+import numpy as np
+
+from metagpt.environment.android.bbox_utils import (
+    as_boxes,
+    center_distance_matrix,
+    dedup_by_center,
+    iou_matrix,
+    nms_in_order,
+)
+
+
+def ref_iou(box1: list, box2: list) -> float:
+    x_a, y_a = max(box1[0], box2[0]), max(box1[1], box2[1])
+    x_b, y_b = min(box1[2], box2[2]), min(box1[3], box2[3])
+    inter_area = max(0, x_b - x_a) * max(0, y_b - y_a)
+    union_area = (box1[2] - box1[0]) * (box1[3] - box1[1]) + (box2[2] - box2[0]) * (box2[3] - box2[1]) - inter_area
+    return inter_area / union_area
+
+
+def ref_remove_boxes(boxes: list, size: tuple[int, int], iou_threshold: float = 0.5) -> list:
+    """The former `remove_boxes` of `text_icon_localization`"""
+
+    def calculate_size(box):
+        return (box[2] - box[0]) * (box[3] - box[1])
+
+    boxes_to_remove = set()
+    for i in range(len(boxes)):
+        if calculate_size(boxes[i]) > 0.05 * size[0] * size[1]:
+            boxes_to_remove.add(i)
+        for j in range(len(boxes)):
+            if calculate_size(boxes[j]) > 0.05 * size[0] * size[1]:
+                boxes_to_remove.add(j)
+            if i == j:
+                continue
+            if i in boxes_to_remove or j in boxes_to_remove:
+                continue
+            if ref_iou(boxes[i], boxes[j]) >= iou_threshold:
+                boxes_to_remove.add(j)
+    return [box for idx, box in enumerate(boxes) if idx not in boxes_to_remove]
+
+
+def random_boxes(rng: np.random.Generator, n: int, size: int = 1000) -> list[list[int]]:
+    top_left = rng.integers(0, size - 100, (n, 2))
+    wh = rng.integers(5, 100, (n, 2))
+    return np.concatenate([top_left, top_left + wh], axis=1).tolist()
+
+
+def test_iou_matrix():
+    boxes = random_boxes(np.random.default_rng(0), 50)
+    iou = iou_matrix(as_boxes(boxes), as_boxes(boxes))
+    expected = np.array([[ref_iou(a, b) for b in boxes] for a in boxes])
+    assert np.allclose(iou, expected)
+    assert np.allclose(np.diag(iou), 1)
+
+    # degenerate boxes have no overlap instead of dividing by zero
+    assert iou_matrix(as_boxes([[1, 1, 1, 1]]), as_boxes([[1, 1, 1, 1]])).tolist() == [[0.0]]
+
+
+def test_center_distance_and_dedup():
+    boxes = as_boxes([[0, 0, 10, 10], [2, 2, 12, 12], [100, 100, 110, 110], [4, 4, 14, 14]])
+    dist = center_distance_matrix(boxes, boxes)
+    assert dist[0, 1] == np.hypot(2, 2)
+    assert dist[0, 2] == np.hypot(100, 100)
+
+    # box 1 is dropped by box 0, so box 3 is kept though it is close to box 1
+    assert dedup_by_center(boxes, min_dist=3).tolist() == [True, False, True, True]
+    assert dedup_by_center(boxes, min_dist=3, kept_boxes=as_boxes([[101, 101, 111, 111]])).tolist() == [
+        True,
+        False,
+        False,
+        True,
+    ]
+    assert dedup_by_center(as_boxes([]), min_dist=3).tolist() == []
+
+
+def test_nms_in_order():
+    rng = np.random.default_rng(1)
+    size = (1000, 1000)
+    for _ in range(20):
+        boxes = random_boxes(rng, 80)
+        # some large boxes and near duplicates
+        boxes += [[0, 0, 500, 500]] + [[x1 + 3, y1 + 3, x2 + 3, y2 + 3] for x1, y1, x2, y2 in boxes[:20]]
+        rng.shuffle(boxes)
+        keep = nms_in_order(as_boxes(boxes), 0.5, max_area=0.05 * size[0] * size[1])
+        assert [box for box, kept in zip(boxes, keep) if kept] == ref_remove_boxes(boxes, size)
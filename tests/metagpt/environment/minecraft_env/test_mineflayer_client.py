@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : the unittest of the async mineflayer client against a stub mineflayer server
+
+import asyncio
+import gc
+import json
+import warnings
+from contextlib import asynccontextmanager
+
+import pytest
+from aiohttp import web
+
+from metagpt.environment.minecraft.minecraft_ext_env import MinecraftExtEnv
+from metagpt.environment.minecraft.mineflayer_client import MineflayerClient
+from metagpt.environment.minecraft.process_monitor import SubprocessMonitor
+
+
+class StubMonitor(SubprocessMonitor):
+    """Stands for the node process, the stub server is already listening"""
+
+    def __init__(self):
+        super().__init__(commands=[], name="stub_mineflayer")
+        self.running = False
+        self.ready_line = "Server started on port 0"
+
+    def run(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    @property
+    def is_running(self):
+        return self.running
+
+
+class StubMineflayer:
+    """Mimics the /start, /step, /pause and /stop endpoints of `mineflayer/index.js`"""
+
+    def __init__(self, step_delay: float = 0):
+        self.step_delay = step_delay
+        self.paused = False
+        self.spawned = False
+        self.calls = []
+        self.peers = set()
+
+    def _record(self, request: web.Request):
+        self.calls.append(request.path)
+        self.peers.add(request.transport.get_extra_info("peername"))
+
+    async def start(self, request: web.Request):
+        self._record(request)
+        options = await request.json()
+        self.spawned = True
+        return web.json_response(json.dumps([["observe", {"reset": options["reset"]}]]))
+
+    async def step(self, request: web.Request):
+        self._record(request)
+        data = await request.json()
+        await asyncio.sleep(self.step_delay)
+        return web.json_response(json.dumps([["observe", {"code": data["code"], "paused": self.paused}]]))
+
+    async def pause(self, request: web.Request):
+        self._record(request)
+        if not self.spawned:
+            return web.json_response({"error": "Bot not spawned"}, status=400)
+        self.paused = not self.paused
+        return web.json_response({"message": "Success"})
+
+    async def stop(self, request: web.Request):
+        self._record(request)
+        self.spawned = False
+        return web.json_response({"message": "Bot stopped"})
+
+
+@asynccontextmanager
+async def stub_server():
+    stub = StubMineflayer()
+    app = web.Application()
+    app.router.add_post("/start", stub.start)
+    app.router.add_post("/step", stub.step)
+    app.router.add_post("/pause", stub.pause)
+    app.router.add_post("/stop", stub.stop)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    try:
+        yield stub, port
+    finally:
+        await runner.cleanup()
+
+
+def new_ext_env(port: int, request_timeout: int = 600) -> MinecraftExtEnv:
+    return MinecraftExtEnv(server_port=str(port), mineflayer=StubMonitor(), request_timeout=request_timeout)
+
+
+@pytest.mark.asyncio
+async def test_reset_step_close():
+    async with stub_server() as (stub, port):
+        ext_env = new_ext_env(port)
+
+        events = await ext_env._reset(options={"mode": "hard"})
+        assert events == [["observe", {"reset": "hard"}]]
+        assert ext_env.connected and ext_env.server_paused
+
+        events = await ext_env._step("bot.chat('hi')")
+        assert events == [["observe", {"code": "bot.chat('hi')", "paused": False}]]
+        assert ext_env.server_paused and stub.paused
+        assert stub.calls == ["/start", "/pause", "/pause", "/step", "/pause"]
+        # all the requests reuse the keep-alive connection
+        assert len(stub.peers) == 1
+
+        assert await ext_env.close()
+        assert stub.calls[-2:] == ["/pause", "/stop"]
+        assert not ext_env.mineflayer.is_running
+
+
+@pytest.mark.asyncio
+async def test_step_not_blocking():
+    async with stub_server() as (stub, port):
+        ext_env = new_ext_env(port)
+        await ext_env._reset()
+        stub.step_delay = 0.5
+
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.05)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        await ext_env._step("bot.chat('slow')")
+        ticker.cancel()
+        assert ticks >= 5
+        await ext_env.close()
+
+
+@pytest.mark.asyncio
+async def test_step_timeout_and_cancel():
+    async with stub_server() as (stub, port):
+        ext_env = new_ext_env(port, request_timeout=1)
+        await ext_env._reset()
+        stub.step_delay = 3
+
+        with pytest.raises(asyncio.TimeoutError):
+            await ext_env._step("bot.chat('timeout')")
+
+        task = asyncio.create_task(ext_env._step("bot.chat('cancel')"))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await ext_env.client.close()
+
+
+@pytest.mark.asyncio
+async def test_step_before_reset():
+    async with stub_server() as (_, port):
+        ext_env = new_ext_env(port)
+        with pytest.raises(RuntimeError):
+            await ext_env._step("bot.chat('hi')")
+
+
+def test_session_of_another_loop_closed():
+    client = MineflayerClient("http://127.0.0.1:0")
+    first = asyncio.run(client._get_session())
+    with warnings.catch_warnings(record=True) as records:
+        warnings.simplefilter("always")
+        second = asyncio.run(client._get_session())
+        del first
+        gc.collect()
+    assert second is not None and second.closed is False
+    assert not [i for i in records if "Unclosed client session" in str(i.message)]
+    asyncio.run(client.close())
+    assert second.closed
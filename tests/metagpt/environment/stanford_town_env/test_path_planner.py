@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : the unittest of GridPathPlanner
+
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from metagpt.environment.stanford_town.path_planner import GridPathPlanner
+from metagpt.environment.stanford_town.stanford_town_ext_env import StanfordTownExtEnv
+from metagpt.ext.stanford_town.utils.const import collision_block_id
+from metagpt.logs import logger
+
+maze_asset_path = (
+    Path(__file__)
+    .absolute()
+    .parent.joinpath("..", "..", "..", "..", "metagpt/ext/stanford_town/static_dirs/assets/the_ville")
+)
+
+
+def wavefront_path(a, start, end) -> list[tuple[int, int]]:
+    """The former `path_finder_v2`, which rescans the maze for every step, on a 0/1 maze in [row][col]"""
+
+    def make_step(m, k):
+        for i in range(len(m)):
+            for j in range(len(m[i])):
+                if m[i][j] == k:
+                    if i > 0 and m[i - 1][j] == 0 and a[i - 1][j] == 0:
+                        m[i - 1][j] = k + 1
+                    if j > 0 and m[i][j - 1] == 0 and a[i][j - 1] == 0:
+                        m[i][j - 1] = k + 1
+                    if i < len(m) - 1 and m[i + 1][j] == 0 and a[i + 1][j] == 0:
+                        m[i + 1][j] = k + 1
+                    if j < len(m[i]) - 1 and m[i][j + 1] == 0 and a[i][j + 1] == 0:
+                        m[i][j + 1] = k + 1
+
+    m = [[0] * len(row) for row in a]
+    m[start[0]][start[1]] = 1
+    k = 0
+    while m[end[0]][end[1]] == 0 and k < 150:
+        k += 1
+        make_step(m, k)
+    return m[end[0]][end[1]]
+
+
+@pytest.fixture(scope="module")
+def ext_env():
+    return StanfordTownExtEnv(maze_asset_path=maze_asset_path)
+
+
+def check_path(blocked: np.ndarray, path: list[tuple[int, int]], start, end):
+    assert path[0] == tuple(start) and path[-1] == tuple(end)
+    for (x0, y0), (x1, y1) in zip(path, path[1:]):
+        assert abs(x0 - x1) + abs(y0 - y1) == 1
+        assert not blocked[y1, x1]
+
+
+def test_find_path_small_grid():
+    blocked = np.array(
+        [
+            [0, 0, 0, 0],
+            [1, 1, 1, 0],
+            [1, 0, 0, 0],
+            [0, 1, 1, 1],
+        ],
+        dtype=bool,
+    )
+    planner = GridPathPlanner(blocked)
+    path = planner.find_path((0, 0), (1, 2))
+    check_path(blocked, path, (0, 0), (1, 2))
+    assert len(path) == 8
+
+    # start on a blocked tile
+    path = planner.find_path((1, 1), (1, 2))
+    check_path(blocked, path, (1, 1), (1, 2))
+    assert len(path) == 2
+
+    # unreachable or blocked target
+    assert planner.find_path((0, 0), (0, 3)) == [(0, 3)]
+    assert planner.find_path((0, 0), (1, 3)) == [(1, 3)]
+    assert planner.find_path((2, 2), (2, 2)) == [(2, 2)]
+    assert (planner.hits, planner.misses) == (1, 3)
+
+
+def test_find_path_the_ville(ext_env):
+    blocked = np.array(ext_env.collision_maze) == collision_block_id
+    # the grid of the env is the one of `path_finder`
+    assert (ext_env._path_planner.blocked == blocked).all()
+    free = np.argwhere(~blocked)
+    rng = np.random.default_rng(0)
+    maze = blocked.astype(int).tolist()
+
+    pairs, old_lengths, old_time = [], [], 0
+    while len(pairs) < 3:
+        (y0, x0), (y1, x1) = free[rng.choice(len(free), 2)]
+        if not 20 <= abs(int(x0) - int(x1)) + abs(int(y0) - int(y1)) <= 40:
+            continue
+        start_time = time.perf_counter()
+        old_length = wavefront_path(maze, (y0, x0), (y1, x1))
+        if old_length:
+            old_time += time.perf_counter() - start_time
+            pairs.append(((int(x0), int(y0)), (int(x1), int(y1))))
+            old_lengths.append(old_length)
+    old_time /= len(pairs)
+
+    start_time = time.perf_counter()
+    paths = [ext_env.find_path(start, end) for start, end in pairs]
+    new_time = (time.perf_counter() - start_time) / len(pairs)
+
+    # later personas walking to the same targets reuse the distance fields
+    start_time = time.perf_counter()
+    for start, end in pairs:
+        ext_env.find_path(tuple(free[0][::-1]), end)
+    cached_time = (time.perf_counter() - start_time) / len(pairs)
+
+    logger.info(
+        f"per path: wavefront {old_time * 1000:.1f} ms, bfs {new_time * 1000:.1f} ms, {cached_time * 1000:.2f} ms"
+    )
+    for (start, end), path, old_length in zip(pairs, paths, old_lengths):
+        check_path(blocked, path, start, end)
+        assert len(path) == old_length
+    assert new_time < old_time
+    assert cached_time < new_time
@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 # @Desc   : the unittest of StanfordTownExtEnv
 
+import math
+import time
 from pathlib import Path
 
 from metagpt.environment.stanford_town.env_space import (
@@ -62,3 +64,61 @@ def test_stanford_town_ext_env_observe_step():
     event = ("double studio:double studio:bedroom 2:bed", None, None, None)
     obs, _, _, _, _ = ext_env.step(action=EnvAction(action_type=EnvActionType.ADD_TILE_EVENT, coord=tile, event=event))
     assert len(ext_env.tiles[tile[1]][tile[0]]["events"]) == 1
+
+
+def perceive_by_tiles(ext_env: StanfordTownExtEnv, tile: tuple[int, int], vision_r: int):
+    """The per-tile perception of `STRole.observe` before the bulk queries"""
+    nearby_tiles = ext_env.get_nearby_tiles(tile=tile, vision_r=vision_r)
+    addresses = []
+    for nearby_tile in nearby_tiles:
+        tile_info = ext_env.access_tile(nearby_tile)
+        address = {k: tile_info[k] for k in ["world", "sector", "arena", "game_object"]}
+        if address not in addresses:
+            addresses.append(address)
+
+    curr_arena_path = ext_env.get_tile_path(tile, level="arena")
+    events, percept_events_set = [], set()
+    for nearby_tile in nearby_tiles:
+        tile_details = ext_env.access_tile(nearby_tile)
+        if tile_details["events"] and ext_env.get_tile_path(nearby_tile, level="arena") == curr_arena_path:
+            dist = math.dist(nearby_tile, tile)
+            for event in tile_details["events"]:
+                if event not in percept_events_set:
+                    events.append((dist, event))
+                    percept_events_set.add(event)
+    return addresses, sorted(events, key=lambda x: x[0])
+
+
+def test_stanford_town_ext_env_nearby_query():
+    ext_env = StanfordTownExtEnv(maze_asset_path=maze_asset_path)
+    persona_event = ("Isabella Rodriguez", "is", "sleeping", "sleeping")
+    ext_env.add_event_from_tile(persona_event, (57, 9))
+    ext_env.add_event_from_tile(persona_event, (58, 10))
+
+    for tile in [(58, 9), (72, 14), (0, 0), (139, 99), (30, 60)]:
+        for vision_r in [4, 8]:
+            addresses, events = perceive_by_tiles(ext_env, tile, vision_r)
+            assert ext_env.get_nearby_addresses(tile, vision_r) == addresses
+            assert ext_env.get_nearby_events(tile, vision_r) == events
+            assert ext_env.get_tile_path(tile, level="arena") == ":".join(
+                ext_env.access_tile(tile)[k] for k in ["world", "sector", "arena"]
+            )
+
+    assert (1.0, persona_event) in ext_env.get_nearby_events((58, 9), 4)
+    ext_env.remove_subject_events_from_tile(persona_event[0], (57, 9))
+    ext_env.remove_event_from_tile(persona_event, (58, 10))
+    assert persona_event not in [event for _, event in ext_env.get_nearby_events((58, 9), 4)]
+
+    obs = ext_env.observe(EnvObsParams(obs_type=EnvObsType.TILE_NBR_EVENTS, coord=(58, 9), vision_radius=4))
+    assert obs == perceive_by_tiles(ext_env, (58, 9), 4)[1]
+
+    start = time.perf_counter()
+    for _ in range(10):
+        perceive_by_tiles(ext_env, (72, 14), 8)
+    per_tile_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(10):
+        ext_env.get_nearby_addresses((72, 14), 8)
+        ext_env.get_nearby_events((72, 14), 8)
+    bulk_time = time.perf_counter() - start
+    assert bulk_time < per_tile_time
@@ -2,10 +2,13 @@
 # -*- coding: utf-8 -*-
 # @Desc   : the unittest of ExtEnv&Env
 
+import asyncio
+import time
 from typing import Any, Optional
 
 import pytest
 
+from metagpt.actions import Action, UserRequirement
 from metagpt.environment.api.env_api import EnvAPIAbstract
 from metagpt.environment.base_env import (
     Environment,
@@ -15,6 +18,9 @@ from metagpt.environment.base_env import (
     mark_as_writeable,
 )
 from metagpt.environment.base_env_space import BaseEnvAction, BaseEnvObsParams
+from metagpt.logs import logger
+from metagpt.roles import Role
+from metagpt.schema import Message
 
 
 class ForTestEnv(Environment):
@@ -69,3 +75,161 @@ async def test_ext_env():
 
     assert await env.read_from_api("read_api_no_param") == 15
     assert await env.read_from_api(EnvAPIAbstract(api_name="read_api", kwargs={"a": 5, "b": 5})) == 10
+
+
+class Relay(Action):
+    pass
+
+
+class RelayRole(Role):
+    """Relay the message to the next role after `latency` seconds"""
+
+    next_role: str = ""
+    latency: float = 0
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.set_actions([Relay])
+        self._watch([UserRequirement, Relay])
+
+    async def _act(self) -> Message:
+        await asyncio.sleep(self.latency)
+        return Message(content="relay", cause_by=Relay, sent_from=self, send_to=self.next_role or "nobody")
+
+
+def new_relay_roles(n: int, chains: list[list[float]]) -> list[RelayRole]:
+    """Relay roles, the first ones form the chains with the given latencies, the others are always idle"""
+    roles = []
+    for chain in chains:
+        for i, latency in enumerate(chain):
+            next_role = f"role_{len(roles) + 1}" if i < len(chain) - 1 else ""
+            roles.append(
+                RelayRole(name=f"role_{len(roles)}", profile=f"role_{len(roles)}", next_role=next_role, latency=latency)
+            )
+    roles.extend(RelayRole(name=f"role_{i}", profile=f"role_{i}") for i in range(len(roles), n))
+    return roles
+
+
+@pytest.mark.asyncio
+async def test_env_ready_roles(mocker):
+    roles = new_relay_roles(50, [[0] * 10])
+    env = Environment(roles={i.profile: i for i in roles})
+    assert env.is_idle
+    spy = mocker.spy(RelayRole, "_observe")
+
+    env.publish_message(Message(content="start", cause_by=UserRequirement, send_to="role_0"))
+    assert not env.is_idle
+    assert list(env._ready) == [roles[0]]
+    start = time.perf_counter()
+    await env.run_until_idle()
+    cost = time.perf_counter() - start
+    logger.info(f"{len(roles)} roles, {spy.call_count} role runs, cost {cost:.3f}s")
+    assert env.is_idle
+    # Only the 10 roles of the chain run, while the lock-step scheduler runs all the 50 roles in every round
+    assert spy.call_count == 20
+    assert all(len(i.rc.memory.get()) == 1 for i in roles[:10])
+
+
+class AlwaysObservingRole(Role):
+    """Act in every round without messages, as the roles of Stanford Town do"""
+
+    runs: int = 0
+
+    async def _observe(self, ignore_memory=False) -> int:
+        return 1
+
+    async def react(self) -> Message:
+        self.runs += 1
+        return Message(content="step")
+
+
+@pytest.mark.asyncio
+async def test_env_run_every_role():
+    role = AlwaysObservingRole(name="st", profile="st")
+    env = Environment(roles={role.profile: role})
+    assert env.is_idle
+    await env.run(k=3)
+    assert role.runs == 3
+
+
+@pytest.mark.asyncio
+async def test_env_run_until_idle():
+    # The slow chain and the fast chain take 0.3s each, a lock-step round waits for the slowest role.
+    chains = [[0.3, 0], [0.1, 0.1, 0.1, 0]]
+    costs = {}
+    for event_driven in [False, True]:
+        roles = new_relay_roles(50, chains)
+        env = Environment(roles={i.profile: i for i in roles})
+        env.publish_message(Message(content="start", cause_by=UserRequirement, send_to={"role_0", "role_2"}))
+        start = time.perf_counter()
+        if event_driven:
+            await env.run_until_idle()
+        else:
+            while not env.is_idle:
+                await env.run()
+        costs[event_driven] = time.perf_counter() - start
+        assert env.is_idle
+        assert len(roles[5].rc.memory.get()) == 1
+    logger.info(f"lock-step cost {costs[False]:.3f}s, event-driven cost {costs[True]:.3f}s")
+    assert costs[False] >= 0.5
+    assert costs[True] < 0.45
+
+
+@pytest.mark.asyncio
+async def test_env_run_until_idle_max_runs():
+    roles = new_relay_roles(2, [[0, 0]])
+    roles[1].next_role = "role_0"  # endless ping-pong
+    env = Environment(roles={i.profile: i for i in roles})
+    env.publish_message(Message(content="start", cause_by=UserRequirement, send_to="role_0"))
+    await env.run_until_idle(max_runs_per_role=3)
+    assert not env.is_idle
+
+    def check_balance():
+        raise RuntimeError("no money")
+
+    with pytest.raises(RuntimeError):
+        await env.run_until_idle(before_run=check_balance)
+
+
+def test_env_publish_message():
+    roles = new_relay_roles(5, [])
+    env = Environment(roles={i.profile: i for i in roles}, history_size=3)
+    roles[1].set_addresses({"role_1", "group"})
+    roles[3].set_addresses({"group"})
+
+    env.publish_message(Message(content="to role_1", send_to="role_1"))
+    env.publish_message(Message(content="to group", send_to={"role_3", "group", "role_0"}))
+    env.publish_message(Message(content="to all"))
+    env.publish_message(Message(content="to nobody", send_to="nobody"))
+    received = [[m.content for m in i.rc.msg_buffer.pop_all()] for i in roles]
+    assert received == [
+        ["to group", "to all"],
+        ["to role_1", "to group", "to all"],
+        ["to all"],
+        ["to group", "to all"],
+        ["to all"],
+    ]
+    # The old address is dropped from the routing index
+    roles[1].set_addresses({"group"})
+    env.publish_message(Message(content="to role_1", send_to="role_1"))
+    assert roles[1].rc.msg_buffer.empty()
+    assert set(env._ready) == set(roles)
+    # The member order is kept along with the addresses, rather than rebuilt for each message
+    assert env._member_order == {role: i for i, role in enumerate(env.member_addrs)}
+
+    assert env.history == "\nuser: to all\nuser: to nobody\nuser: to role_1"
+    new_env = Environment(**env.model_dump())
+    assert new_env.history == env.history
+
+
+def test_env_publish_message_scaling():
+    for n in [10, 100]:
+        roles = new_relay_roles(n, [])
+        env = Environment(roles={i.profile: i for i in roles})
+        start = time.perf_counter()
+        for i in range(1000):
+            env.publish_message(Message(content="relay", send_to=f"role_{i % n}"))
+        cost = time.perf_counter() - start
+        logger.info(f"publish 1000 messages to {n} roles, cost {cost:.3f}s")
+        assert len(env.history.splitlines()) == 1000 + 1
+        assert all(len(i.rc.msg_buffer.pop_all()) == 1000 // n for i in roles)
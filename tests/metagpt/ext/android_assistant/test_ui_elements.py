@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : the unittest of the ui elements parsing, compared with the former pairwise implementation
+
+import time
+from pathlib import Path
+from xml.etree.ElementTree import iterparse
+
+import pytest
+
+from metagpt.config2 import config
+from metagpt.const import TEST_DATA_PATH
+from metagpt.ext.android_assistant.utils.schema import AndroidElement
+from metagpt.ext.android_assistant.utils.ui_elements import (
+    elem_list_from_xml_tree,
+    get_id_from_element,
+    parse_bounds,
+    traverse_xml_tree,
+)
+
+CONTACTS_XML = TEST_DATA_PATH.joinpath("andriod_assistant/ui_dump/contacts.xml")
+MIN_DIST = 30
+
+
+def ref_traverse_xml_tree(xml_path: Path, elem_list: list[AndroidElement], attrib: str, add_index=False):
+    path = []
+    for event, elem in iterparse(str(xml_path), ["start", "end"]):
+        if event == "start":
+            path.append(elem)
+            if attrib in elem.attrib and elem.attrib[attrib] == "true":
+                parent_prefix = ""
+                if len(path) > 1:
+                    parent_prefix = get_id_from_element(path[-2])
+                x1, y1, x2, y2 = parse_bounds(elem.attrib["bounds"])
+                center = (x1 + x2) // 2, (y1 + y2) // 2
+                elem_id = get_id_from_element(elem)
+                if parent_prefix:
+                    elem_id = parent_prefix + "_" + elem_id
+                if add_index:
+                    elem_id += f"_{elem.attrib['index']}"
+                close = False
+                for e in elem_list:
+                    bbox = e.bbox
+                    center_ = (bbox[0][0] + bbox[1][0]) // 2, (bbox[0][1] + bbox[1][1]) // 2
+                    dist = (abs(center[0] - center_[0]) ** 2 + abs(center[1] - center_[1]) ** 2) ** 0.5
+                    if dist <= MIN_DIST:
+                        close = True
+                        break
+                if not close:
+                    elem_list.append(AndroidElement(uid=elem_id, bbox=((x1, y1), (x2, y2)), attrib=attrib))
+        if event == "end":
+            path.pop()
+
+
+def ref_elem_list_from_xml_tree(xml_path: Path, useless_list: list[str], min_dist: int) -> list[AndroidElement]:
+    clickable_list = []
+    focusable_list = []
+    ref_traverse_xml_tree(xml_path, clickable_list, "clickable", True)
+    ref_traverse_xml_tree(xml_path, focusable_list, "focusable", True)
+    elem_list = [elem for elem in clickable_list if elem.uid not in useless_list]
+    for elem in focusable_list:
+        if elem.uid in useless_list:
+            continue
+        bbox = elem.bbox
+        center = (bbox[0][0] + bbox[1][0]) // 2, (bbox[0][1] + bbox[1][1]) // 2
+        close = False
+        for e in clickable_list:
+            bbox = e.bbox
+            center_ = (bbox[0][0] + bbox[1][0]) // 2, (bbox[0][1] + bbox[1][1]) // 2
+            dist = (abs(center[0] - center_[0]) ** 2 + abs(center[1] - center_[1]) ** 2) ** 0.5
+            if dist <= min_dist:
+                close = True
+                break
+        if not close:
+            elem_list.append(elem)
+    return elem_list
+
+
+def write_dense_dump(xml_path: Path, rows: int, cols: int):
+    """A grid of buttons, every other one has a focusable label overlapping the next button"""
+    nodes = []
+    for r in range(rows):
+        for c in range(cols):
+            x, y = c * 36, r * 24
+            nodes.append(
+                f'<node index="{c}" class="android.widget.Button" resource-id="" content-desc="" clickable="true" '
+                f'focusable="{str(c % 2 == 0).lower()}" bounds="[{x},{y}][{x + 30},{y + 20}]" />'
+            )
+            if c % 2:
+                nodes.append(
+                    f'<node index="{c}" class="android.widget.TextView" resource-id="" content-desc="" '
+                    f'clickable="false" focusable="true" bounds="[{x + 20},{y + 5}][{x + 90},{y + 15}]" />'
+                )
+    xml = (
+        '<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0">'
+        '<node index="0" class="android.widget.FrameLayout" resource-id="" content-desc="" clickable="false" '
+        f'focusable="false" bounds="[0,0][{cols * 36},{rows * 24}]">{"".join(nodes)}</node></hierarchy>'
+    )
+    xml_path.write_text(xml)
+
+
+@pytest.fixture(autouse=True)
+def min_dist():
+    extra = config.extra
+    config.extra = {"min_dist": MIN_DIST}
+    yield
+    config.extra = extra
+
+
+def test_traverse_xml_tree():
+    for attrib in ["clickable", "focusable"]:
+        elem_list, ref_list = [], []
+        traverse_xml_tree(CONTACTS_XML, elem_list, attrib, True)
+        ref_traverse_xml_tree(CONTACTS_XML, ref_list, attrib, True)
+        assert elem_list == ref_list
+
+    elem_list = []
+    traverse_xml_tree(CONTACTS_XML, elem_list, "clickable")
+    assert elem_list[0].uid == "com.android.contacts.id_toolbar_android.widget.ImageButton_147_147"
+    assert elem_list[0].bbox == ((0, 63), (147, 210))
+
+    # the elements close to those already in the list are skipped
+    existing = AndroidElement(uid="existing", bbox=((0, 63), (147, 210)), attrib="clickable")
+    elem_list, ref_list = [existing], [existing]
+    traverse_xml_tree(CONTACTS_XML, elem_list, "clickable")
+    ref_traverse_xml_tree(CONTACTS_XML, ref_list, "clickable")
+    assert elem_list == ref_list
+    assert elem_list[1].uid == "com.android.contacts.id_toolbar_com.android.contacts.id_menu_search_Search"
+
+
+def test_elem_list_from_xml_tree(tmp_path):
+    elem_list = elem_list_from_xml_tree(CONTACTS_XML, [], MIN_DIST)
+    assert elem_list == ref_elem_list_from_xml_tree(CONTACTS_XML, [], MIN_DIST)
+    assert len(elem_list) == 25
+
+    useless_list = [elem_list[0].uid, elem_list[-1].uid]
+    assert elem_list_from_xml_tree(CONTACTS_XML, useless_list, MIN_DIST) == ref_elem_list_from_xml_tree(
+        CONTACTS_XML, useless_list, MIN_DIST
+    )
+
+    xml_path = tmp_path / "dense.xml"
+    write_dense_dump(xml_path, rows=8, cols=6)
+    elem_list = elem_list_from_xml_tree(xml_path, [], 10)
+    assert elem_list == ref_elem_list_from_xml_tree(xml_path, [], 10)
+
+
+def test_elem_list_from_xml_tree_perf(tmp_path):
+    xml_path = tmp_path / "dense.xml"
+    write_dense_dump(xml_path, rows=40, cols=20)
+
+    start = time.perf_counter()
+    ref_list = ref_elem_list_from_xml_tree(xml_path, [], MIN_DIST)
+    ref_cost = time.perf_counter() - start
+
+    start = time.perf_counter()
+    elem_list = elem_list_from_xml_tree(xml_path, [], MIN_DIST)
+    cost = time.perf_counter() - start
+
+    assert elem_list == ref_list
+    print(f"{len(elem_list)} elements, pairwise: {ref_cost * 1000:.1f}ms, vectorized: {cost * 1000:.1f}ms")
+    assert cost < ref_cost
@@ -9,6 +9,12 @@ import pytest
 from metagpt.ext.stanford_town.memory.agent_memory import AgentMemory
 from metagpt.ext.stanford_town.memory.retrieve import agent_retrieve
 from metagpt.ext.stanford_town.utils.const import STORAGE_PATH
+from metagpt.ext.stanford_town.utils.embedding_service import (
+    EmbeddingService,
+    LocalEmbeddingBackend,
+    get_embedding_service,
+    set_embedding_service,
+)
 from metagpt.logs import logger
 
 """
@@ -66,7 +72,15 @@ class TestAgentMemory:
         result2 = agent_memory.get_last_chat("customers")
         logger.info(f"上一次对话是{result2}")
 
-    def test_retrieve_function(self, agent_memory):
+    @pytest.fixture
+    def local_embedding(self):
+        service = get_embedding_service()
+        set_embedding_service(EmbeddingService(backend=LocalEmbeddingBackend()))
+        yield
+        set_embedding_service(service)
+
+    @pytest.mark.asyncio
+    async def test_retrieve_function(self, agent_memory, local_embedding):
         focus_points = ["who i love?"]
         retrieved = dict()
         for focal_pt in focus_points:
@@ -77,7 +91,7 @@ class TestAgentMemory:
             ]
             nodes = sorted(nodes, key=lambda x: x[0])
             nodes = [i for created, i in nodes]
-            results = agent_retrieve(agent_memory, datetime.now() - timedelta(days=120), 0.99, focal_pt, nodes, 5)
+            results = await agent_retrieve(agent_memory, datetime.now() - timedelta(days=120), 0.99, focal_pt, nodes, 5)
             final_result = []
             for n in results:
                 for i in agent_memory.storage:
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : the unittest of retrieve
+
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from metagpt.ext.stanford_town.memory.agent_memory import (
+    AgentMemory,
+    BasicMemory,
+    RetrievalIndex,
+)
+from metagpt.ext.stanford_town.memory.retrieve import (
+    agent_retrieve,
+    new_agent_retrieve,
+    rank_rows,
+)
+from metagpt.ext.stanford_town.utils.embedding_service import (
+    EmbeddingService,
+    LocalEmbeddingBackend,
+    get_embedding_service,
+    set_embedding_service,
+)
+from metagpt.logs import logger
+
+DIM = 32
+NOW = datetime(2023, 2, 13, 12)
+
+
+@pytest.fixture
+def local_embedding():
+    service = get_embedding_service()
+    set_embedding_service(EmbeddingService(backend=LocalEmbeddingBackend(dim=DIM)))
+    yield get_embedding_service()
+    set_embedding_service(service)
+
+
+def new_agent_memory(n: int, seed: int = 0) -> AgentMemory:
+    rng = np.random.default_rng(seed)
+    memory = AgentMemory()
+    for i in range(n):
+        created = NOW - timedelta(days=int(rng.integers(0, 30)), minutes=int(rng.integers(0, 600)))
+        desc = "is idle" if i % 10 == 0 else f"event {i}"
+        add = memory.add_thought if i % 3 == 0 else memory.add_event
+        if i % 7 == 0:
+            add = memory.add_chat
+        add(
+            created,
+            None,
+            "Isabella",
+            "is",
+            "idle" if i % 10 == 0 else f"o{i}",
+            desc,
+            set(),
+            int(rng.integers(1, 10)),
+            (desc, rng.standard_normal(DIM).tolist()),
+            None,
+        )
+    return memory
+
+
+def reference_retrieve(agent_memory, curr_time, memory_forget, query_embedding, nodes, topk) -> list[str]:
+    """The original per-node implementation"""
+    nodes = sorted(nodes, key=lambda node: node.last_accessed, reverse=True)
+
+    def normalize(values):
+        min_val, max_val = min(values), max(values)
+        if max_val == min_val:
+            return [0.5] * len(values)
+        return [(i - min_val) / (max_val - min_val) for i in values]
+
+    importance = normalize([node.poignancy for node in nodes])
+    recency = normalize([memory_forget ** (curr_time - node.created).days for node in nodes])
+    relevance = normalize(
+        [
+            np.dot(agent_memory.embeddings[node.embedding_key], query_embedding)
+            / (np.linalg.norm(agent_memory.embeddings[node.embedding_key]) * np.linalg.norm(query_embedding))
+            for node in nodes
+        ]
+    )
+    total = {node.memory_id: importance[i] + recency[i] + relevance[i] for i, node in enumerate(nodes)}
+    return [k for k, _ in sorted(total.items(), key=lambda item: item[1], reverse=True)[:topk]]
+
+
+@pytest.mark.asyncio
+async def test_agent_retrieve(local_embedding):
+    memory = new_agent_memory(300)
+    nodes = [i for i in memory.event_list + memory.thought_list if "idle" not in i.embedding_key]
+    for query in ["who do I love?", "what is for lunch?"]:
+        query_embedding = await local_embedding.aget_embedding(query)
+        expected = reference_retrieve(memory, NOW, 0.99, query_embedding, nodes, 10)
+        assert await agent_retrieve(memory, NOW, 0.99, query, nodes, 10) == expected
+        assert await agent_retrieve(memory, NOW, 0.99, query, nodes[:5], 10) == reference_retrieve(
+            memory, NOW, 0.99, query_embedding, nodes[:5], 10
+        )
+
+
+@pytest.mark.asyncio
+async def test_new_agent_retrieve(local_embedding):
+    memory = new_agent_memory(100)
+    role = SimpleNamespace(memory=memory, scratch=SimpleNamespace(curr_time=NOW + timedelta(days=1), recency_decay=0.9))
+    retrieved = await new_agent_retrieve(role, ["focal 1", "focal 2"], 5)
+    assert list(retrieved.keys()) == ["focal 1", "focal 2"]
+    for nodes in retrieved.values():
+        assert len(nodes) == 5
+        for node in nodes:
+            assert node.memory_type in ["event", "thought"]
+            assert "idle" not in node.embedding_key
+            assert node.last_accessed == role.scratch.curr_time
+    assert local_embedding.backend_calls == 1
+
+    # the rebuilt index of a deserialized memory gives the same result
+    new_memory = AgentMemory(**memory.model_dump())
+    assert new_memory.retrieval_index.size == memory.retrieval_index.size
+    assert new_memory.get_node("node_1").memory_id == "node_1"
+
+
+@pytest.mark.parametrize("n", [10_000, 100_000])
+def test_rank_rows_benchmark(n):
+    rng = np.random.default_rng(0)
+    index = RetrievalIndex()
+    for i in range(n):
+        node = BasicMemory(
+            memory_id=f"node_{i + 1}",
+            created=NOW - timedelta(hours=int(rng.integers(0, 24 * 30))),
+            embedding_key=f"event {i}",
+            poignancy=int(rng.integers(1, 10)),
+        )
+        index.add(node, rng.standard_normal(DIM).tolist(), retrievable=True)
+    rows = index.get_retrievable_rows()
+    query = rng.standard_normal(DIM).tolist()
+
+    start = time.perf_counter()
+    for _ in range(10):
+        result = rank_rows(index, rows, query, NOW, 0.99, 30)
+    elapsed = (time.perf_counter() - start) / 10
+    logger.info(f"rank {n} memories: {elapsed * 1000:.2f} ms per query")
+    assert len(result) == 30
+    assert elapsed < 0.5
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : the unittest of EmbeddingService
+
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from metagpt.ext.stanford_town.utils.embedding_service import (
+    EmbeddingService,
+    LocalEmbeddingBackend,
+)
+
+
+class CountingBackend(LocalEmbeddingBackend):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+        self.fail = False
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        self.batches.append(texts)
+        if self.fail:
+            raise ValueError("embed failed")
+        return await super().embed(texts)
+
+
+@pytest.mark.asyncio
+async def test_local_embedding_backend():
+    backend = LocalEmbeddingBackend(dim=64)
+    a1, b, a2 = await backend.embed(["a", "b", "a"])
+    assert a1 == a2
+    assert len(a1) == 64
+    assert np.isclose(np.linalg.norm(a1), 1)
+    assert abs(np.dot(a1, b)) < 0.5
+
+
+@pytest.mark.asyncio
+async def test_embedding_service_batch_and_cache():
+    backend = CountingBackend(dim=8)
+    service = EmbeddingService(backend=backend)
+
+    texts = [f"text {i}" for i in range(10)]
+    embeddings = await asyncio.gather(*[service.aget_embedding(i) for i in texts + ["text\n0 ", ""]])
+    assert backend.batches == [texts + ["this is blank"]]
+    assert embeddings[0] == embeddings[10]
+
+    assert await service.aget_embeddings(texts[:3]) == embeddings[:3]
+    assert len(backend.batches) == 1
+    assert service.metrics == {"hits": 4, "misses": 11, "backend_calls": 1, "cached": 11}
+
+    service.max_batch_size = 4
+    await service.aget_embeddings([f"new {i}" for i in range(10)])
+    assert [len(i) for i in backend.batches[1:]] == [4, 4, 2]
+
+
+@pytest.mark.asyncio
+async def test_embedding_service_error():
+    backend = CountingBackend(dim=8)
+    service = EmbeddingService(backend=backend)
+
+    backend.fail = True
+    results = await asyncio.gather(*[service.aget_embedding(i) for i in "abc"], return_exceptions=True)
+    assert all(isinstance(i, ValueError) for i in results)
+
+    backend.fail = False
+    assert len(await service.aget_embeddings("abc")) == 3
+    assert len(backend.batches) == 2
+
+
+@pytest.mark.asyncio
+async def test_embedding_service_persistence(tmp_path):
+    service = EmbeddingService(backend=LocalEmbeddingBackend(dim=8))
+    service.update({"known": [1.0] * 8})
+    await service.aget_embeddings(["query 1", "query 2", "stored"])
+    service.save(tmp_path / "cache.json", exclude=["stored"])
+
+    new_service = EmbeddingService(backend=CountingBackend(dim=8))
+    new_service.load(tmp_path / "cache.json")
+    assert new_service.get_cached("known") is None
+    assert new_service.get_cached("stored") is None
+    assert await new_service.aget_embedding("query  1") == service.get_cached("query 1")
+    assert new_service.backend.batches == []
+
+
+@pytest.mark.asyncio
+async def test_embedding_service_concurrency():
+    texts = [f"event {i}" for i in range(50)]
+    service = EmbeddingService(backend=LocalEmbeddingBackend(dim=8, latency=0.1))
+    start = time.perf_counter()
+    await asyncio.gather(*[service.aget_embedding(i) for i in texts])
+    elapsed = time.perf_counter() - start
+    # one request of 50 texts instead of 50 sequential requests
+    assert elapsed < 0.5
+    assert service.backend_calls == 1
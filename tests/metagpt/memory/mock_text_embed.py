@@ -40,3 +40,11 @@ def mock_openai_embed_document(self, text: str) -> list[float]:
 
 async def mock_openai_aembed_document(self, text: str) -> list[float]:
     return mock_openai_embed_document(self, text)
+
+
+def mock_openai_embed_each_document(self, texts: list[str], show_progress: bool = False) -> list[list[float]]:
+    return [mock_openai_embed_document(self, text) for text in texts]
+
+
+async def mock_openai_aembed_documents(self, texts: list[str]) -> list[list[float]]:
+    return mock_openai_embed_each_document(self, texts)
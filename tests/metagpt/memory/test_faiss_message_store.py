@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@Desc   : the unittests of metagpt/memory/faiss_message_store.py
+"""
+import os
+
+import numpy as np
+import pytest
+
+from metagpt.memory.faiss_message_store import (
+    INDEX_FILENAME,
+    MESSAGES_FILENAME,
+    VECTORS_FILENAME,
+    FaissMessageStore,
+)
+from metagpt.schema import Message
+
+
+def make_messages(start: int, end: int) -> tuple[list[Message], np.ndarray]:
+    messages = [Message(role="User", content=f"message {i}") for i in range(start, end)]
+    vectors = np.array([[float(i), 0.0, 1.0] for i in range(start, end)], dtype=np.float32)
+    return messages, vectors
+
+
+def assert_nearest(store: FaissMessageStore, i: int):
+    dists, idxs = store.search([[float(i), 0.0, 1.0]], 1)
+    assert dists[0][0] == 0
+    assert store.get_messages(idxs[0].tolist())[0].content == f"message {i}"
+
+
+def test_faiss_message_store_append_and_reload(tmp_path):
+    store = FaissMessageStore(tmp_path, compact_threshold=4)
+    dists, idxs = store.search([[0.0, 0.0, 1.0]], 2)
+    assert idxs.shape == (1, 0)
+
+    store.add(*make_messages(0, 3))
+    assert not tmp_path.joinpath(INDEX_FILENAME).exists()
+    assert store.tail_size == 3
+
+    # a snapshot is written when the tail reaches the threshold
+    store.add(*make_messages(3, 5))
+    assert tmp_path.joinpath(INDEX_FILENAME).exists()
+    assert tmp_path.joinpath(VECTORS_FILENAME).stat().st_size == 0
+    store.add(*make_messages(5, 6))
+
+    store = FaissMessageStore(tmp_path, compact_threshold=4)
+    assert (store.ntotal, store.tail_size) == (6, 1)
+    for i in range(6):
+        assert_nearest(store, i)
+
+    store.add(*make_messages(6, 7))
+    store.compact()
+    store = FaissMessageStore(tmp_path)
+    assert (store.ntotal, store.tail_size) == (7, 0)
+    assert [m.content for m in store.get_messages([6, 0])] == ["message 6", "message 0"]
+
+
+def test_faiss_message_store_interrupted(tmp_path):
+    store = FaissMessageStore(tmp_path)
+    store.add(*make_messages(0, 2))
+    size = tmp_path.joinpath(MESSAGES_FILENAME).stat().st_size
+
+    # the messages were written, but not their vectors
+    os.truncate(tmp_path / VECTORS_FILENAME, 4 * 3 + 2)
+    store = FaissMessageStore(tmp_path)
+    assert store.ntotal == 1
+    assert tmp_path.joinpath(MESSAGES_FILENAME).stat().st_size < size
+    store.add(*make_messages(1, 3))
+    store = FaissMessageStore(tmp_path)
+    assert store.ntotal == 3
+    for i in range(3):
+        assert_nearest(store, i)
+
+
+def test_faiss_message_store_interrupted_compaction(tmp_path):
+    store = FaissMessageStore(tmp_path)
+    store.add(*make_messages(0, 3))
+    vectors = tmp_path.joinpath(VECTORS_FILENAME).read_bytes()
+    meta = tmp_path.joinpath("memory_meta.json").read_text()
+    store.compact()
+
+    # the snapshot was replaced, but neither the tail nor the meta
+    tmp_path.joinpath(VECTORS_FILENAME).write_bytes(vectors)
+    tmp_path.joinpath("memory_meta.json").write_text(meta)
+    store = FaissMessageStore(tmp_path)
+    assert (store.ntotal, store.tail_size) == (3, 0)
+    store.add(*make_messages(3, 4))
+    assert FaissMessageStore(tmp_path).ntotal == 4
+
+
+@pytest.mark.parametrize("num_messages", [10, 10000])
+def test_faiss_message_store_lazy_messages(tmp_path, num_messages):
+    messages = [Message(role="User", content=f"message {i}") for i in range(num_messages)]
+    store = FaissMessageStore(tmp_path)
+    store.add(messages, np.random.default_rng(0).random((num_messages, 64), dtype=np.float32))
+    store.compact()
+
+    store = FaissMessageStore(tmp_path)
+    assert store.ntotal == num_messages
+    # the messages are read when found only
+    assert store.get_messages([num_messages - 1])[0].content == f"message {num_messages - 1}"
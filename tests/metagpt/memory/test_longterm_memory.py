@@ -7,14 +7,16 @@
 
 import pytest
 
-from metagpt.actions import UserRequirement
+from metagpt.actions import UserRequirement, WritePRD
 from metagpt.memory.longterm_memory import LongTermMemory
 from metagpt.roles.role import RoleContext
 from metagpt.schema import Message
 from tests.metagpt.memory.mock_text_embed import (
     mock_openai_aembed_document,
+    mock_openai_aembed_documents,
     mock_openai_embed_document,
     mock_openai_embed_documents,
+    mock_openai_embed_each_document,
     text_embed_arr,
 )
 
@@ -26,6 +28,9 @@ async def test_ltm_search(mocker):
     mocker.patch(
         "llama_index.embeddings.openai.base.OpenAIEmbedding._aget_query_embedding", mock_openai_aembed_document
     )
+    mocker.patch(
+        "llama_index.embeddings.openai.base.OpenAIEmbedding._aget_text_embeddings", mock_openai_aembed_documents
+    )
 
     role_id = "UTUserLtm(Product Manager)"
     from metagpt.environment import Environment
@@ -58,5 +63,41 @@ async def test_ltm_search(mocker):
     ltm.clear()
 
 
+@pytest.mark.asyncio
+async def test_ltm_batch(mocker):
+    mocker.patch(
+        "llama_index.embeddings.openai.base.OpenAIEmbedding._get_text_embeddings", mock_openai_embed_each_document
+    )
+    mock_aembed = mocker.patch(
+        "llama_index.embeddings.openai.base.OpenAIEmbedding._aget_text_embeddings",
+        side_effect=mock_openai_aembed_documents,
+        autospec=True,
+    )
+
+    role_id = "UTUserLtmBatch(Product Manager)"
+    RoleContext.model_rebuild()
+    rc = RoleContext(watch={"metagpt.actions.add_requirement.UserRequirement"})
+    ltm = LongTermMemory()
+    ltm.recover_memory(role_id, rc)
+    ltm.clear()
+    ltm.recover_memory(role_id, rc)
+
+    snake, sim_snake, game_2048, battle_city = [
+        Message(role="User", content=text_embed_arr[i]["text"], cause_by=UserRequirement) for i in range(4)
+    ]
+    unwatched = Message(role="User", content=text_embed_arr[2]["text"], cause_by=WritePRD)
+    ltm.add_batch([snake, unwatched])
+    assert ltm.count() == 2
+    assert ltm.memory_storage.store.ntotal == 1
+
+    news = await ltm.find_news([sim_snake, game_2048, battle_city])
+    assert news == [game_2048, battle_city]
+    # all the news are embedded in one call
+    assert mock_aembed.call_count == 1
+    assert await ltm.memory_storage.search_similar_batch([sim_snake, game_2048]) == [[snake], []]
+
+    ltm.clear()
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-s"])
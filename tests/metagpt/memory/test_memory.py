@@ -3,6 +3,7 @@
 # @Desc   : the unittest of Memory
 
 from metagpt.actions import UserRequirement
+from metagpt.logs import logger
 from metagpt.memory.memory import Memory
 from metagpt.schema import Message
 
@@ -55,3 +56,64 @@ def test_memory():
     memory.clear()
     assert memory.count() == 0
     assert len(memory.index) == 0
+
+
+def test_memory_index():
+    memory = Memory()
+
+    message1 = Message(content="test message1", role="user1", sent_from="Alice", send_to={"Bob"})
+    message2 = Message(content="test message2", role="user2", sent_from="Bob", send_to={"Alice", "Eve"})
+    memory.add_batch([message1, message2, message1])
+    assert memory.count() == 2
+    assert memory.get_by_sent_from("Alice") == [message1]
+    assert memory.get_by_send_to("Alice") == [message2]
+    assert memory.get_by_send_to("Eve") == [message2]
+
+    copied = Message(**message1.model_dump())
+    assert memory.find_news([copied]) == []
+    memory.delete(copied)
+    assert memory.count() == 1
+    assert memory.get_by_role("user1") == []
+    assert memory.get_by_sent_from("Alice") == []
+    assert memory.find_news([message1]) == [message1]
+
+    new_memory = Memory(**memory.model_dump())
+    assert new_memory.get_by_send_to("Eve")[0].content == message2.content
+    assert new_memory.index[message2.cause_by][0] is new_memory.storage[0]
+
+
+class CountingList(list):
+    """A storage which counts the reads of its items"""
+
+    reads = 0
+
+    def __getitem__(self, item):
+        self.reads += 1
+        return super().__getitem__(item)
+
+    def __iter__(self):
+        self.reads += len(self)
+        return super().__iter__()
+
+
+def test_memory_scaling(mocker):
+    """`add`, `find_news` and `delete` go through the indices, their costs do not grow with the memory size."""
+    eq = mocker.spy(Message, "__eq__")
+
+    def _run(size: int) -> tuple[int, int]:
+        memory = Memory()
+        messages = [Message(content=f"message {i}", role=f"user{i % 10}") for i in range(size)]
+        memory.add_batch(messages)
+        memory.storage = CountingList(memory.storage)
+        eq.reset_mock()
+        assert memory.find_news(messages[-100:] + [Message(content="unseen")])[0].content == "unseen"
+        memory.add_batch(messages[:100])
+        for message in messages[size // 2 : size // 2 + 10] + [messages[0], messages[-1]]:
+            memory.delete(Message(**message.model_dump()))
+        assert memory.count() == size - 12
+        assert memory.storage[0] is messages[1] and memory.storage[-1] is messages[-2]
+        return eq.call_count, memory.storage.reads - 2
+
+    counts = {size: _run(size) for size in (1000, 10000)}
+    logger.info(f"memory __eq__ calls and storage reads: {counts}")
+    assert counts[10000] == counts[1000]
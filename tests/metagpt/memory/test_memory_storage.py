@@ -14,6 +14,8 @@ from metagpt.actions import UserRequirement, WritePRD
 from metagpt.actions.action_node import ActionNode
 from metagpt.const import DATA_PATH
 from metagpt.memory.memory_storage import MemoryStorage
+from metagpt.rag.engines.simple import SimpleEngine
+from metagpt.rag.schema import FAISSRetrieverConfig
 from metagpt.schema import Message
 from tests.metagpt.memory.mock_text_embed import (
     mock_openai_aembed_document,
@@ -99,3 +101,38 @@ async def test_actionout_message(mocker):
 
     memory_storage.clean()
     assert memory_storage.is_initialized is False
+
+
+@pytest.mark.asyncio
+async def test_persist_and_migrate(mocker):
+    mocker.patch("llama_index.embeddings.openai.base.OpenAIEmbedding._get_text_embeddings", mock_openai_embed_documents)
+    mocker.patch("llama_index.embeddings.openai.base.OpenAIEmbedding._get_text_embedding", mock_openai_embed_document)
+    mocker.patch(
+        "llama_index.embeddings.openai.base.OpenAIEmbedding._aget_query_embedding", mock_openai_aembed_document
+    )
+
+    role_id = "UTUser3(Product Manager)"
+    role_mem_path = Path(DATA_PATH / f"role_mem/{role_id}/")
+    shutil.rmtree(role_mem_path, ignore_errors=True)
+    message = Message(role="User", content=text_embed_arr[0]["text"], cause_by=UserRequirement)
+    sim_message = Message(role="User", content=text_embed_arr[1]["text"], cause_by=UserRequirement)
+
+    # the memory persisted by the llama-index storage context before
+    memory_storage = MemoryStorage()
+    engine = SimpleEngine.from_objs(
+        objs=[message], retriever_configs=[FAISSRetrieverConfig()], embed_model=memory_storage.embedding
+    )
+    engine.retriever._index.storage_context.persist(role_mem_path)
+
+    memory_storage.recover_memory(role_id)
+    assert not role_mem_path.joinpath("default__vector_store.json").exists()
+    assert await memory_storage.search_similar(sim_message) == [message]
+
+    memory_storage.add(sim_message)
+    memory_storage.persist()
+    memory_storage = MemoryStorage()
+    memory_storage.recover_memory(role_id)
+    assert memory_storage.store.ntotal == 2
+    assert await memory_storage.search_similar(sim_message) == [message, sim_message]
+
+    memory_storage.clean()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : the unittest of HttpClientPool
+
+import asyncio
+
+import pytest
+
+from metagpt.provider import OpenAILLM
+from metagpt.provider.http_client_pool import HTTP_CLIENT_POOL, HttpClientPool
+from tests.metagpt.provider.mock_llm_config import (
+    mock_llm_config,
+    mock_llm_config_proxy,
+)
+
+
+@pytest.mark.asyncio
+async def test_http_client_pool():
+    pool = HttpClientPool(max_connections=10, max_keepalive_connections=5)
+    client = pool.get(mock_llm_config)
+    assert pool.get(mock_llm_config) is client
+    assert pool.get(mock_llm_config_proxy) is not client
+    assert pool.metrics == {"hits": 1, "misses": 2, "clients": 2}
+
+    async with pool.session():
+        async with pool.session():
+            pass
+        assert not client.is_closed
+    assert client.is_closed
+    assert pool.metrics["clients"] == 0
+    assert pool.get(mock_llm_config) is not client
+
+
+@pytest.mark.asyncio
+async def test_openai_llm_share_client():
+    llm1 = OpenAILLM(mock_llm_config)
+    llm2 = OpenAILLM(mock_llm_config)
+    assert llm1.aclient is not llm2.aclient
+    assert llm1.aclient._client is llm2.aclient._client
+
+    await llm1.aclient._client.aclose()
+    assert not llm1.aclient.is_closed()
+    assert llm1.aclient._client is llm2.aclient._client
+
+
+def test_http_client_pool_event_loops():
+    pool = HttpClientPool()
+    client = pool.get(mock_llm_config)  # outside of an event loop
+
+    async def get_clients():
+        return pool.get(mock_llm_config), pool.get(mock_llm_config)
+
+    client1, client2 = asyncio.run(get_clients())
+    assert client1 is client2
+    assert client1 is not client
+    # a new event loop gets a new client, the client of the closed loop is dropped
+    client3, _ = asyncio.run(get_clients())
+    assert client3 is not client1
+    assert pool.metrics["clients"] == 2
+    assert pool.get(mock_llm_config) is client
+
+    llm = OpenAILLM(mock_llm_config)
+
+    async def get_llm_client():
+        return llm.aclient._client
+
+    assert asyncio.run(get_llm_client()) is not asyncio.run(get_llm_client())
+
+
+@pytest.mark.asyncio
+async def test_openai_llm_client_metrics():
+    pool = HTTP_CLIENT_POOL
+    llm = OpenAILLM(mock_llm_config)
+    aclient = llm.aclient  # switched to the client of the running event loop
+    metrics = pool.metrics
+    # reading the client neither switches it nor counts as a reuse of the connections
+    assert all(llm.aclient is aclient for _ in range(10))
+    assert pool.metrics == metrics
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @Desc   : the unittest of llm response cache
+
+import time
+
+import pytest
+
+from metagpt.configs.llm_cache_config import LLMCacheConfig, LLMCacheType
+from metagpt.provider.llm_cache import (
+    MemoryLLMCache,
+    SQLiteLLMCache,
+    get_llm_cache,
+    make_cache_key,
+)
+from metagpt.utils.cost_manager import CostManager
+from tests.metagpt.provider.mock_llm_config import mock_llm_config
+from tests.metagpt.provider.test_base_llm import MockBaseLLM
+
+
+def test_make_cache_key():
+    messages = [{"role": "user", "content": "hello"}]
+    assert make_cache_key(model="gpt-4", messages=messages) == make_cache_key(messages=messages, model="gpt-4")
+    assert make_cache_key(model="gpt-4", messages=messages) != make_cache_key(model="gpt-3.5", messages=messages)
+
+
+@pytest.mark.asyncio
+async def test_memory_llm_cache(mocker):
+    cache = MemoryLLMCache(LLMCacheConfig(max_size=2, ttl=10))
+    await cache.set("a", {"rsp": "a"})
+    await cache.set("b", {"rsp": "b"})
+    assert await cache.get("a") == {"rsp": "a"}
+    await cache.set("c", {"rsp": "c"})
+    assert await cache.get("b") is None  # least recently used
+    assert await cache.get("c") == {"rsp": "c"}
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    mocker.patch("time.time", return_value=time.time() + 11)
+    assert await cache.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_sqlite_llm_cache(tmp_path):
+    config = LLMCacheConfig(cache_type=LLMCacheType.SQLITE, path=str(tmp_path / "cache.sqlite3"), max_size=2)
+    cache = SQLiteLLMCache(config)
+    await cache.set("a", {"rsp": "a"})
+    await cache.set("b", {"rsp": {"code": "b"}})
+    await cache.set("c", {"rsp": "c"})
+
+    reopened = SQLiteLLMCache(config)
+    assert await reopened.get("a") is None
+    assert await reopened.get("b") == {"rsp": {"code": "b"}}
+    assert await reopened.get("c") == {"rsp": "c"}
+
+
+@pytest.mark.asyncio
+async def test_llm_cached_request(mocker):
+    config = mock_llm_config.model_copy(update={"cache": LLMCacheConfig(max_size=10)})
+    llm = MockBaseLLM(config)
+    llm.cost_manager = CostManager()
+    stream_log = mocker.patch("metagpt.provider.base_llm.log_llm_stream")
+    messages = [{"role": "user", "content": "hello"}]
+    calls = []
+
+    async def _request():
+        calls.append(1)
+        llm._update_costs({"prompt_tokens": 10, "completion_tokens": 20}, model="gpt-4-turbo")
+        return "world"
+
+    assert await llm._cached(_request, messages=messages) == "world"
+    assert await llm._cached(_request, stream=True, messages=messages) == "world"
+    assert len(calls) == 1
+    stream_log.assert_any_call("world")
+    assert llm.cost_manager.cache_hits == 1
+    assert llm.cost_manager.saved_prompt_tokens == 10
+    assert llm.cost_manager.saved_completion_tokens == 20
+    assert llm.cost_manager.saved_cost > 0
+    assert llm.cost_manager.total_prompt_tokens == 10
+    assert get_llm_cache(config.cache).hits == 1
+
+    llm.config = mock_llm_config
+    assert await llm._cached(_request, messages=messages) == "world"
+    assert len(calls) == 2
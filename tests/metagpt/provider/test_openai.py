@@ -13,6 +13,7 @@ from metagpt.const import TEST_DATA_PATH
 from metagpt.llm import LLM
 from metagpt.logs import logger
 from metagpt.provider import OpenAILLM
+from metagpt.provider.http_client_pool import HTTP_CLIENT_POOL
 from tests.metagpt.provider.mock_llm_config import (
     mock_llm_config,
     mock_llm_config_proxy,
@@ -97,7 +98,7 @@ class TestOpenAI:
         kwargs = instance._make_client_kwargs()
         assert kwargs["api_key"] == "mock_api_key"
         assert kwargs["base_url"] == "mock_base_url"
-        assert "http_client" not in kwargs
+        assert kwargs["http_client"] is HTTP_CLIENT_POOL.get(mock_llm_config)
 
     def test_make_client_kwargs_with_proxy(self):
         instance = OpenAILLM(mock_llm_config_proxy)
@@ -10,7 +10,13 @@ from metagpt.rag.engines import SimpleEngine
 from metagpt.rag.parsers import OmniParse
 from metagpt.rag.retrievers import SimpleHybridRetriever
 from metagpt.rag.retrievers.base import ModifiableRAGRetriever, PersistableRAGRetriever
-from metagpt.rag.schema import BM25RetrieverConfig, ObjectNode
+from metagpt.rag.schema import (
+    BM25RetrieverConfig,
+    FAISSIndexConfig,
+    FAISSRetrieverConfig,
+    IngestionConfig,
+    ObjectNode,
+)
 
 
 class TestSimpleEngine:
@@ -95,6 +101,97 @@ class TestSimpleEngine:
         with pytest.raises(ValueError):
             SimpleEngine.from_docs()
 
+    def test_from_docs_streaming_and_resume(self, tmp_path, mock_llm, mock_embedding):
+        # Setup
+        input_dir = tmp_path / "docs"
+        input_dir.mkdir()
+        for i, fruit in enumerate(["apple", "banana", "cherry", "durian", "elderberry"]):
+            (input_dir / f"{fruit}.txt").write_text(f"The {fruit} is fruit number {i}.")
+        persist_dir = tmp_path / "storage"
+        ingestion_config = IngestionConfig(num_workers=2, file_batch_size=2, persist_dir=persist_dir)
+
+        # Exec
+        engine = SimpleEngine.from_docs(
+            input_dir=str(input_dir),
+            llm=mock_llm,
+            embed_model=mock_embedding,
+            retriever_configs=[FAISSRetrieverConfig(dimensions=1), BM25RetrieverConfig(similarity_top_k=1)],
+            ingestion_config=ingestion_config,
+        )
+
+        # Assert
+        faiss_retriever, bm25_retriever = engine.retriever.retrievers
+        assert len(faiss_retriever._index.docstore.docs) == 5
+        assert "cherry" in bm25_retriever.retrieve("cherry")[0].text
+
+        # Resume from the persisted index, only the new file is ingested
+        (input_dir / "fig.txt").write_text("The fig is fruit number 5.")
+        bm25_config = BM25RetrieverConfig(similarity_top_k=1)
+        engine = SimpleEngine.from_index(
+            index_config=FAISSIndexConfig(persist_path=persist_dir),
+            llm=mock_llm,
+            embed_model=mock_embedding,
+            retriever_configs=[FAISSRetrieverConfig(dimensions=1), bm25_config],
+        )
+        assert bm25_config.persist_path is None  # the config of the caller is not changed
+        stats = engine.add_docs(sorted(str(f) for f in input_dir.iterdir()), ingestion_config=ingestion_config)
+
+        faiss_retriever, bm25_retriever = engine.retriever.retrievers
+        assert (stats.files, stats.skipped_files) == (1, 5)
+        assert len(faiss_retriever._index.docstore.docs) == 6
+        assert len(bm25_retriever.bm25) == 6
+        assert "fig" in bm25_retriever.retrieve("fig")[0].text
+
+    @pytest.mark.parametrize("with_faiss", [True, False])
+    def test_from_docs_interrupted_and_rerun(self, mocker, tmp_path, mock_llm, mock_embedding, with_faiss):
+        # Setup
+        input_dir = tmp_path / "docs"
+        input_dir.mkdir()
+        for i, fruit in enumerate(["apple", "banana", "cherry", "durian", "elderberry"]):
+            (input_dir / f"{fruit}.txt").write_text(f"The {fruit} is fruit number {i}.")
+        persist_dir = tmp_path / "storage"
+        ingestion_config = IngestionConfig(num_workers=0, file_batch_size=2, persist_dir=persist_dir)
+        faiss_configs = [FAISSRetrieverConfig(dimensions=1)] if with_faiss else []
+
+        def from_docs():
+            return SimpleEngine.from_docs(
+                input_dir=str(input_dir),
+                llm=mock_llm,
+                embed_model=mock_embedding,
+                retriever_configs=faiss_configs + [BM25RetrieverConfig(similarity_top_k=1)],
+                ingestion_config=ingestion_config,
+            )
+
+        # Exec, interrupted in the second batch
+        save_nodes = SimpleEngine._save_nodes
+        batches = []
+
+        def interrupted_save_nodes(engine, nodes):
+            batches.append(nodes)
+            if len(batches) == 2:
+                raise RuntimeError("interrupted")
+            save_nodes(engine, nodes)
+
+        mocker.patch.object(SimpleEngine, "_save_nodes", interrupted_save_nodes)
+        with pytest.raises(RuntimeError):
+            from_docs()
+        mocker.patch.object(SimpleEngine, "_save_nodes", save_nodes)
+        engine = from_docs()
+
+        # Assert, the files ingested before the interruption are kept, with FAISS, or ingested again
+        bm25_retriever = engine.retriever.retrievers[-1] if with_faiss else engine.retriever
+        assert len(bm25_retriever.bm25) == 5
+        assert "apple" in bm25_retriever.retrieve("apple")[0].text
+        if with_faiss:
+            assert len(engine.retriever.retrievers[0]._index.docstore.docs) == 5
+            engine = SimpleEngine.from_index(
+                index_config=FAISSIndexConfig(persist_path=persist_dir),
+                llm=mock_llm,
+                embed_model=mock_embedding,
+                retriever_configs=[FAISSRetrieverConfig(dimensions=1)],
+            )
+            assert len(engine.retriever._index.docstore.docs) == 5
+
     def test_from_objs(self, mock_llm, mock_embedding):
         # Mock
         class MockRAGObject:
@@ -18,6 +18,8 @@ from metagpt.rag.schema import (
     ElasticsearchRetrieverConfig,
     ElasticsearchStoreConfig,
     FAISSRetrieverConfig,
+    FusionMode,
+    HybridRetrieverConfig,
 )
 
 
@@ -81,6 +83,22 @@ class TestRetrieverFactory:
 
         assert isinstance(retriever, SimpleHybridRetriever)
 
+    def test_get_retriever_with_hybrid_config(self, mocker, mock_nodes, mock_embedding):
+        hybrid_config = HybridRetrieverConfig(fusion_mode=FusionMode.RECIPROCAL_RANK, weights=[0.7, 0.3], rrf_k=10)
+        mocker.patch("rank_bm25.BM25Okapi.__init__", return_value=None)
+
+        retriever = self.retriever_factory.get_retriever(
+            configs=[FAISSRetrieverConfig(dimensions=1), hybrid_config, BM25RetrieverConfig()],
+            nodes=mock_nodes,
+            embed_model=mock_embedding,
+        )
+
+        assert isinstance(retriever, SimpleHybridRetriever)
+        assert [type(r) for r in retriever.retrievers] == [FAISSRetriever, DynamicBM25Retriever]
+        assert retriever.fusion_mode == FusionMode.RECIPROCAL_RANK
+        assert retriever.weights == [0.7, 0.3]
+        assert retriever.rrf_k == 10
+
     def test_get_retriever_with_chroma_config(self, mocker, mock_chroma_vector_store, mock_embedding):
         mock_config = ChromaRetrieverConfig(persist_path="/path/to/chroma", collection_name="test_collection")
         mock_chromadb = mocker.patch("metagpt.rag.factories.retriever.chromadb.PersistentClient")
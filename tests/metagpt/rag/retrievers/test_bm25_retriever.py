@@ -1,27 +1,125 @@
+import random
+import time
+
 import pytest
 from llama_index.core import VectorStoreIndex
-from llama_index.core.schema import Node
+from llama_index.core.schema import Node, TextNode
+from rank_bm25 import BM25Okapi
+
+from metagpt.rag.retrievers.bm25_retriever import (
+    BM25_INDEX_FILENAME,
+    BM25Index,
+    DynamicBM25Retriever,
+)
+
+WORDS = ["apple", "banana", "cherry", "date", "elder", "fig", "grape", "honey", "iris", "jade", "kiwi", "lemon"]
+
+
+def random_corpus(rng: random.Random, n: int) -> list[list[str]]:
+    # a skewed distribution, so some terms are in more than half of the documents and have negative idf
+    return [rng.choices(WORDS, weights=range(len(WORDS), 0, -1), k=rng.randint(1, 30)) for _ in range(n)]
+
+
+def make_nodes(corpus: list[list[str]], start: int = 0) -> list[TextNode]:
+    return [TextNode(id_=f"node_{start + i}", text=" ".join(tokens)) for i, tokens in enumerate(corpus)]
+
+
+def ref_top_k(corpus: list[list[str]], query: list[str], k: int) -> list[tuple[int, float]]:
+    """The former retrieval: score all documents by BM25Okapi, then sort"""
+    scores = BM25Okapi(corpus).get_scores(query)
+    return sorted(enumerate(scores.tolist()), key=lambda x: x[1], reverse=True)[:k]
+
+
+class TestBM25Index:
+    def test_scores_match_bm25okapi(self):
+        rng = random.Random(0)
+        corpus = random_corpus(rng, 200)
+        index = BM25Index()
+        for i, tokens in enumerate(corpus):
+            index.add(str(i), tokens)
+
+        okapi = BM25Okapi(corpus)
+        assert index.average_idf == pytest.approx(okapi.average_idf)
+        for _ in range(20):
+            query = rng.choices(WORDS + ["unknown"], k=rng.randint(1, 5))
+            assert index.get_scores(query).tolist() == pytest.approx(okapi.get_scores(query).tolist())
 
-from metagpt.rag.retrievers.bm25_retriever import DynamicBM25Retriever
+            top_k = index.top_k(query, 10)
+            expected = ref_top_k(corpus, query, 10)
+            assert [int(doc_id) for doc_id, _ in top_k] == [i for i, _ in expected]
+            assert [score for _, score in top_k] == pytest.approx([score for _, score in expected])
+
+    def test_delete_and_replace(self):
+        rng = random.Random(1)
+        corpus = random_corpus(rng, 100)
+        index = BM25Index()
+        for i, tokens in enumerate(corpus):
+            index.add(str(i), tokens)
+
+        deleted = set(rng.sample(range(100), 40))
+        for i in deleted:
+            assert index.delete(str(i))
+        assert not index.delete("0" if 0 in deleted else "missing")
+        index.add("1", ["apple", "kiwi"])  # replaced, or added again if it was deleted
+
+        live = {i: tokens for i, tokens in enumerate(corpus) if i not in deleted}
+        live[1] = ["apple", "kiwi"]
+        live_ids = [i for i in range(100) if i in live and i != 1] + [1]
+        assert len(index) == len(live_ids)
+
+        query = ["apple", "kiwi", "lemon"]
+        expected = ref_top_k([live[i] for i in live_ids], query, 15)
+        top_k = index.top_k(query, 15)
+        assert [int(doc_id) for doc_id, _ in top_k] == [live_ids[i] for i, _ in expected]
+        assert [score for _, score in top_k] == pytest.approx([score for _, score in expected])
+
+        for i in live_ids:
+            index.delete(str(i))
+        assert len(index) == 0
+        assert index.postings == {}
+        assert index.top_k(query, 5) == []
+
+    def test_top_k_includes_unmatched_in_order(self):
+        index = BM25Index()
+        for i, tokens in enumerate([["a"], ["b"], ["c"], ["d"]]):
+            index.add(str(i), tokens)
+
+        assert [doc_id for doc_id, _ in index.top_k(["c"], 3)] == ["2", "0", "1"]
+
+    def test_save_and_load(self, tmp_path):
+        corpus = random_corpus(random.Random(2), 50)
+        index = BM25Index(k1=1.2)
+        for i, tokens in enumerate(corpus):
+            index.add(str(i), tokens)
+        index.delete("3")
+
+        path = tmp_path / BM25_INDEX_FILENAME
+        index.save(path)
+        loaded = BM25Index.load(path)
+
+        assert loaded.k1 == 1.2
+        assert len(loaded) == 49
+        assert loaded.top_k(["apple", "fig"], 10) == index.top_k(["apple", "fig"], 10)
 
 
 class TestDynamicBM25Retriever:
     @pytest.fixture(autouse=True)
     def setup(self, mocker):
         self.doc1 = mocker.MagicMock(spec=Node)
+        self.doc1.node_id = "doc1"
         self.doc1.get_content.return_value = "Document content 1"
         self.doc2 = mocker.MagicMock(spec=Node)
+        self.doc2.node_id = "doc2"
         self.doc2.get_content.return_value = "Document content 2"
         self.mock_nodes = [self.doc1, self.doc2]
 
-        index = mocker.MagicMock(spec=VectorStoreIndex)
-        index.storage_context.persist.return_value = "ok"
+        self.index = mocker.MagicMock(spec=VectorStoreIndex)
+        self.index.storage_context.persist.return_value = "ok"
 
         mock_nodes = []
-        mock_tokenizer = mocker.MagicMock()
-        self.mock_bm25okapi = mocker.patch("rank_bm25.BM25Okapi.__init__", return_value=None)
+        self.mock_tokenizer = mocker.MagicMock(side_effect=lambda text: text.lower().split())
 
-        self.retriever = DynamicBM25Retriever(nodes=mock_nodes, tokenizer=mock_tokenizer, index=index)
+        self.retriever = DynamicBM25Retriever(nodes=mock_nodes, tokenizer=self.mock_tokenizer, index=self.index)
 
     def test_add_docs_updates_nodes_and_corpus(self):
         # Exec
@@ -29,9 +127,104 @@ class TestDynamicBM25Retriever:
 
         # Assert
         assert len(self.retriever._nodes) == len(self.mock_nodes)
-        assert len(self.retriever._corpus) == len(self.mock_nodes)
-        self.retriever._tokenizer.assert_called()
-        self.mock_bm25okapi.assert_called()
+        assert len(self.retriever.bm25) == len(self.mock_nodes)
+        assert self.retriever._tokenizer.call_count == len(self.mock_nodes)
+        self.index.insert_nodes.assert_called_once_with(self.mock_nodes)
+
+        # only the new nodes are tokenized
+        doc3 = TextNode(id_="doc3", text="Another content 3")
+        self.retriever.add_nodes([doc3])
+        assert self.retriever._tokenizer.call_count == len(self.mock_nodes) + 1
+        assert len(self.retriever.bm25) == 3
+
+    def test_delete_nodes(self):
+        self.retriever.add_nodes(self.mock_nodes)
+
+        self.retriever.delete_nodes(["doc1"])
+
+        assert self.retriever._nodes == [self.doc2]
+        assert "doc1" not in self.retriever.bm25
+        self.index.delete_nodes.assert_called_once_with(["doc1"])
+
+    def test_persist(self, tmp_path):
+        self.retriever.add_nodes(self.mock_nodes)
+
+        self.retriever.persist(str(tmp_path))
+
+        self.index.storage_context.persist.assert_called_once_with(str(tmp_path))
+        assert (tmp_path / BM25_INDEX_FILENAME).exists()
+
+    def test_reload_without_tokenizing(self, tmp_path):
+        nodes = make_nodes(random_corpus(random.Random(3), 30))
+        retriever = DynamicBM25Retriever(nodes=nodes, tokenizer=self.mock_tokenizer, similarity_top_k=30)
+        retriever.persist(str(tmp_path))
+
+        self.mock_tokenizer.reset_mock()
+        new_node = TextNode(id_="new", text="apple apple grape")
+        reloaded = DynamicBM25Retriever(
+            nodes=nodes[1:] + [new_node], tokenizer=self.mock_tokenizer, similarity_top_k=30, persist_path=tmp_path
+        )
+
+        # only the node missing in the persisted index is tokenized, the stale node is dropped
+        assert [call.args[0] for call in self.mock_tokenizer.call_args_list] == [new_node.text]
+        assert "node_0" not in reloaded.bm25
+        assert len(reloaded.bm25) == 30
+
+        reloaded.delete_nodes(["new"])
+        reloaded.add_nodes([nodes[0]])
+        scores = {n.node.node_id: n.score for n in reloaded.retrieve("apple grape")}
+        assert scores == pytest.approx({n.node.node_id: n.score for n in retriever.retrieve("apple grape")})
+
+    def test_reload_changed_node(self, tmp_path):
+        nodes = [TextNode(id_="a", text="apple apple"), TextNode(id_="b", text="grape")]
+        DynamicBM25Retriever(nodes=nodes, tokenizer=self.mock_tokenizer).persist(str(tmp_path))
+
+        # the node with the same id but another content is tokenized again
+        self.mock_tokenizer.reset_mock()
+        nodes[0] = TextNode(id_="a", text="cherry")
+        reloaded = DynamicBM25Retriever(nodes=nodes, tokenizer=self.mock_tokenizer, persist_path=tmp_path)
+
+        assert [call.args[0] for call in self.mock_tokenizer.call_args_list] == ["cherry"]
+        assert reloaded.bm25.doc_freqs[reloaded.bm25._slots["a"]] == {"cherry": 1}
+
+    def test_retrieve_matches_bm25okapi(self):
+        corpus = random_corpus(random.Random(4), 100)
+        retriever = DynamicBM25Retriever(nodes=[], tokenizer=str.split, similarity_top_k=5)
+        for start in range(0, 100, 10):
+            retriever.add_nodes(make_nodes(corpus[start : start + 10], start))
+
+        nodes = retriever.retrieve("cherry lemon lemon")
+
+        expected = ref_top_k(corpus, ["cherry", "lemon", "lemon"], 5)
+        assert [n.node.node_id for n in nodes] == [f"node_{i}" for i, _ in expected]
+        assert [n.score for n in nodes] == pytest.approx([score for _, score in expected])
+
+    def test_empty_retriever(self):
+        assert self.retriever.retrieve("content") == []
+
+
+def test_batched_ingestion_benchmark():
+    corpus = random_corpus(random.Random(5), 2000)
+    nodes = make_nodes(corpus)
+    batches = [nodes[i : i + 50] for i in range(0, len(nodes), 50)]
+
+    # the former add_nodes: re-tokenize the whole corpus and rebuild BM25Okapi for every batch
+    start = time.perf_counter()
+    ingested = []
+    for batch in batches:
+        ingested.extend(batch)
+        okapi = BM25Okapi([node.get_content().split() for node in ingested])
+    rebuild_cost = time.perf_counter() - start
+
+    start = time.perf_counter()
+    retriever = DynamicBM25Retriever(nodes=[], tokenizer=str.split, similarity_top_k=10)
+    for batch in batches:
+        retriever.add_nodes(batch)
+    incremental_cost = time.perf_counter() - start
+
+    query = ["fig", "kiwi"]
+    expected = sorted(enumerate(okapi.get_scores(query).tolist()), key=lambda x: x[1], reverse=True)[:10]
+    assert [node_id for node_id, _ in retriever.bm25.top_k(query, 10)] == [f"node_{i}" for i, _ in expected]
 
-    def test_persist(self):
-        self.retriever.persist("")
+    print(f"{len(batches)} batches, rebuild: {rebuild_cost * 1000:.1f}ms, incremental: {incremental_cost * 1000:.1f}ms")
+    assert incremental_cost < rebuild_cost
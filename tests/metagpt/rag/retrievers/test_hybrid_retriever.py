@@ -1,7 +1,49 @@
+import asyncio
+import time
+
+import faiss
 import pytest
-from llama_index.core.schema import NodeWithScore, TextNode
+from llama_index.core import StorageContext, VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+from llama_index.vector_stores.faiss import FaissVectorStore
 
 from metagpt.rag.retrievers import SimpleHybridRetriever
+from metagpt.rag.retrievers.bm25_retriever import DynamicBM25Retriever
+from metagpt.rag.retrievers.faiss_retriever import FAISSRetriever
+from metagpt.rag.schema import FusionMode
+
+
+class SlowEmbedding(MockEmbedding):
+    """Stands for a remote embedding api, the query embedding takes `latency` seconds"""
+
+    latency: float = 0.05
+
+    async def _aget_query_embedding(self, query: str) -> list[float]:
+        await asyncio.sleep(self.latency)
+        return self._get_vector()
+
+
+class BlockingRetriever(BaseRetriever):
+    """A retriever with only the sync `_retrieve`"""
+
+    def __init__(self, nodes: list[NodeWithScore], delay: float = 0.2):
+        self.nodes = nodes
+        self.delay = delay
+        super().__init__()
+
+    def _retrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        time.sleep(self.delay)
+        return self.nodes
+
+
+def node_with_score(node_id: str, score: float) -> NodeWithScore:
+    return NodeWithScore(node=TextNode(id_=node_id, text=f"node {node_id}"), score=score)
+
+
+def ranked(nodes: list[NodeWithScore]) -> list[tuple[str, float]]:
+    return [(n.node.node_id, round(n.score, 6)) for n in nodes]
 
 
 class TestSimpleHybridRetriever:
@@ -55,3 +97,97 @@ class TestSimpleHybridRetriever:
     def test_persist(self, mock_hybrid_retriever: SimpleHybridRetriever):
         mock_hybrid_retriever.persist("")
         mock_hybrid_retriever.retrievers[0].persist.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_aretrieve_concurrently(self, mocker):
+        async def slow_aretrieve(query):
+            await asyncio.sleep(0.2)
+            return [node_with_score("1", 1.0)]
+
+        async_retriever = mocker.AsyncMock()
+        async_retriever.aretrieve.side_effect = slow_aretrieve
+        blocking_retriever = BlockingRetriever([node_with_score("2", 0.5)], delay=0.2)
+        hybrid_retriever = SimpleHybridRetriever(async_retriever, blocking_retriever)
+
+        start = time.perf_counter()
+        results = await hybrid_retriever.aretrieve("test query")
+        cost = time.perf_counter() - start
+
+        assert ranked(results) == [("1", 1.0), ("2", 0.5)]
+        assert cost < 0.35
+        metrics = hybrid_retriever.metrics
+        assert list(metrics) == ["0:AsyncMock", "1:BlockingRetriever"]
+        assert all(m["calls"] == 1 and m["last_time"] >= 0.2 for m in metrics.values())
+
+    @pytest.mark.asyncio
+    async def test_aretrieve_does_not_share_query(self, mocker):
+        async def set_embedding(query: QueryBundle):
+            query.embedding = [1.0]
+            return []
+
+        retriever = mocker.AsyncMock()
+        retriever.aretrieve.side_effect = set_embedding
+        query = QueryBundle("test query")
+
+        await SimpleHybridRetriever(retriever, retriever).aretrieve(query)
+
+        assert query.embedding is None
+
+    @pytest.mark.asyncio
+    async def test_fusion(self, mocker):
+        results = [
+            [node_with_score("1", 0.9), node_with_score("2", 0.5), node_with_score("3", 0.1)],
+            [node_with_score("3", 12.0), node_with_score("4", 8.0), node_with_score("2", 4.0)],
+        ]
+        retrievers = []
+        for nodes in results:
+            retriever = mocker.AsyncMock()
+            retriever.aretrieve.return_value = nodes
+            retrievers.append(retriever)
+
+        simple = SimpleHybridRetriever(*retrievers)
+        assert ranked(await simple.aretrieve("q")) == [("1", 0.9), ("2", 4.0), ("3", 12.0), ("4", 8.0)]
+
+        rrf = SimpleHybridRetriever(*retrievers, fusion_mode=FusionMode.RECIPROCAL_RANK, rrf_k=1)
+        assert ranked(await rrf.aretrieve("q")) == [
+            ("3", round(1 / 4 + 1 / 2, 6)),
+            ("2", round(1 / 3 + 1 / 4, 6)),
+            ("1", 0.5),
+            ("4", round(1 / 3, 6)),
+        ]
+
+        relative = SimpleHybridRetriever(
+            *retrievers, fusion_mode=FusionMode.RELATIVE_SCORE, weights=[2.0, 1.0], similarity_top_k=3
+        )
+        assert ranked(await relative.aretrieve("q")) == [("1", 2.0), ("2", 1.0), ("3", 1.0)]
+
+        with pytest.raises(ValueError):
+            SimpleHybridRetriever(*retrievers, weights=[1.0])
+
+    @pytest.mark.asyncio
+    async def test_bm25_faiss_latency(self):
+        words = ["apple", "banana", "cherry", "durian", "elder", "fig", "grape", "honeydew", "kiwi", "lemon"]
+        nodes = [
+            TextNode(text=" ".join(words[(i * j) % len(words)] for j in range(1, 30)), id_=str(i)) for i in range(2000)
+        ]
+        embed_model = SlowEmbedding(embed_dim=64)
+        storage_context = StorageContext.from_defaults(vector_store=FaissVectorStore(faiss_index=faiss.IndexFlatL2(64)))
+        index = VectorStoreIndex(nodes=nodes, storage_context=storage_context, embed_model=embed_model)
+        retrievers = [FAISSRetriever(index=index, similarity_top_k=5), DynamicBM25Retriever(nodes, similarity_top_k=5)]
+        hybrid_retriever = SimpleHybridRetriever(*retrievers, fusion_mode=FusionMode.RECIPROCAL_RANK)
+        queries = [f"{words[i]} {words[-i - 1]}" for i in range(5)]
+
+        start = time.perf_counter()
+        for query in queries:
+            for retriever in retrievers:
+                await retriever.aretrieve(query)
+        sequential_cost = (time.perf_counter() - start) / len(queries)
+
+        start = time.perf_counter()
+        for query in queries:
+            assert await hybrid_retriever.aretrieve(query)
+        concurrent_cost = (time.perf_counter() - start) / len(queries)
+
+        print(f"per query, sequential: {sequential_cost * 1000:.1f}ms, concurrent: {concurrent_cost * 1000:.1f}ms")
+        print(hybrid_retriever.metrics)
+        assert concurrent_cost < sequential_cost
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import threading
+import time
+
+import pytest
+from llama_index.core.schema import TextNode
+
+from metagpt.rag.ingestion import (
+    CHECKPOINT_FILENAME,
+    IngestionCheckpoint,
+    StreamingIngestion,
+    file_hash,
+)
+from metagpt.rag.schema import IngestionConfig
+
+
+def load_lines(input_file: str) -> list[TextNode]:
+    """One node per line, tagged by the pid of the worker"""
+    with open(input_file) as f:
+        return [
+            TextNode(text=line.strip(), metadata={"pid": os.getpid()}, excluded_embed_metadata_keys=["pid"])
+            for line in f
+            if line.strip()
+        ]
+
+
+class RecordingEmbedding:
+    """Record the batch sizes and the max number of concurrent calls"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = 0
+        self.batch_sizes = []
+        self.max_running = 0
+
+    def get_text_embedding_batch(self, texts, show_progress=False, **kwargs):
+        with self._lock:
+            self._running += 1
+            self.max_running = max(self.max_running, self._running)
+            self.batch_sizes.append(len(texts))
+        time.sleep(0.02)
+        with self._lock:
+            self._running -= 1
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+@pytest.fixture
+def input_files(tmp_path):
+    files = []
+    for i in range(10):
+        path = tmp_path / "docs" / f"doc_{i}.txt"
+        path.parent.mkdir(exist_ok=True)
+        path.write_text("\n".join(f"doc {i} line {j}" for j in range(5)))
+        files.append(path)
+    return files
+
+
+def test_file_hash(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"x" * 3000)
+    assert file_hash(path, chunk_size=1024) == hashlib.sha256(b"x" * 3000).hexdigest()
+
+
+def test_checkpoint(tmp_path):
+    checkpoint = IngestionCheckpoint(tmp_path / "ckpt" / CHECKPOINT_FILENAME)
+    checkpoint.add("hash", "a.txt")
+    checkpoint.save()
+
+    assert "hash" in IngestionCheckpoint(tmp_path / "ckpt" / CHECKPOINT_FILENAME)
+    assert "hash" not in IngestionCheckpoint(tmp_path / "missing.json")
+    IngestionCheckpoint().save()  # without a path, nothing is saved
+
+
+@pytest.mark.parametrize("num_workers", [0, 2])
+def test_streaming_ingestion(input_files, num_workers):
+    inserted = []
+    embed_model = RecordingEmbedding()
+    config = IngestionConfig(num_workers=num_workers, file_batch_size=3, embed_batch_size=4, max_concurrency=2)
+    ingestion = StreamingIngestion(
+        load_fn=load_lines, insert_fn=inserted.append, embed_model=embed_model, config=config
+    )
+
+    stats = ingestion.run(input_files)
+
+    assert (stats.files, stats.skipped_files, stats.nodes) == (10, 0, 50)
+    # inserted batch by batch, in the order of the files
+    assert [len(batch) for batch in inserted] == [15, 15, 15, 5]
+    texts = [node.text for batch in inserted for node in batch]
+    assert texts == [f"doc {i} line {j}" for i in range(10) for j in range(5)]
+    assert all(node.embedding == [float(len(node.text)), 1.0] for batch in inserted for node in batch)
+    assert max(embed_model.batch_sizes) == 4
+    assert embed_model.max_running <= 2
+
+    pids = {node.metadata["pid"] for batch in inserted for node in batch}
+    assert (os.getpid() in pids) == (num_workers == 0)
+
+
+def test_streaming_ingestion_resume(tmp_path, input_files):
+    persist_dir = tmp_path / "storage"
+    persisted = []
+
+    def insert_fn(nodes):
+        if len(persisted) == 2:
+            raise RuntimeError("interrupted")
+
+    config = IngestionConfig(num_workers=0, file_batch_size=3, persist_dir=persist_dir)
+    ingestion = StreamingIngestion(load_fn=load_lines, insert_fn=insert_fn, persist_fn=persisted.append, config=config)
+    with pytest.raises(RuntimeError):
+        ingestion.run(input_files)
+    assert persisted == [str(persist_dir)] * 2
+
+    # the duplicated file is skipped as well
+    duplicated = tmp_path / "docs" / "copy_of_doc_0.txt"
+    duplicated.write_bytes(input_files[0].read_bytes())
+    inserted = []
+    ingestion = StreamingIngestion(load_fn=load_lines, insert_fn=inserted.extend, config=config)
+    stats = ingestion.run(input_files + [duplicated])
+
+    assert (stats.files, stats.skipped_files, stats.nodes) == (4, 7, 20)
+    assert {node.text.split(" line")[0] for node in inserted} == {"doc 6", "doc 7", "doc 8", "doc 9"}
+    assert len(IngestionCheckpoint(persist_dir / CHECKPOINT_FILENAME).files) == 10
@@ -1,5 +1,11 @@
+import asyncio
+import time
+
 import pytest
 
+from metagpt.actions.di.execute_nb_code import ExecuteNbCode
+from metagpt.actions.di.kernel_pool import KernelPool
+from metagpt.actions.di.write_analysis_code import WriteAnalysisCode
 from metagpt.logs import logger
 from metagpt.roles.di.data_interpreter import DataInterpreter
 
@@ -32,3 +38,111 @@ async def test_interpreter_react_mode(mocker):
     rsp = await di.run(requirement)
     logger.info(rsp)
     assert len(rsp.content) > 0
+
+
+class MockCodeWriter:
+    """Write the code of a task after an LLM latency, every `fail_every` candidate fails by a fixed schedule"""
+
+    def __init__(self, codes: list[str], fail_every: int = 3, latency: float = 1.0):
+        self.codes = codes
+        self.fail_every = fail_every
+        self.latency = latency
+        self.calls = 0
+        self.task = 0
+
+    async def __call__(self, counter, plan_status="", tool_info=""):
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(self.latency)
+        if call % self.fail_every:
+            return "raise ValueError('a failed candidate')", WriteAnalysisCode()
+        return self.codes[self.task], WriteAnalysisCode()
+
+
+async def run_tasks(di: DataInterpreter, writer: MockCodeWriter) -> list[str]:
+    results = []
+    for task in range(len(writer.codes)):
+        writer.task = task
+        writer.calls = 0
+        _, result, success = await di._write_and_exec_code(max_retry=3)
+        assert success
+        results.append(result.strip())
+    return results
+
+
+@pytest.mark.asyncio
+async def test_interpreter_speculative_trials(mocker):
+    codes = ["x = 40", "x += 2\nprint(x)"]
+    pool = KernelPool(size=4, preload_code="")
+    await pool.start()
+    try:
+        timings = {}
+        for trials in [1, 3]:
+            writer = MockCodeWriter(codes)
+            di = DataInterpreter(
+                react_mode="react", speculative_trials=trials, execute_code=ExecuteNbCode(kernel_pool=pool)
+            )
+            mocker.patch.object(di, "_write_code", writer)
+
+            await pool.start()  # wait for the kernels released by the previous run
+            start = time.perf_counter()
+            results = await run_tasks(di, writer)
+            timings[trials] = time.perf_counter() - start
+            # the state of the successful candidate of the first task is kept for the second one
+            assert results == ["", "42"]
+            if trials > 1:
+                # the failed candidates ran in the forks only
+                assert [cell.source for cell in di.execute_code.nb.cells] == codes
+            await di.execute_code.terminate()
+
+        assert timings[3] < timings[1]
+    finally:
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_interpreter_speculative_trials_replay(mocker):
+    codes = ["x = 40", "x += 1", "x += 1\nprint(x)"]
+    pool = KernelPool(size=4, preload_code="")
+    try:
+        writer = MockCodeWriter(codes, latency=0.1)
+        di = DataInterpreter(
+            react_mode="react", speculative_trials=3, max_replay_cells=1, execute_code=ExecuteNbCode(kernel_pool=pool)
+        )
+        mocker.patch.object(di, "_write_code", writer)
+        candidates = mocker.spy(di, "_write_and_exec_candidates")
+
+        assert await run_tasks(di, writer) == ["", "", "42"]
+        # serial once a fork would run 2 cells, the failed cells of the serial trials are not replayed
+        assert candidates.call_count == 2
+        assert [cell.source for cell in di.execute_code.replay_cells] == codes
+        forked = await di.execute_code.fork()
+        assert [cell.source for cell in forked.nb.cells] == codes
+        await forked.terminate()
+        await di.execute_code.terminate()
+    finally:
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_interpreter_speculative_trials_owned_pool(mocker):
+    writer = MockCodeWriter(["print(42)"], latency=0)
+    di = DataInterpreter(react_mode="react", speculative_trials=2)
+    mocker.patch.object(di, "_write_code", writer)
+    owned = {}
+
+    async def react():
+        owned["pool"], owned["results"] = di.execute_code.kernel_pool, await run_tasks(di, writer)
+        owned["km"] = di.execute_code.nb_client.km
+        return await di._act()
+
+    mocker.patch.object(di, "_react", react)
+    mocker.patch.object(di, "_act", return_value=None)
+
+    await di.react()
+
+    assert owned["results"] == ["42"]
+    # the pool created for the run is closed with its kernels once the run is done
+    assert owned["pool"]._closed
+    assert not await owned["km"].is_alive()
+    assert di.execute_code.kernel_pool is None
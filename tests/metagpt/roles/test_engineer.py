@@ -7,7 +7,10 @@
 @Modified By: mashenquan, 2023-11-1. In accordance with Chapter 2.2.1 and 2.2.2 of RFC 116, utilize the new message
         distribution feature for message handling.
 """
+import asyncio
 import json
+import re
+import time
 from pathlib import Path
 
 import pytest
@@ -147,5 +150,94 @@ async def test_new_coding_context(context):
         context.git_repo.delete_repository()
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("logic_analysis", "expected_dependencies"),
+    [
+        (
+            [
+                ["a.py", "Contains A class"],
+                ["b.py", "Contains B class"],
+                ["c.py", "Contains C class, from a import A"],
+                ["main.py", "Contains main function, uses a.py, b.py and c.py"],
+            ],
+            [set(), set(), {0}, {0, 1, 2}],
+        ),
+        ("Legacy plain text analysis", [set(), {0}, {0, 1}, {0, 1, 2}]),
+    ],
+)
+async def test_code_todo_dependencies(context, logic_analysis, expected_dependencies):
+    task_list = ["a.py", "b.py", "c.py", "main.py"]
+    rqno = "20240101000000.json"
+    await context.repo.docs.system_design.save(rqno, content=MockMessages.system_design.content)
+    await context.repo.docs.task.save(
+        rqno, content=json.dumps({"Logic Analysis": logic_analysis, "Task list": task_list})
+    )
+    context.src_workspace = Path(context.repo.workdir) / "demo"
+
+    engineer = Engineer(context=context)
+    await engineer._new_code_actions()
+    assert [i.i_context.filename for i in engineer.code_todos] == task_list
+    assert await engineer._get_code_todo_dependencies() == expected_dependencies
+
+
+@pytest.mark.asyncio
+async def test_concurrent_write_code(context, mocker):
+    task_list = [f"module_{i}.py" for i in range(8)] + ["main.py"]
+    logic_analysis = [[i, f"Contains the {Path(i).stem} functions"] for i in task_list[:-1]]
+    logic_analysis.append(
+        ["main.py", "Contains main function, " + ", ".join(f"import {Path(i).stem}" for i in task_list[:-1])]
+    )
+    rqno = "20240101000000.json"
+    await context.repo.docs.system_design.save(rqno, content=MockMessages.system_design.content)
+    await context.repo.docs.task.save(
+        rqno, content=json.dumps({"Logic Analysis": logic_analysis, "Task list": task_list})
+    )
+    context.src_workspace = Path(context.repo.workdir) / "demo"
+    src_repo = context.repo.with_src_path(context.src_workspace).srcs
+
+    latencies = {}
+    prompts = {}
+    in_flight = {"now": 0, "max": 0}
+
+    async def fake_aask(self, msg, *args, **kwargs):
+        filename = re.search(r"## Code: (\S+)\. Write code", msg).group(1)
+        prompts[filename] = msg
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(latencies.get(filename, 0))
+        in_flight["now"] -= 1
+        return f"```python\n# {filename}\n```"
+
+    mocker.patch("metagpt.provider.base_llm.BaseLLM.aask", fake_aask)
+    mocker.patch("metagpt.actions.write_code.count_output_tokens", lambda text, model: len(text) // 4)
+
+    runs = []
+    # the files finish in the order of the task list and then in the reverse order
+    for max_code_concurrency, latency in [(1, lambda i: 0.01), (4, lambda i: 0.01 * i), (4, lambda i: 0.01 * (8 - i))]:
+        for filename in task_list:
+            await src_repo.delete(filename)
+        latencies = {filename: latency(i) for i, filename in enumerate(task_list)}
+        prompts, in_flight["max"] = {}, 0
+        engineer = Engineer(context=context, max_code_concurrency=max_code_concurrency)
+        await engineer._new_code_actions()
+        changed_files = await engineer._act_sp_with_cr()
+
+        assert changed_files == set(task_list)
+        assert in_flight["max"] == max_code_concurrency
+        msgs = engineer.rc.memory.get_by_action(WriteCode)
+        assert [i.instruct_content.filename for i in msgs] == task_list
+        # main.py is written after all of its dependencies are saved
+        assert all(f"----- {i}" in prompts["main.py"] for i in task_list[:-1])
+        for filename in task_list:
+            doc = await src_repo.get(filename)
+            assert doc.content.strip() == f"# {filename}"
+        runs.append(prompts)
+
+    # the independent files do not see the code of each other, whichever finishes first
+    assert "----- module_0.py" not in runs[1]["module_1.py"]
+    assert runs[1] == runs[2]
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-s"])
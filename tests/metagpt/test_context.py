@@ -71,3 +71,14 @@ def test_context_3():
     # assert ctx.llm() is not None
     # assert "gpt" in ctx.llm().model
     pass
+
+
+def test_context_llm_cache():
+    ctx = Context()
+    llm = ctx.llm()
+    assert ctx.llm() is llm
+
+    ctx.config.llm = ctx.config.llm.model_copy(update={"model": "gpt-4-turbo"})
+    new_llm = ctx.llm()
+    assert new_llm is not llm
+    assert new_llm.cost_manager is not None
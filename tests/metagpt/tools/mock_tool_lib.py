@@ -0,0 +1,15 @@
+from metagpt.tools.tool_registry import register_tool
+
+
+@register_tool(tags=["mock"])
+class MockTool:
+    """A mock tool"""
+
+    def run(self):
+        """Run the mock tool"""
+
+
+@register_tool(tags=["mock"])
+def mock_fn():
+    """A mock function"""
+    return "mock"
@@ -1,12 +1,15 @@
 import pytest
+from llama_index.core.embeddings import BaseEmbedding
 
 from metagpt.schema import Plan, Task
 from metagpt.tools import TOOL_REGISTRY
 from metagpt.tools.tool_recommend import (
     BM25ToolRecommender,
+    EmbeddingToolRecommender,
     ToolRecommender,
     TypeMatchToolRecommender,
 )
+from metagpt.utils.embedding_cache import CachedEmbedding
 
 
 @pytest.fixture
@@ -88,3 +91,43 @@ async def test_tm_tr_recall_with_plan(mock_plan, mock_bm25_tr):
     result = await tr.recall_tools(plan=mock_plan)
     assert len(result) == 1
     assert result[0].name == "PolynomialExpansion"
+
+
+class KeywordEmbedding(BaseEmbedding):
+    """Count the keywords, plus a constant dimension"""
+
+    model_name: str = "keyword"
+
+    def _vector(self, text: str) -> list[float]:
+        text = text.lower()
+        return [float(text.count(word)) for word in ["feature", "missing", "scrape", "web"]] + [0.1]
+
+    def _get_query_embedding(self, query: str) -> list[float]:
+        return self._vector(query)
+
+    async def _aget_query_embedding(self, query: str) -> list[float]:
+        return self._vector(query)
+
+    def _get_text_embedding(self, text: str) -> list[float]:
+        return self._vector(text)
+
+
+@pytest.mark.asyncio
+async def test_embedding_tr_recall(mock_plan):
+    embed_model = CachedEmbedding(KeywordEmbedding())
+    tr = EmbeddingToolRecommender(
+        tools=["FillMissingValue", "PolynomialExpansion", "web scraping"], embed_model=embed_model
+    )
+
+    result = await tr.recall_tools(plan=mock_plan)
+    assert len(result) == 3
+    assert result[0].name == "PolynomialExpansion"
+
+    result = await tr.recall_tools(context="scrape the web page", topk=1)
+    assert [tool.name for tool in result] == ["scrape_web_playwright"]
+    assert embed_model.metrics["misses"] == 5  # the tools are embedded once
+
+    # the tools are embedded by the cache for another recommender
+    another = EmbeddingToolRecommender(tools=["FillMissingValue"], embed_model=embed_model)
+    await another.recall_tools(context="fill the missing values")
+    assert embed_model.metrics["misses"] == 6
@@ -1,6 +1,18 @@
+import json
+import subprocess
+import sys
+
 import pytest
 
-from metagpt.tools.tool_registry import ToolRegistry
+from metagpt.const import TOOL_MANIFEST_PATH
+from metagpt.tools.libs import TOOL_LIBS
+from metagpt.tools.tool_registry import (
+    TOOL_REGISTRY,
+    ToolRegistry,
+    build_tool_manifest,
+    get_code_hash,
+    read_tool_manifest,
+)
 
 
 @pytest.fixture
@@ -78,3 +90,65 @@ def test_get_tools_by_tag(tool_registry):
 
     tools_by_tag_non_existent = tool_registry.get_tools_by_tag("Non-existent Tag")
     assert not tools_by_tag_non_existent
+
+
+def test_register_tool_without_schema_file(tool_registry, tmp_path):
+    tool_registry.register_tool("TestClassTool", "/path/to/tool", tool_source_object=TestClassTool)
+    assert not list(tmp_path.iterdir())
+
+    schema_path = tmp_path / "schemas" / "TestClassTool.yml"
+    ToolRegistry().register_tool(
+        "TestClassTool", "/path/to/tool", tool_source_object=TestClassTool, schema_path=schema_path
+    )
+    assert schema_path.exists()
+
+
+def test_tool_manifest_up_to_date():
+    manifest = read_tool_manifest(TOOL_MANIFEST_PATH)
+    assert manifest["code_hash"] == get_code_hash(TOOL_LIBS), "rebuild the manifest by build_tool_manifest"
+    assert {tool["name"] for tool in manifest["tools"]} == set(TOOL_REGISTRY.get_all_tools())
+
+
+def test_load_from_manifest(tmp_path):
+    module_name = "tests.metagpt.tools.mock_tool_lib"
+    manifest_path = tmp_path / "manifest.json"
+    manifest = build_tool_manifest([module_name], manifest_path)
+    assert [tool["name"] for tool in manifest["tools"]] == ["MockTool", "mock_fn"]
+    sys.modules.pop(module_name, None)
+
+    registry = ToolRegistry(tool_modules=[module_name], manifest_path=manifest_path)
+    assert registry.get_tools_by_tag("mock").keys() == {"MockTool", "mock_fn"}
+    assert registry.get_tool("MockTool").schemas["description"] == "A mock tool"
+    assert module_name not in sys.modules
+
+    # imported on first use
+    assert registry.import_tool("mock_fn")() == "mock"
+    assert module_name in sys.modules
+    with pytest.raises(ValueError):
+        registry.import_tool("Nonexistent")
+
+
+def test_load_outdated_manifest(tmp_path, mocker):
+    module_name = "tests.metagpt.tools.mock_tool_lib"
+    manifest_path = tmp_path / "manifest.json"
+    manifest_path.write_text(json.dumps({"code_hash": "outdated", "tools": [{"name": "Outdated", "path": "a.py"}]}))
+    import_module = mocker.patch("importlib.import_module")
+
+    registry = ToolRegistry(tool_modules=[module_name], manifest_path=manifest_path)
+    assert not registry.has_tool("Outdated")
+    import_module.assert_called_once_with(module_name)
+
+
+def test_import_time():
+    """The tool libs are not imported with the data interpreter"""
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import metagpt.roles.di.data_interpreter\n"
+        "print(time.perf_counter() - start)\n"
+        "print(any(name in sys.modules for name in metagpt.tools.libs.TOOL_LIBS))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    import_time, imported = result.stdout.split()[-2:]
+    print(f"import metagpt.roles.di.data_interpreter: {float(import_time):.2f}s")
+    assert imported == "False"
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : test_code_context_cache.py
+@Desc    : the unittest of code_context_cache.py
+"""
+import os
+
+import pytest
+
+from metagpt.utils.code_context_cache import CodeContextCache
+from metagpt.utils.file_repository import FileRepository
+
+
+@pytest.mark.asyncio
+async def test_code_context_cache(tmp_path, mocker):
+    mocker.patch("metagpt.utils.code_context_cache.count_output_tokens", lambda text, model: len(text) // 4)
+    cache = CodeContextCache(max_size=2)
+    filename = tmp_path / "a.py"
+    assert await cache.get(filename) is None
+    assert await cache.get(tmp_path) is None
+
+    filename.write_text("a = 1")
+    snippet = await cache.get_snippet(filename, prefix="----- a.py\n")
+    assert snippet.text == "----- a.py\n```a = 1```"
+    assert snippet.size == len(snippet.text)
+    assert snippet.count_tokens("gpt-4") == len(snippet.text) // 4
+    assert await cache.get_snippet(filename, prefix="----- a.py\n") is snippet
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Modified outside of `FileRepository`
+    filename.write_text("a = 22")
+    assert await cache.get(filename) == "a = 22"
+    assert cache.misses == 2
+
+    for i in ["b.py", "c.py"]:
+        (tmp_path / i).write_text(i)
+        await cache.get(tmp_path / i)
+    assert str(filename) not in cache._entries
+    assert len(cache._entries) == 2
+
+
+@pytest.mark.asyncio
+async def test_code_context_cache_invalidate(context, mocker):
+    cache = CodeContextCache()
+    mocker.patch("metagpt.utils.file_repository.CODE_CONTEXT_CACHE", cache)
+    repo: FileRepository = context.repo.with_src_path(context.git_repo.workdir / "src").srcs
+    await repo.save("a.py", "a = 1")
+    pathname = repo.workdir / "a.py"
+    assert await cache.get(pathname) == "a = 1"
+
+    # Keep the mtime and size unchanged, only the save event tells the change.
+    st = pathname.stat()
+    await repo.save("a.py", "b = 1")
+    os.utime(pathname, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert await cache.get(pathname) == "b = 1"
+
+    await repo.delete("a.py")
+    assert str(pathname) not in cache._entries
+    assert await cache.get(pathname) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    : test_embedding_cache.py
+@Desc    : the unittest of the on-disk embedding cache
+"""
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.embeddings import BaseEmbedding
+
+from metagpt.config2 import config
+from metagpt.utils.embedding_cache import (
+    CachedEmbedding,
+    EmbeddingCacheStore,
+    with_embedding_cache,
+)
+
+
+class CountingEmbedding(BaseEmbedding):
+    """Deterministic vectors by the text hash, recording the texts of each call"""
+
+    model_name: str = "counting"
+    _calls: list = PrivateAttr(default_factory=list)
+
+    @property
+    def calls(self) -> list[list[str]]:
+        return self._calls
+
+    def _vector(self, text: str, kind: str = "text") -> list[float]:
+        seed = int.from_bytes(hashlib.sha256(f"{kind}:{text}".encode()).digest()[:8], "little")
+        return np.random.default_rng(seed).standard_normal(4).tolist()
+
+    def _get_query_embedding(self, query: str) -> list[float]:
+        self._calls.append([query])
+        return self._vector(query, "query")
+
+    async def _aget_query_embedding(self, query: str) -> list[float]:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> list[float]:
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        self._calls.append(list(texts))
+        return [self._vector(text) for text in texts]
+
+    async def _aget_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        return self._get_text_embeddings(texts)
+
+
+def test_cached_embedding_batches_misses(tmp_path):
+    model = CountingEmbedding(embed_batch_size=2)
+    cached = CachedEmbedding(model, store=EmbeddingCacheStore(tmp_path / "cache.sqlite"))
+
+    embeddings = cached.get_text_embedding_batch(["a", "b", "a", "c"])
+
+    assert embeddings == [model._vector(text) for text in ["a", "b", "a", "c"]]
+    # the duplicated miss is embedded once, in the batches of the wrapped model
+    assert model.calls == [["a", "b"], ["c"]]
+    assert cached.metrics == {"hits": 1, "misses": 3, "hit_rate": 0.25, "model_calls": 1}
+
+    assert cached.get_text_embedding_batch(["c", "d", "b"]) == [model._vector(text) for text in ["c", "d", "b"]]
+    assert model.calls[-1] == ["d"]
+    assert cached.get_text_embedding("a") == model._vector("a")
+    assert len(model.calls) == 3
+    assert cached.hit_rate == pytest.approx(4 / 8)
+
+
+def test_cached_embedding_persists(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    model = CountingEmbedding()
+    store = EmbeddingCacheStore(path)
+    CachedEmbedding(model, store=store).get_text_embedding_batch(["a", "b"])
+    store.close()
+
+    model = CountingEmbedding()
+    cached = CachedEmbedding(model, store=EmbeddingCacheStore(path))
+    assert cached.get_text_embedding_batch(["b", "a"]) == [model._vector("b"), model._vector("a")]
+    assert model.calls == []
+
+    # another model or a query does not share the vectors
+    other = CachedEmbedding(CountingEmbedding(model_name="other"), store=cached.store)
+    other.get_text_embedding("a")
+    assert other.embed_model.calls == [["a"]]
+    assert cached.get_query_embedding("a") == model._vector("a", "query")
+    assert cached.get_query_embedding("a") == model._vector("a", "query")
+    assert model.calls == [["a"]]
+    assert len(cached.store) == 4
+
+
+@pytest.mark.asyncio
+async def test_cached_embedding_async():
+    model = CountingEmbedding()
+    cached = CachedEmbedding(model)
+
+    assert await cached.aget_text_embedding_batch(["a", "b", "a"]) == [model._vector(t) for t in ["a", "b", "a"]]
+    assert await cached.aget_text_embedding("b") == model._vector("b")
+    assert await cached.aget_query_embedding("q") == model._vector("q", "query")
+    assert await cached.aget_query_embedding("q") == model._vector("q", "query")
+    assert model.calls == [["a", "b"], ["q"]]
+
+
+def test_cached_embedding_threads(tmp_path):
+    model = CountingEmbedding()
+    cached = CachedEmbedding(model, store=EmbeddingCacheStore(tmp_path / "cache.sqlite"))
+    batches = [[f"text {i % 7}", f"text {i}"] for i in range(40)]
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(cached.get_text_embedding_batch, batches))
+
+    assert results == [[model._vector(t) for t in batch] for batch in batches]
+    assert cached.metrics["hits"] + cached.metrics["misses"] == 80
+    assert len(cached.store) == 40
+
+
+def test_with_embedding_cache(tmp_path):
+    model = CountingEmbedding()
+    embedding = config.embedding.model_copy()
+    try:
+        config.embedding.cache = False
+        assert with_embedding_cache(model) is model
+
+        config.embedding.cache = True
+        config.embedding.cache_path = str(tmp_path / "cache.sqlite")
+        cached = with_embedding_cache(model)
+        assert isinstance(cached, CachedEmbedding)
+        assert cached.embed_model is model
+        assert with_embedding_cache(cached) is cached
+        assert with_embedding_cache(CountingEmbedding()).store is cached.store
+    finally:
+        config.embedding = embedding